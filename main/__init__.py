@@ -1,6 +1,6 @@
 from data_transformer.data_manager_factory import DataManagerFactory
-from data_processor.performanceAnalizer import Performance_Analyzer
 from data_processor.configuration import Config
+from data_processor import instrumentation
 
 LINE = "-----------------------------"
 
@@ -21,17 +21,18 @@ def get_user_option():
     print("OPTIONS: ")
     print("1. Summary")
     print("2. Export Pdf")
+    print("3. Text Summary (no charts)")
     print(LINE)
     return input("Choose any one of the below options: ")
 
 def validate(user_input):
     """
     Helps to validate user input.
-    If the user input is not 1 0r 2 throws error
+    If the user input is not 1, 2 or 3 throws error
     :param user_input: user_input
     :return: None
     """
-    if user_input not in ['1', '2']:
+    if user_input not in ['1', '2', '3']:
         raise ValueError("Please Enter valid options.")
 
 def get_config(config):
@@ -51,18 +52,37 @@ def get_config(config):
 def handle_display(config):
     """
     Handles the main user display screen by co-ordinating the other method
+    The analyzer (and matplotlib with it) is only imported once the data is parsed
+    When the instrumentation is on (config.instrumentation or PERFORMANCE_TRACE), every stage is reported at the end
+    The values skipped as not numeric are reported once after parsing (see config.validation_report)
     :param config: config
     :return: None
     """
     user_input = get_user_option()
     validate(user_input)
+    instrumentation.configure(config)
     factory = DataManagerFactory(config)
-    entityCollection = factory.call_parser()
+    with instrumentation.stage("parse") as parse_stage:
+        entityCollection = factory.call_parser()
+        parse_stage.add_rows(len(entityCollection))
+    if entityCollection.validation is not None:
+        entityCollection.validation.report()
+    if user_input == "3":
+        # the text summary doesn't need the analyzer, so matplotlib is never imported
+        from data_processor.text_summary import print_summary
+        with instrumentation.stage("text summary"):
+            print_summary(entityCollection)
+        instrumentation.report()
+        return
+    from data_processor.performanceAnalizer import Performance_Analyzer
     analyzer = Performance_Analyzer(config)
     if user_input == "1":
-        analyzer.display(entityCollection)
+        with instrumentation.stage("display"):
+            analyzer.display(entityCollection)
     else:
-        analyzer.export(entityCollection)
+        with instrumentation.stage("export"):
+            analyzer.export(entityCollection)
+    instrumentation.report()
 
 
 def run():
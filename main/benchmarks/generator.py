@@ -0,0 +1,160 @@
+"""
+Deterministic dataset generator for the benchmarks.
+
+It writes a CSV, JSON or XML file of `rows` entities, each with an id and `fields` numeric fields,
+and the config.json that parses it with `expressions` computable expressions.
+The same arguments always give the same file, so timings of different commits can be compared.
+Rows are generated and written in chunks, so 10M rows don't need to fit in memory.
+
+Usage, from the main folder:
+    python -m benchmarks.generator --format CSV --rows 100000 --fields 5 --expressions 2 --output data/csv_100000
+"""
+import os
+import json
+import argparse
+import numpy as np
+
+ENTITY_COLLECTION = "entities"
+BASE_FIELD = "Id"
+EXTENSIONS = {"CSV": ".csv", "JSON": ".json", "XML": ".xml"}
+CHUNK_ROWS = 100000
+
+def get_fields(fields):
+    """
+    Helps to name the numeric fields
+    :param fields (int): number of fields
+    :return(list): field names. Eg:- ['F0', 'F1']
+    """
+    return ["F{}".format(position) for position in range(fields)]
+
+def get_expressions(fields, expressions):
+    """
+    Helps to build the computable expressions, each one uses three fields in turn
+    :param fields (int): number of fields
+    :param expressions (int): number of expressions
+    :return(list): expressions. Eg:- ['(F0 + F1) * F2 / 2 as E0']
+    """
+    names = get_fields(fields)
+    return ["({} + {}) * {} / 2 as E{}".format(names[position % fields], names[(position + 1) % fields],
+                                               names[(position + 2) % fields], position)
+            for position in range(expressions)]
+
+def generate(directory, data_type, rows, fields=5, expressions=2, seed=0, columnar=False):
+    """
+    Helps to write the data file and its config.json into a directory.
+    Nothing is written when the directory already holds the same dataset.
+
+    :param directory (string): output directory, created if needed
+    :param data_type (string): CSV, JSON or XML
+    :param rows (int): number of entities
+    :param fields (int): number of numeric fields
+    :param expressions (int): number of computable expressions
+    :param seed (int): seed of the values
+    :param columnar (bool): columnar setting written in the config
+    :return(string): path of the data file
+    """
+    data_type = data_type.upper()
+    if data_type not in EXTENSIONS:
+        raise ValueError("Unsupported data type {}, expected one of {}".format(data_type, ", ".join(EXTENSIONS)))
+    os.makedirs(directory, exist_ok=True)
+    file_name = "data" + EXTENSIONS[data_type]
+    path = os.path.join(directory, file_name)
+    dataset = {"data_type": data_type, "rows": rows, "fields": fields, "expressions": expressions, "seed": seed}
+    dataset_path = os.path.join(directory, "dataset.json")
+    if os.path.exists(path) and os.path.exists(dataset_path):
+        with open(dataset_path, 'r') as dataset_file:
+            if json.load(dataset_file) == dataset:
+                _write_config(directory, data_type, file_name, fields, expressions, columnar)
+                return path
+    names = get_fields(fields)
+    random = np.random.default_rng(seed)
+    with open(path, 'w', newline='') as file:
+        writer = {"CSV": _write_csv, "JSON": _write_json, "XML": _write_xml}[data_type]
+        writer(file, names, _iter_chunks(random, rows, fields))
+    with open(dataset_path, 'w') as dataset_file:
+        json.dump(dataset, dataset_file)
+    _write_config(directory, data_type, file_name, fields, expressions, columnar)
+    return path
+
+def _iter_chunks(random, rows, fields):
+    """
+    Helps to generate the rows chunk by chunk
+    :param random (numpy.random.Generator): seeded generator
+    :param rows (int): number of entities
+    :param fields (int): number of numeric fields
+    :return: generator of (first entity position, values as formatted strings of shape (chunk rows, fields))
+    """
+    for start in range(0, rows, CHUNK_ROWS):
+        size = min(CHUNK_ROWS, rows - start)
+        values = np.round(random.normal(70, 15, (size, fields)).clip(0, 100), 1)
+        yield start, values.astype(str)
+
+def _write_csv(file, names, chunks):
+    """
+    Helps to write the rows as csv
+    """
+    file.write(",".join([BASE_FIELD] + names) + "\n")
+    for start, values in chunks:
+        file.writelines("E{},{}\n".format(start + position, ",".join(row)) for position, row in enumerate(values.tolist()))
+
+def _write_json(file, names, chunks):
+    """
+    Helps to write the rows as a json array under the entity collection key
+    """
+    file.write('{"' + ENTITY_COLLECTION + '": [')
+    separator = "\n"
+    for start, values in chunks:
+        for position, row in enumerate(values.tolist()):
+            fields = ", ".join('"{}": {}'.format(name, value) for name, value in zip(names, row))
+            file.write('{}{{"{}": "E{}", {}}}'.format(separator, BASE_FIELD, start + position, fields))
+            separator = ",\n"
+    file.write("\n]}\n")
+
+def _write_xml(file, names, chunks):
+    """
+    Helps to write the rows as xml blocks under a root element
+    """
+    file.write("<root>\n")
+    for start, values in chunks:
+        for position, row in enumerate(values.tolist()):
+            fields = "".join("<{0}>{1}</{0}>".format(name, value) for name, value in zip(names, row))
+            file.write("<{0}><{1}>E{2}</{1}>{3}</{0}>\n".format(ENTITY_COLLECTION, BASE_FIELD, start + position, fields))
+    file.write("</root>\n")
+
+def _write_config(directory, data_type, file_name, fields, expressions, columnar):
+    """
+    Helps to write the config.json parsing the dataset, with a path relative to the directory
+    """
+    config = {
+        "data_type": data_type,
+        "entity_collection": ENTITY_COLLECTION,
+        "base_field": BASE_FIELD,
+        "computable_fields": get_fields(fields) + get_expressions(fields, expressions),
+        "path": file_name,
+        "columnar": columnar
+    }
+    with open(os.path.join(directory, "config.json"), 'w') as config_file:
+        json.dump(config, config_file, indent=4)
+
+def main(arguments=None):
+    """
+    Helps to generate a dataset from the command line
+    :param arguments (list): command line arguments, sys.argv when None
+    :return(string): path of the data file
+    """
+    parser = argparse.ArgumentParser(description="Deterministic benchmark dataset generator")
+    parser.add_argument("--format", default="CSV", choices=sorted(EXTENSIONS), type=str.upper)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--fields", type=int, default=5)
+    parser.add_argument("--expressions", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--columnar", action="store_true", help="write columnar: true in the config")
+    parser.add_argument("--output", required=True, help="output directory")
+    options = parser.parse_args(arguments)
+    path = generate(options.output, options.format, options.rows, options.fields, options.expressions,
+                    options.seed, options.columnar)
+    print(path)
+    return path
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Startup benchmark: measures the cold import cost of the entry points of the project.
+
+Every module is imported in a fresh interpreter, several times, and the best wall time is kept
+together with the heavy dependencies (matplotlib, pandas, scipy, ...) the import pulled in.
+Parsing and summarizing should never load them, only rendering the charts does.
+
+Usage, from the main folder:
+    python -m benchmarks.startup [--repeat 5] [--output startup.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+MAIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "data_processor.configuration",
+    "data_transformer.data_manager_factory",
+    "data_processor.performanceAnalizer",
+    "main",
+]
+
+HEAVY_MODULES = ["matplotlib", "pandas", "scipy", "tabulate", "pypdf"]
+
+_CHILD = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"import_seconds": time.perf_counter() - start,
+                   "heavy_modules": [name for name in {heavy} if name in sys.modules]}}))
+"""
+
+def measure(module, repeat):
+    """
+    Helps to import a module in `repeat` fresh interpreters
+    :param module (string): dotted module name
+    :param repeat (int): number of interpreters started
+    :return(dict): best process and import times in seconds, and the heavy modules loaded
+    """
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join([MAIN_DIR, os.path.dirname(MAIN_DIR)]))
+    code = _CHILD.format(module=module, heavy=HEAVY_MODULES)
+    process_seconds = []
+    import_seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", code], env=environment, check=True,
+                                capture_output=True, text=True).stdout
+        process_seconds.append(time.perf_counter() - start)
+        result = json.loads(output.strip().splitlines()[-1])
+        import_seconds.append(result["import_seconds"])
+    return {"module": module, "process_seconds": min(process_seconds),
+            "import_seconds": min(import_seconds), "heavy_modules": result["heavy_modules"]}
+
+def main(arguments=None):
+    """
+    Helps to run the benchmark, print a table and optionally write the results as json
+    :param arguments (list): command line arguments, sys.argv when None
+    :return(list): one result per module
+    """
+    parser = argparse.ArgumentParser(description="Cold import cost of the project entry points")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per module, the best time is kept")
+    parser.add_argument("--output", help="json file the results are written to")
+    options = parser.parse_args(arguments)
+    results = [measure(module, options.repeat) for module in MODULES]
+    print("{:<40} {:>10} {:>10}  {}".format("MODULE", "PROCESS s", "IMPORT s", "HEAVY MODULES"))
+    for result in results:
+        print("{:<40} {:>10.3f} {:>10.3f}  {}".format(result["module"], result["process_seconds"],
+                                                   result["import_seconds"], ", ".join(result["heavy_modules"])))
+    if options.output:
+        with open(options.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+    return results
+
+if __name__ == "__main__":
+    main()
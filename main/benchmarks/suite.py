@@ -0,0 +1,233 @@
+"""
+Benchmark suite: times every stage of the pipeline on generated datasets.
+
+Stages:
+    load         reading the data file from disk
+    parse        parsing the simple fields into an entity collection
+    expressions  evaluating the computable expressions over the parsed columns
+    statistics   computing the summary of every field
+    render       drawing the page of every field
+    export       writing Summary.pdf
+
+Each stage runs `repeat` times and the best time is kept. Results are written as json,
+and `compare` flags the stages that got slower than a saved baseline.
+
+Usage, from the main folder:
+    python -m benchmarks.suite run --formats CSV JSON XML --rows 10000 100000 --output results.json
+    python -m benchmarks.suite compare baseline.json results.json --threshold 0.1
+"""
+import os
+import sys
+import copy
+import json
+import time
+import argparse
+import platform
+import numpy as np
+from benchmarks.generator import EXTENSIONS, generate
+from data_processor.configuration import Config
+from data_transformer.data_manager_factory import DataManagerFactory
+from data_transformer.expression import Expression, evaluate_expressions, is_expression
+
+STAGES = ["load", "parse", "expressions", "statistics", "render", "export"]
+READ_BLOCK = 1 << 20
+
+def best_time(function, repeat):
+    """
+    Helps to run a function several times
+    :param function: callable without arguments
+    :param repeat (int): number of runs
+    :return: best wall time in seconds, result of the last run
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def run_dataset(directory, stages, repeat, columnar, workers):
+    """
+    Helps to time the stages on one dataset.
+    The working directory is changed to the dataset directory, where Config reads config.json
+    and the export writes Summary.pdf.
+
+    :param directory (string): dataset directory written by benchmarks.generator
+    :param stages (list): stages to time
+    :param repeat (int): runs per stage
+    :param columnar (bool): columnar setting of the parsers
+    :param workers (int): workers setting of the parsers and the export
+    :return(dict): stage -> best time in seconds
+    """
+    os.chdir(directory)
+    config = Config()
+    config.columnar = columnar
+    config.workers = workers
+    expressions = [Expression(field) for field in config.computable_fields if is_expression(field)]
+    simple_config = copy.copy(config)
+    simple_config.computable_fields = [field for field in config.computable_fields if not is_expression(field)]
+    timings = {}
+    if "load" in stages:
+        timings["load"], _ = best_time(lambda: _read_file(config.path), repeat)
+    if "parse" in stages:
+        timings["parse"], _ = best_time(lambda: DataManagerFactory(simple_config).call_parser(), repeat)
+    if "expressions" in stages:
+        collection = DataManagerFactory(simple_config).call_parser()
+        columns = {field: collection.get_column(field) for field in collection.fields}
+        timings["expressions"], _ = best_time(lambda: evaluate_expressions(expressions, columns, len(collection)), repeat)
+    if not {"statistics", "render", "export"}.intersection(stages):
+        return timings
+    collection = DataManagerFactory(config).call_parser()
+    if "statistics" in stages:
+        def summarize():
+            collection._invalidate()
+            return collection.summarize(collection.fields)
+        timings["statistics"], _ = best_time(summarize, repeat)
+    if "render" in stages:
+        timings["render"], _ = best_time(lambda: _render(config, collection), repeat)
+    if "export" in stages:
+        from data_processor.performanceAnalizer import Performance_Analyzer
+        timings["export"], _ = best_time(lambda: Performance_Analyzer(config).export(collection), repeat)
+    return timings
+
+def _read_file(path):
+    """
+    Helps to read a file in blocks without keeping it
+    :param path (string): file path
+    :return(int): number of bytes read
+    """
+    size = 0
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(READ_BLOCK), b""):
+            size += len(block)
+    return size
+
+def _render(config, collection):
+    """
+    Helps to draw the page of every field on an off-screen canvas, without writing any file
+    :param config: Config of the dataset
+    :param collection (EntityCollection): parsed data
+    :return: None
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from data_processor.performanceAnalizer import Performance_Analyzer
+    analyzer = Performance_Analyzer(config)
+    summary = collection.summarize(collection.fields)
+    for column in collection.fields:
+        X, Y = analyzer.__prepare_axis_components__(collection, column)
+        fig = Figure(figsize=(14, 12))
+        analyzer.__build_page__(fig, fig.subplots(3, 2), column, X, Y, summary[column],
+                                analyzer.__prepare_extremes__(collection, column))
+        FigureCanvasAgg(fig).draw()
+
+def run(options):
+    """
+    Helps to generate the datasets, time them and write the results
+    :param options: parsed command line arguments of the run command
+    :return(dict): results with the environment under "meta" and one record per dataset and stage under "results"
+    """
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    columnar = not options.object_mode
+    work_dir = os.path.abspath(options.work_dir)
+    output = os.path.abspath(options.output) if options.output else None
+    results = []
+    for data_type in options.formats:
+        for rows in options.rows:
+            directory = os.path.join(work_dir, "{}_{}_{}_{}".format(data_type.lower(), rows, options.fields, options.expressions))
+            generate(directory, data_type, rows, options.fields, options.expressions, options.seed, columnar)
+            timings = run_dataset(directory, options.stages, options.repeat, columnar, options.workers)
+            for stage in STAGES:
+                if stage in timings:
+                    results.append({"format": data_type, "rows": rows, "fields": options.fields,
+                                    "expressions": options.expressions, "stage": stage, "seconds": timings[stage],
+                                    "rows_per_second": rows / timings[stage] if timings[stage] > 0 else None})
+                    print("{:<5} {:>10} {:<12} {:>10.4f} s".format(data_type, rows, stage, timings[stage]))
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "cpu_count": os.cpu_count(),
+            "columnar": columnar,
+            "workers": options.workers,
+            "repeat": options.repeat,
+            "seed": options.seed,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": results
+    }
+    if output:
+        with open(output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+    return report
+
+def compare(baseline, current, threshold=0.1, min_seconds=0.01):
+    """
+    Helps to compare two result files.
+    A stage is a regression when it's more than `threshold` slower than the baseline,
+    stages faster than `min_seconds` in both runs are too noisy to be flagged.
+
+    :param baseline (dict): results of the baseline run
+    :param current (dict): results of the current run
+    :param threshold (float): tolerated slowdown. Eg:- 0.1 for 10%
+    :param min_seconds (float): stages below this time are never flagged
+    :return(list): (format, rows, fields, expressions, stage) of every regression
+    """
+    def key(result):
+        return result["format"], result["rows"], result["fields"], result["expressions"], result["stage"]
+    baseline_times = {key(result): result["seconds"] for result in baseline["results"]}
+    regressions = []
+    print("{:<5} {:>10} {:<12} {:>10} {:>10} {:>8}".format("TYPE", "ROWS", "STAGE", "BASELINE", "CURRENT", "CHANGE"))
+    for result in current["results"]:
+        if key(result) not in baseline_times:
+            continue
+        before, after = baseline_times[key(result)], result["seconds"]
+        change = (after - before) / before if before > 0 else 0.0
+        flag = ""
+        if change > threshold and max(before, after) >= min_seconds:
+            flag = "REGRESSION"
+            regressions.append(key(result))
+        print("{:<5} {:>10} {:<12} {:>10.4f} {:>10.4f} {:>+7.1%} {}".format(
+            result["format"], result["rows"], result["stage"], before, after, change, flag))
+    return regressions
+
+def main(arguments=None):
+    """
+    Helps to run the run and compare commands from the command line.
+    compare exits with status 1 when a regression is found.
+    :param arguments (list): command line arguments, sys.argv when None
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Benchmark suite of the performance analysis system")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="time every stage on generated datasets")
+    run_parser.add_argument("--formats", nargs="+", default=["CSV", "JSON", "XML"], choices=sorted(EXTENSIONS), type=str.upper)
+    run_parser.add_argument("--rows", nargs="+", type=int, default=[10000, 100000])
+    run_parser.add_argument("--fields", type=int, default=5)
+    run_parser.add_argument("--expressions", type=int, default=2)
+    run_parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--object-mode", action="store_true", help="parse into Entity objects instead of columns")
+    run_parser.add_argument("--workers", type=int, default=1)
+    run_parser.add_argument("--work-dir", default="benchmark_data", help="directory of the generated datasets")
+    run_parser.add_argument("--output", help="json file the results are written to")
+    compare_parser = commands.add_parser("compare", help="flag the stages slower than a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+    compare_parser.add_argument("--min-seconds", type=float, default=0.01)
+    options = parser.parse_args(arguments)
+    if options.command == "run":
+        run(options)
+        return
+    with open(options.baseline, 'r') as baseline_file, open(options.current, 'r') as current_file:
+        regressions = compare(json.load(baseline_file), json.load(current_file), options.threshold, options.min_seconds)
+    if regressions:
+        print("{} regression(s) above {:.0%}".format(len(regressions), options.threshold))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Non-interactive command line entry point, so the analysis can be scheduled (Eg:- from cron).
+
+Several reports can be produced from a single parse, and configs reading the same source
+are parsed once with the union of their computable fields.
+
+Usage, from the main folder:
+    python cli.py --config config.json
+    python cli.py summary --config config.json
+    python cli.py text --config config.json --rank E10
+    python cli.py export stats-json --config math.json --config english.json --output reports/summary
+"""
+import os
+import sys
+import copy
+import json
+import numbers
+import argparse
+from data_processor.configuration import Config
+from data_processor import instrumentation
+from data_transformer.data_manager_factory import DataManagerFactory
+from data_transformer.expression import Expression, is_expression
+
+REPORTS = ["text", "summary", "export", "stats-json"]
+
+def get_field_names(config):
+    """
+    Helps to get the name of every computable field, the alias for an expression
+    :param config: config
+    :return(dict): field name -> computable field. Eg:- {'Total': 'Math + English as Total'}
+    """
+    return {Expression(field).alias if is_expression(field) else field: field for field in config.computable_fields}
+
+def get_source_key(config):
+    """
+    Helps to identify the source of a config and the settings changing how it's parsed.
+    Configs with the same key can share a single parse.
+    :param config: config
+    :return(tuple): source key
+    """
+    return (config.data_type, tuple(os.path.abspath(path) for path in config.get_paths()), config.entity_collection,
+            config.base_field, config.columnar, config.online_statistics, config.quantile_error, config.mode_error,
+            config.incremental, config.cache, config.cache_dir, config.duplicates, config.group_by)
+
+def group_configs(configs):
+    """
+    Helps to group the configs that can share a parse: same source key and no alias used by two different expressions
+    :param configs (list): configs
+    :return(list): groups as (field name -> computable field of the group, positions of the configs)
+    """
+    groups = []
+    for position, config in enumerate(configs):
+        field_names = get_field_names(config)
+        for key, group_fields, positions in groups:
+            if key == get_source_key(config) and all(group_fields.get(name, field) == field for name, field in field_names.items()):
+                group_fields.update(field_names)
+                positions.append(position)
+                break
+        else:
+            groups.append((get_source_key(config), dict(field_names), [position]))
+    return [(group_fields, positions) for _, group_fields, positions in groups]
+
+def parse_configs(configs):
+    """
+    Helps to parse every config, once per group of configs sharing a source.
+    Each config gets a selection of the shared entity collection with its own fields.
+    :param configs (list): configs
+    :return(list): entity collections in the order of the configs
+    """
+    collections = [None] * len(configs)
+    for group_fields, positions in group_configs(configs):
+        shared_config = copy.copy(configs[positions[0]])
+        shared_config.computable_fields = list(group_fields.values())
+        entityCollection = DataManagerFactory(shared_config).call_parser()
+        for position in positions:
+            collections[position] = entityCollection.select(list(get_field_names(configs[position])))
+    return collections
+
+def report_validation(collections):
+    """
+    Helps to report the values skipped as not numeric once per parse, on the standard error
+    so that the stats-json report can be written to the standard output
+    :param collections (list): entity collections, the ones selected from the same parse share their report
+    :return: None
+    """
+    validations = {id(entityCollection.validation): entityCollection.validation
+                   for entityCollection in collections if entityCollection.validation is not None}
+    for validation in validations.values():
+        validation.report(sys.stderr)
+
+def get_output_path(output, extension, config, multiple):
+    """
+    Helps to get the output file of a report.
+    The extension is added when missing and, with several configs, the config name is added before it.
+    The directory of the file is created if needed.
+    :param output (string): --output value, Eg:- 'reports/summary' or 'reports/summary.pdf'
+    :param extension (string): extension of the report. Eg:- '.pdf'
+    :param config: config of the report
+    :param multiple (bool): True if one file is written per config
+    :return(string): output path
+    """
+    root, current_extension = os.path.splitext(output)
+    if current_extension.lower() != extension:
+        root = output
+    if multiple:
+        root = "{}_{}".format(root, os.path.splitext(os.path.basename(config.config_path))[0])
+    os.makedirs(os.path.dirname(os.path.abspath(root)), exist_ok=True)
+    return root + extension
+
+def to_json_value(value):
+    """
+    Helps to turn a metric into a json value
+    :param value: metric, Eg:- numpy.float64
+    :return: int, float or None
+    """
+    if value is None:
+        return None
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    return float(value)
+
+def get_stats(config, entityCollection):
+    """
+    Helps to build the json report of a config
+    :param config: config
+    :param entityCollection: parsed entity collection of the config
+    :return(dict): report
+    """
+    summary = entityCollection.summarize(entityCollection.fields)
+    stats = {
+        "config": config.config_path,
+        "path": config.path,
+        "entities": len(entityCollection),
+        "memory": entityCollection.memory_footprint(),
+        "fields": {field: {metric: to_json_value(value) for metric, value in metrics.items()}
+                   for field, metrics in summary.items()}
+    }
+    if entityCollection.group_by is not None:
+        stats["group_by"] = entityCollection.group_by
+        stats["groups"] = {field: {str(label): {metric: to_json_value(value) for metric, value in metrics.items()}
+                                   for label, metrics in groups.items()}
+                           for field, groups in entityCollection.summarize_groups(entityCollection.fields).items()}
+    return stats
+
+def write_reports(reports, configs, collections, output, ranks=()):
+    """
+    Helps to produce every requested report from the parsed collections
+    :param reports (list): text, summary, export and/or stats-json
+    :param configs (list): configs
+    :param collections (list): entity collections in the order of the configs
+    :param output (string): --output value, None for the default outputs
+    :param ranks (list): --rank values, entity ids ranked in the text report
+    :return: None
+    """
+    multiple = len(configs) > 1
+    for report in reports:
+        with instrumentation.stage(report):
+            if report == "stats-json":
+                stats = {"reports": [get_stats(config, entityCollection) for config, entityCollection in zip(configs, collections)]}
+                if output is None:
+                    json.dump(stats, sys.stdout, indent=2)
+                    print()
+                else:
+                    with open(get_output_path(output, ".json", configs[0], False), 'w') as stats_file:
+                        json.dump(stats, stats_file, indent=2)
+                continue
+            if report == "text":
+                write_text(configs, collections, output, ranks)
+                continue
+            from data_processor.performanceAnalizer import Performance_Analyzer
+            for config, entityCollection in zip(configs, collections):
+                analyzer = Performance_Analyzer(config)
+                if report == "summary":
+                    analyzer.display(entityCollection)
+                else:
+                    analyzer.export(entityCollection, get_output_path(output or "Summary", ".pdf", config, multiple))
+
+def write_text(configs, collections, output, ranks=()):
+    """
+    Helps to write the text summary of every config, without plotting
+    :param configs (list): configs
+    :param collections (list): entity collections in the order of the configs
+    :param output (string): --output value, None for the standard output
+    :param ranks (list): entity ids whose value and rank in every field are added to the summary
+    :return: None
+    """
+    from data_processor.text_summary import format_summary, format_ranks
+    multiple = len(configs) > 1
+    for config, entityCollection in zip(configs, collections):
+        text = "\n\n".join([format_summary(entityCollection)] + [format_ranks(entityCollection, entity_id) for entity_id in ranks])
+        if output is not None:
+            with open(get_output_path(output, ".txt", config, multiple), 'w') as text_file:
+                text_file.write(text + "\n")
+            continue
+        if multiple:
+            print(config.config_path)
+        print(text)
+        if multiple:
+            print()
+
+def main(arguments=None):
+    """
+    Helps to run the reports from the command line
+    :param arguments (list): command line arguments, sys.argv when None
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Performance analysis system, non-interactive")
+    parser.add_argument("reports", nargs="*", metavar="report",
+                        help="any of: " + ", ".join(REPORTS) + ". Default: text, a table printed without plotting")
+    parser.add_argument("--config", action="append", dest="configs",
+                        help="config file, can be repeated. Default: config.json in the current directory")
+    parser.add_argument("--output", help="output path of the reports, the extension (.pdf, .json, .txt) is added when missing."
+                                         " Default: Summary.pdf for export and the standard output for text and stats-json")
+    parser.add_argument("--rank", action="append", dest="ranks", default=[], metavar="ENTITY_ID",
+                        help="add the value and the rank of an entity in every field to the text report, can be repeated")
+    options = parser.parse_args(arguments)
+    # checked here as argparse rejects an empty list of positional arguments with choices
+    for report in options.reports:
+        if report not in REPORTS:
+            parser.error("invalid report '{}' (choose from {})".format(report, ", ".join(REPORTS)))
+    configs = [Config(config_path) for config_path in options.configs or [None]]
+    for config in configs:
+        if not isinstance(config.config_data, dict):
+            parser.error("invalid config {}".format(config.config_path))
+    instrumentation.configure(configs[0])
+    with instrumentation.stage("parse"):
+        collections = parse_configs(configs)
+    report_validation(collections)
+    write_reports(list(dict.fromkeys(options.reports or ["text"])), configs, collections, options.output, options.ranks)
+    instrumentation.report(sys.stderr)
+
+if __name__ == "__main__":
+    main()
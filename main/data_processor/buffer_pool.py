@@ -0,0 +1,92 @@
+import threading
+import numpy as np
+
+DEFAULT_POOL_MB = 256
+
+class BufferPool:
+    """
+    BufferPool keeps the column arrays of cleared entity collections, so that the next analysis in the same
+    process reuses them instead of allocating new ones. Arrays are pooled by dtype and exact length:
+    the columnar storage grows by doubling from a fixed size, so datasets of similar sizes ask for the same lengths.
+    The pool holds at most `max_bytes`, an array released beyond that is simply dropped.
+    It's thread safe, so collections of concurrent requests can share it.
+    """
+    def __init__(self, max_bytes=DEFAULT_POOL_MB * 2 ** 20):
+        """
+        Initialize a BufferPool instance.
+
+        Parameters:
+        - max_bytes (int): The maximum number of bytes kept in the pool.
+        """
+        self.max_bytes = max_bytes
+        self.pooled_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, length, dtype, fill):
+        """
+        Get an array from the pool, or a new one when none of that dtype and length is available.
+
+        Parameters:
+        - length (int): The number of items of the array.
+        - dtype (numpy.dtype): The dtype of the array. Eg:- numpy.float64
+        - fill (Any): The value every item is set to. Eg:- numpy.nan
+
+        Returns:
+        - numpy.ndarray: An array of exactly `length` items, all equal to `fill`.
+        """
+        key = (np.dtype(dtype).str, length)
+        with self._lock:
+            buffers = self._buffers.get(key)
+            array = buffers.pop() if buffers else None
+            if array is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.pooled_bytes -= array.nbytes
+        if array is None:
+            return np.full(length, fill, dtype=dtype)
+        array.fill(fill)
+        return array
+
+    def release(self, array):
+        """
+        Give back an array that is not used anymore. Object arrays are emptied so they don't keep their items alive.
+
+        Parameters:
+        - array (numpy.ndarray): The array, it must not be used by the caller afterwards.
+        """
+        if array.dtype == object:
+            array.fill(None)
+        with self._lock:
+            if self.pooled_bytes + array.nbytes > self.max_bytes:
+                return
+            self._buffers.setdefault((array.dtype.str, len(array)), []).append(array)
+            self.pooled_bytes += array.nbytes
+
+    def __reduce__(self):
+        """
+        Pickles a pool (Eg:- with an entity collection sent back by a worker process) without its arrays and lock:
+        the default pool stays the default pool of the receiving process, any other pool becomes a new empty one.
+        """
+        if self is default_pool:
+            return _get_default_pool, ()
+        return BufferPool, (self.max_bytes,)
+
+    def clear(self):
+        """
+        Drop every pooled array, so their memory can be freed.
+        """
+        with self._lock:
+            self._buffers = {}
+            self.pooled_bytes = 0
+
+def _get_default_pool():
+    """
+    Helps to unpickle the default pool as the one of the current process.
+    """
+    return default_pool
+
+default_pool = BufferPool()
@@ -1,27 +1,91 @@
 import os
+import glob
 import json
 import difflib
 from data_transformer.custom_exception import UnsupportedDataType
 
 class Config:
-    def __init__(self):
+    def __init__(self, config_path=None):
 
         """
         Initializes a Config instance.
 
+        Parameters:
+            config_path (str): Path of the configuration file, config.json in the current directory by default.
+
         Attributes:
-            path (str): Absolute or relative path from the file in the configuration file.
+            config_path (str): Path of the configuration file.
+            path (str or list): Absolute or relative path from the file in the configuration file.
+                It can also be a glob pattern (e.g. 'data/*.csv') or a list of paths and patterns.
             data_type (str): The type of data in the configuration file (e.g., 'JSON', 'XML', 'CSV').
             entity_collection (str): The collection of entities in the data.
             base_field (str): The base field used in the configuration.
             computable_fields (list): A list of computable fields in the configuration.
+            columnar (bool): If True, the parsed data is stored column by column in numpy arrays.
+            batch_size (int): The number of records the parsers read and convert at a time.
+            workers (int): The number of worker processes used to parse the data.
+            large_data_threshold (int): Above this number of entities the charts are downsampled or aggregated.
+            max_chart_points (int): The number of points kept in a downsampled line chart.
+            top_n (int): The number of entities shown in the bar chart of a large field.
+            top_k (int): The number of entities listed with the largest and with the smallest values of every field.
+            cache (bool): If True, parsed data is cached on disk and reused while the data file and config don't change.
+            cache_dir (str): The directory of the parsed data cache.
+            cache_size_mb (int): The maximum size of the cache directory, least recently used entries are evicted.
+            incremental (bool): If True, an append-only CSV is only parsed from where the previous run stopped.
+                The file is fully parsed again when the part already read changed, see IncrementalState.
+            online_statistics (bool): If True, the parsers only update running statistics and don't keep the values,
+                so memory stays bounded whatever the size of the data. The median and mode are approximate.
+            quantile_error (float): Rank error of the approximate median, as a fraction of the count.
+            mode_error (float): Maximum undercount of the approximate mode frequency, as a fraction of the count.
+            instrumentation (str): 'table' or 'json' to measure the time and memory of every stage, empty when off.
+                The PERFORMANCE_TRACE environment variable overrides it.
+            trace_path (str): The file the JSON trace is written to.
+            trace_memory (bool): If True, the instrumentation measures allocations with tracemalloc, which slows the run down.
+                Otherwise only the resident set size is reported.
+            validation_report (str): 'table' prints the values skipped as not numeric once after parsing,
+                'json' writes them to validation_path, empty to only count them.
+            validation_path (str): The file the JSON validation report is written to.
+            validation_samples (int): The number of entity ids kept as a sample per field and reason of rejection.
+            max_invalid_fraction (float): The parsing is aborted when a larger fraction of the values of a field is not numeric.
+                1.0 never aborts.
+            min_validated_values (int): The number of values of a field checked before max_invalid_fraction is applied.
+            duplicates (str): What happens to a row whose base_field value was already read: 'allow' keeps both rows,
+                'keep-first', 'keep-last', 'sum' or 'mean' merge it into the first one, see EntityCollection.
+                Not applied with online_statistics, and only among the new rows with incremental.
+            group_by (str): A categorical field, every metric is then also computed per group of its values
+                and compared across the groups. Empty for no grouping.
             config_data (dict): The configuration data read from the file.
         """
+        self.config_path = config_path or os.path.join(os.getcwd(), "config.json")
         self.data_type = ''
         self.entity_collection = ''
         self.base_field = ''
         self.computable_fields = []
         self.path = ""
+        self.columnar = False
+        self.batch_size = 10000
+        self.workers = 1
+        self.large_data_threshold = 2000
+        self.max_chart_points = 2000
+        self.top_n = 50
+        self.top_k = 20
+        self.cache = False
+        self.cache_dir = ".cache"
+        self.cache_size_mb = 1024
+        self.incremental = False
+        self.online_statistics = False
+        self.quantile_error = 0.01
+        self.mode_error = 0.001
+        self.instrumentation = ""
+        self.trace_path = "trace.json"
+        self.trace_memory = True
+        self.validation_report = "table"
+        self.validation_path = "validation.json"
+        self.validation_samples = 5
+        self.max_invalid_fraction = 1.0
+        self.min_validated_values = 1000
+        self.duplicates = "allow"
+        self.group_by = ""
         self.config_data = self.read_config()
 
     def is_valid_config(self):
@@ -31,28 +95,60 @@ class Config:
         Returns:
             bool: True if the configuration is valid, False otherwise.
         """
-        config_path = os.path.join(os.getcwd(), "config.json")
+        config_path = self.config_path
         # Check if the file path exists
         if not os.path.exists(config_path):
             print(f"Error: File '{config_path}' does not exist.")
             return False
 
-        # Extract the file extension
-        _, file_extension = os.path.splitext(self.path)
-
-        # Check if the file extension corresponds to a valid data type or a close match
-        valid_extensions = ['.json', '.xml', '.csv']
-        if file_extension.lower() not in valid_extensions:
-            # Find close matches using difflib
-            close_matches = difflib.get_close_matches(file_extension.lower(), valid_extensions)
-            
-            # Display an error message with close matches
-            #print(f"Error: Invalid file type for '{self.path}'. "
-            #      f"Supported types are JSON, XML, and CSV. Close matches: {', '.join(close_matches)}")
-            raise UnsupportedDataType(file_extension)
+        paths = self.get_paths()
+        if len(paths) == 0:
+            print(f"Error: No data file matches '{self.path}'.")
             return False
+
+        for path in paths:
+            # Extract the file extension
+            _, file_extension = os.path.splitext(path)
+
+            # Check if the file extension corresponds to a valid data type or a close match
+            valid_extensions = ['.json', '.ndjson', '.jsonl', '.xml', '.csv']
+            if file_extension.lower() not in valid_extensions:
+                # Find close matches using difflib
+                close_matches = difflib.get_close_matches(file_extension.lower(), valid_extensions)
+
+                # Display an error message with close matches
+                #print(f"Error: Invalid file type for '{path}'. "
+                #      f"Supported types are JSON, XML, and CSV. Close matches: {', '.join(close_matches)}")
+                raise UnsupportedDataType(file_extension)
+                return False
         return True
 
+    def get_paths(self):
+        """
+        Expands the path property into the list of data files.
+        Glob patterns are expanded in sorted order, plain paths are kept as they are.
+
+        Returns:
+            list: The data file paths.
+        """
+        patterns = self.path if isinstance(self.path, list) else [self.path]
+        paths = []
+        for pattern in patterns:
+            if glob.has_magic(pattern):
+                paths.extend(sorted(glob.glob(pattern)))
+            elif pattern:
+                paths.append(pattern)
+        return paths
+
+    def is_multi_file(self):
+        """
+        Checks if the path property names more than a single file (a list or a glob pattern).
+
+        Returns:
+            bool: True if the data comes from several files, False otherwise.
+        """
+        return isinstance(self.path, list) or glob.has_magic(self.path)
+
     def read_config(self):
         """
         Reads the configuration data from the file and initializes attributes.
@@ -62,7 +158,7 @@ class Config:
         """
         # Read the configuration from the existing file
         try:
-            config_path = os.path.join(os.getcwd(), "config.json")
+            config_path = self.config_path
             with open(config_path, 'r') as json_file:
                 config_data = json.load(json_file)
 
@@ -72,6 +168,30 @@ class Config:
             self.entity_collection = config_data.get('entity_collection', '')
             self.base_field = config_data.get('base_field', '')
             self.computable_fields = config_data.get('computable_fields', [])
+            self.columnar = config_data.get('columnar', False)
+            self.batch_size = config_data.get('batch_size', 10000)
+            self.workers = config_data.get('workers', 1)
+            self.large_data_threshold = config_data.get('large_data_threshold', 2000)
+            self.max_chart_points = config_data.get('max_chart_points', 2000)
+            self.top_n = config_data.get('top_n', 50)
+            self.top_k = config_data.get('top_k', 20)
+            self.cache = config_data.get('cache', False)
+            self.cache_dir = config_data.get('cache_dir', ".cache")
+            self.cache_size_mb = config_data.get('cache_size_mb', 1024)
+            self.incremental = config_data.get('incremental', False)
+            self.online_statistics = config_data.get('online_statistics', False)
+            self.quantile_error = config_data.get('quantile_error', 0.01)
+            self.mode_error = config_data.get('mode_error', 0.001)
+            self.instrumentation = config_data.get('instrumentation', "")
+            self.trace_path = config_data.get('trace_path', "trace.json")
+            self.trace_memory = config_data.get('trace_memory', True)
+            self.validation_report = config_data.get('validation_report', "table")
+            self.validation_path = config_data.get('validation_path', "validation.json")
+            self.validation_samples = config_data.get('validation_samples', 5)
+            self.max_invalid_fraction = config_data.get('max_invalid_fraction', 1.0)
+            self.min_validated_values = config_data.get('min_validated_values', 1000)
+            self.duplicates = config_data.get('duplicates', "allow")
+            self.group_by = config_data.get('group_by', "")
 
             if not self.is_valid_config():
                 return "Configuration not valid"  # If configuration is not valid return a message
@@ -103,7 +223,7 @@ class Config:
 
     def write_config(self):
         """
-        Helps to write a config and store it in current directory
+        Helps to write a config and store it at config_path (config.json in current directory by default)
         :return: none
         """
         config_val = {
@@ -111,9 +231,33 @@ class Config:
             "entity_collection": self.entity_collection,
             "base_field": self.base_field,
             "computable_fields": self.computable_fields,
-            "path": self.path
+            "path": self.path,
+            "columnar": self.columnar,
+            "batch_size": self.batch_size,
+            "workers": self.workers,
+            "large_data_threshold": self.large_data_threshold,
+            "max_chart_points": self.max_chart_points,
+            "top_n": self.top_n,
+            "top_k": self.top_k,
+            "cache": self.cache,
+            "cache_dir": self.cache_dir,
+            "cache_size_mb": self.cache_size_mb,
+            "incremental": self.incremental,
+            "online_statistics": self.online_statistics,
+            "quantile_error": self.quantile_error,
+            "mode_error": self.mode_error,
+            "instrumentation": self.instrumentation,
+            "trace_path": self.trace_path,
+            "trace_memory": self.trace_memory,
+            "validation_report": self.validation_report,
+            "validation_path": self.validation_path,
+            "validation_samples": self.validation_samples,
+            "max_invalid_fraction": self.max_invalid_fraction,
+            "min_validated_values": self.min_validated_values,
+            "duplicates": self.duplicates,
+            "group_by": self.group_by
         }
-        config_path = os.path.join(os.getcwd(), "config.json")
-        os.makedirs(os.path.dirname(config_path), exist_ok=True)
+        config_path = self.config_path
+        os.makedirs(os.path.dirname(os.path.abspath(config_path)), exist_ok=True)
         with open(config_path, 'w') as json_file:
             json.dump(config_val, json_file, indent=4)
\ No newline at end of file
@@ -0,0 +1,125 @@
+import numpy as np
+
+def lttb(y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+    Keeps the first and the last point and, for every bucket in between, the point forming the largest triangle
+    with the point kept in the previous bucket and the average of the next bucket, so peaks and dips are preserved.
+
+    Parameters:
+        y: numpy.ndarray
+            Y-axis data, the x-axis is the row position.
+        threshold: int
+            Number of points to keep.
+
+    Returns:
+        numpy.ndarray
+            Sorted positions of the kept points.
+    """
+    size = len(y)
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, size - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_end = size - 1, size
+        average_x = (next_start + next_end - 1) / 2
+        average_y = y[next_start:next_end].mean()
+        positions = np.arange(start, end)
+        area = np.abs((previous - average_x) * (y[start:end] - y[previous])
+                      - (previous - positions) * (average_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    selected[-1] = size - 1
+    return selected
+
+def top_n(y, n):
+    """
+    Finds the n largest values with a partial selection instead of a full sort.
+
+    Parameters:
+        y: numpy.ndarray
+            Y-axis data.
+        n: int
+            Number of values to keep.
+
+    Returns:
+        numpy.ndarray
+            Positions of the n largest values, largest first.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    if n >= len(y):
+        return np.argsort(-y, kind='stable')
+    positions = np.argpartition(-y, n)[:n]
+    return positions[np.argsort(-y[positions], kind='stable')]
+
+def box_stats(y, fliers=False):
+    """
+    Computes the statistics of a box plot, without its outliers unless asked,
+    so it can be drawn from a bounded amount of data.
+    The whiskers reach the furthest values within 1.5 times the interquartile range, like matplotlib's boxplot.
+
+    Parameters:
+        y: numpy.ndarray
+            Y-axis data.
+        fliers: bool
+            True to keep the values beyond the whiskers.
+
+    Returns:
+        dict
+            The statistics, in the format of matplotlib's Axes.bxp.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    q1, median, q3 = np.percentile(y, [25, 50, 75])
+    iqr = q3 - q1
+    low = y[y >= q1 - 1.5 * iqr]
+    high = y[y <= q3 + 1.5 * iqr]
+    whislo = low.min() if len(low) else q1
+    whishi = high.max() if len(high) else q3
+    return {'med': median, 'q1': q1, 'q3': q3, 'mean': y.mean(), 'whislo': whislo, 'whishi': whishi,
+            'fliers': y[(y < whislo) | (y > whishi)] if fliers else []}
+
+class DownsampledSeries:
+    """
+    The bounded data the charts of a field with many entities are drawn from.
+    It's computed once from the whole series and only keeps what the charts show:
+    the top n entities of the bar chart, the LTTB points of the line chart, a 2D histogram for the density plot
+    and the box plot statistics. The ids are only looked up for the bars and the labelled ticks,
+    so neither the work per page nor what's sent to a worker process grows with the number of entities.
+
+    Parameters:
+        y: numpy.ndarray
+            Y-axis data.
+        get_ids: callable
+            Returns the ids of some row positions, Eg:- EntityCollection.get_ids.
+        top_count: int
+            Number of bars.
+        max_points: int
+            Number of points kept in the line chart.
+        ticks: int
+            Number of labelled ticks of the line chart.
+        bins: int
+            Number of bins of the density plot along each axis.
+    """
+    def __init__(self, y, get_ids, top_count, max_points, ticks, bins):
+        y = np.asarray(y, dtype=np.float64)
+        self.size = len(y)
+        positions = top_n(y, top_count)
+        self.top_ids = get_ids(positions)
+        self.top_values = y[positions]
+        self.line_positions = lttb(y, max_points)
+        self.line_values = y[self.line_positions]
+        self.tick_positions = self.line_positions[np.linspace(0, len(self.line_positions) - 1, ticks).astype(int)]
+        self.tick_ids = get_ids(self.tick_positions)
+        self.density = np.histogram2d(np.arange(self.size), y, bins=bins)
+        self.box = box_stats(y)
+
+    def __len__(self):
+        return self.size
@@ -1,18 +1,91 @@
+import sys
 import numpy as np
-from scipy.stats import mode
+from data_processor.online_stats import StatisticsEngine, PERCENTILES, sorted_quantile
+from data_processor.instrumentation import stage
+from data_processor.validation import ValidationReport, get_reason
+from data_processor.buffer_pool import default_pool
+from data_processor.grouping import remap_codes, summarize_groups
+
+INITIAL_CAPACITY = 1024
+# what happens to a row whose entity id is already in the collection, see EntityCollection.extend
+DUPLICATE_POLICIES = ['allow', 'keep-first', 'keep-last', 'sum', 'mean']
+METRICS = ['mean', 'mode', 'median'] + ['p{}'.format(percentile) for percentile in PERCENTILES] + ['min', 'max', 'count']
+
+def _to_float(field, value, entity_id, validation=None):
+    """
+    Helps to convert a single value into float.
+    Non numeric values, NaN included, are skipped the same way for every storage mode and as in to_numeric,
+    and recorded in the validation report if any.
+
+    Parameters:
+    - field (str): The field the value belongs to.
+    - value (Any): The raw value.
+    - entity_id (str): The ID or label of the entity, recorded with a rejected value.
+    - validation (ValidationReport): The report the value is recorded in (optional).
+
+    Returns:
+    - float or None: The converted value, or None if it is not numeric.
+    """
+    try:
+        converted = float(value)
+    except (ValueError, TypeError):
+        converted = None
+    if converted != converted:
+        # NaN is missing, like in to_numeric
+        converted = None
+    if validation is not None:
+        rejections = {get_reason(value): [0]} if converted is None else {}
+        validation.record(field, [entity_id], rejections)
+    return converted
+
+def to_numeric(field, raw_values, ids, validation=None):
+    """
+    Helps to convert a whole column of raw values into float64 in one go.
+    The common all numeric case is converted by numpy directly and only costs one vectorized NaN check,
+    only when it fails the values are converted one by one and the non numeric ones are skipped.
+    Skipped values are counted in the validation report, nothing is printed per value.
+
+    Parameters:
+    - field (str): The field the values belong to.
+    - raw_values (sequence): The raw values, in row order.
+    - ids (sequence): The entity ids of the rows, recorded with the rejected values.
+    - validation (ValidationReport): The report the rejected values are recorded in (optional).
+
+    Returns:
+    - (numpy.ndarray, numpy.ndarray): float64 values and boolean validity mask.
+    """
+    try:
+        values = np.array(raw_values, dtype=np.float64)
+    except (ValueError, TypeError):
+        values = np.full(len(raw_values), np.nan)
+        for position, value in enumerate(raw_values):
+            try:
+                values[position] = float(value)
+            except (ValueError, TypeError):
+                pass
+    mask = ~np.isnan(values)
+    if validation is not None:
+        rejections = {}
+        if not mask.all():
+            # only the rejected values are looked at one by one to tell why
+            for position in np.flatnonzero(~mask).tolist():
+                rejections.setdefault(get_reason(raw_values[position]), []).append(position)
+        validation.record(field, ids, rejections)
+    return values, mask
 
 class Entity:
-    def __init__(self, entity_id, field_value_pairs = { }):
+    def __init__(self, entity_id, field_value_pairs=None):
         """
         Initialize an Entity instance.
-        Giving a default value as dictionary as sometimes the process add entity field_value_pairs later
+        field_value_pairs is optional as sometimes the process add entity field_value_pairs later
 
         Parameters:
         - entity_id (str): The ID or label of the entity.
         - field_value_pairs (dict): Key-value pairs representing the characteristics of the entity.
         """
         self.entity_id = entity_id
-        self.field_value_pairs = self.validate_and_convert(field_value_pairs)
+        self._collection = None
+        self.field_value_pairs = self.validate_and_convert(field_value_pairs or {})
 
     def validate_and_convert(self, field_value_pairs):
         """
@@ -26,11 +99,10 @@ class Entity:
         NOTE:Converting entity_identifier to
         """
         validated_pairs = {}
+        validation = self._collection.validation if self._collection is not None else None
         for field, value in field_value_pairs.items():
-            try:
-                validated_value = float(value)
-            except (ValueError, TypeError):
-                print(f"Skipping value for field '{field}' in entity '{self.entity_id}' as it is not numeric.")
+            validated_value = _to_float(field, value, self.entity_id, validation)
+            if validated_value is None:
                 continue
             validated_pairs[field] = validated_value
         return validated_pairs
@@ -46,17 +118,228 @@ class Entity:
         """
         validated_field_value = self.validate_and_convert({field: value})
         self.field_value_pairs.update(validated_field_value)
+        if self._collection is not None:
+            self._collection._invalidate()
+
+class EntityView:
+    """
+    Lightweight view over one row of a columnar EntityCollection.
+    It behaves like an Entity, but reads and writes straight into the column arrays of the collection,
+    so no dictionary is kept per row.
+    """
+    __slots__ = ('_collection', '_position')
+
+    def __init__(self, collection, position):
+        """
+        Initialize an EntityView instance.
+
+        Parameters:
+        - collection (EntityCollection): The columnar collection that owns the data.
+        - position (int): The row position of the entity in the collection.
+        """
+        self._collection = collection
+        self._position = position
+
+    @property
+    def entity_id(self):
+        """
+        Returns:
+        - str: The ID or label of the entity.
+        """
+        return self._collection._ids[self._position]
+
+    @property
+    def field_value_pairs(self):
+        """
+        Builds the key-value pairs of the entity from the valid values of every column.
+
+        Returns:
+        - dict: Key-value pairs representing the characteristics of the entity.
+        """
+        pairs = {}
+        for field, values in self._collection._columns.items():
+            if self._collection._masks[field][self._position]:
+                pairs[field] = float(values[self._position])
+        return pairs
+
+    def add(self, field, value):
+        """
+        this helps to add field value pairs in loop
+        when the entity is known
+
+        Parameters:
+        - field (string):  represents the attribute of the entity.Eg: - Student's Subject - English
+        - field (int):  represents the value of the entity.Eg: - Student's score - 90
+        """
+        validated_value = _to_float(field, value, self.entity_id, self._collection.validation)
+        if validated_value is not None:
+            self._collection._set_value(self._position, field, validated_value)
+
+class _DuplicateEntity:
+    """
+    Entity returned by EntityCollection.add_entity for an id that is already in the collection.
+    Its values are not stored as another row: each added value is merged into the row of that id
+    with the duplicates policy of the collection, exactly like a duplicate row given to extend.
+    """
+    __slots__ = ('_collection', '_row', 'entity_id')
+
+    def __init__(self, collection, row, entity_id):
+        """
+        Initialize a _DuplicateEntity instance.
+
+        Parameters:
+        - collection (EntityCollection): The collection that owns the row.
+        - row (int): The row position of the entity with that id.
+        - entity_id (str): The ID or label of the entity.
+        """
+        self._collection = collection
+        self._row = row
+        self.entity_id = entity_id
+
+    @property
+    def field_value_pairs(self):
+        """
+        Returns:
+        - dict: The key-value pairs of the row the values are merged into.
+        """
+        return self._collection.items[self._row].field_value_pairs
+
+    def add(self, field, value):
+        """
+        this helps to add field value pairs in loop
+        when the entity is known
+
+        Parameters:
+        - field (string):  represents the attribute of the entity.Eg: - Student's Subject - English
+        - field (int):  represents the value of the entity.Eg: - Student's score - 90
+        """
+        validated_value = _to_float(field, value, self.entity_id, self._collection.validation)
+        if validated_value is None:
+            return
+        columns = {field: (np.array([validated_value]), np.ones(1, dtype=bool))}
+        self._collection._merge_duplicates(np.zeros(1, dtype=np.int64), np.array([self._row], dtype=np.int64), columns, None)
+        self._collection._invalidate()
+
+class _EntityViewSequence:
+    """
+    Read only sequence of EntityView objects.
+    The views are created only when they are accessed.
+    """
+    def __init__(self, collection):
+        """
+        Parameters:
+        - collection (EntityCollection): The columnar collection.
+        """
+        self._collection = collection
+
+    def __len__(self):
+        return len(self._collection)
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("EntityCollection index out of range")
+        return EntityView(self._collection, position)
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield EntityView(self._collection, position)
 
 class EntityCollection:
-    def __init__(self, items=[]):
+    def __init__(self, items=None, columnar=False, buffer_pool=None, duplicates='allow'):
         """
         Initialize an EntityCollection instance.
+        Every collection has its own storage, a list given as items is used as is and not copied.
 
         Parameters:
         - items (list): List of Entity instances (optional).
+        - columnar (bool): If True, the values are stored as one float64 array per field
+          with a validity mask, instead of one Entity object per row.
+        - buffer_pool (BufferPool): The pool the column arrays are taken from and given back to by clear(),
+          the pool shared by the whole process by default.
+        - duplicates (str): What happens to an added row whose entity id is already in the collection,
+          one of DUPLICATE_POLICIES. 'allow' adds it as another entity, the others merge it into the existing one:
+          'keep-first' drops it, 'keep-last' replaces the values, 'sum' and 'mean' combine the values field by field.
+
+        Entities are found by id in constant time with get(): a hash index from entity id to row position
+        is built on first use, or as soon as rows are added with a duplicates policy, and kept up to date afterwards.
+
+        The rows can be partitioned on a categorical field, `group_by`: every row then has the code of its group,
+        the index of its label in `categories`, or -1 when its label is missing. See summarize_groups.
         """
-        self.items = items
+        if duplicates not in DUPLICATE_POLICIES:
+            raise ValueError("Unknown duplicates policy {}, expected one of {}".format(duplicates, ", ".join(DUPLICATE_POLICIES)))
+        self.columnar = columnar
+        self.buffer_pool = buffer_pool if buffer_pool is not None else default_pool
+        self.duplicates = duplicates
         self.fields = []
+        self.statistics = None
+        self.validation = None
+        self.group_by = None
+        self.categories = []
+        self._category_index = {}
+        self._group_code_parts = []
+        self._summary_cache = {}
+        self._group_summary_cache = {}
+        self._sorted_index = {}
+        self._column_cache = {}
+        self._id_index = None
+        self._value_counts = {}
+        if columnar:
+            self._size = 0
+            self._capacity = 0
+            self._ids = np.empty(0, dtype=object)
+            self._columns = {}
+            self._masks = {}
+            # arrays given to from_columns may be shared or memory-mapped, they are never given to the pool
+            self._owns_buffers = True
+        else:
+            self._items = items if items is not None else []
+
+    @classmethod
+    def from_columns(cls, ids, columns, fields):
+        """
+        Create a columnar collection directly backed by existing arrays, without copying them.
+        The arrays are only copied if the collection grows.
+
+        Parameters:
+        - ids (numpy.ndarray): The entity ids.
+        - columns (dict): field -> (float64 values, boolean mask), each as long as ids.
+        - fields (list): The fields of the collection.
+
+        Returns:
+        - EntityCollection
+        """
+        collection = cls(columnar=True)
+        collection.fields = list(fields)
+        collection._owns_buffers = False
+        collection._ids = ids
+        collection._size = len(ids)
+        collection._capacity = len(ids)
+        for field, (values, mask) in columns.items():
+            collection._columns[field] = values
+            collection._masks[field] = mask
+        return collection
+
+    @property
+    def items(self):
+        """
+        Returns:
+        - list or sequence of EntityView: The entities of the collection.
+        """
+        if self.columnar:
+            return _EntityViewSequence(self)
+        return self._items
+
+    def __len__(self):
+        """
+        Returns:
+        - int: The number of entities in the collection.
+        """
+        if self.columnar:
+            return self._size
+        return len(self._items)
 
     def add(self, entity_id: str, field_values: dict):
         """
@@ -66,8 +349,20 @@ class EntityCollection:
         - entity_id (str): The ID or label of the entity.
         - field_values (dict): Key-value pairs representing the characteristics of the entity.
         """
-        new_entity = Entity(entity_id, field_values)
-        self.items.append(new_entity)
+        if self.duplicates != 'allow':
+            self.extend([entity_id], {field: [value] for field, value in field_values.items()})
+            return
+        if self.columnar:
+            new_entity = self.add_entity(entity_id)
+            for field, value in field_values.items():
+                new_entity.add(field, value)
+            return
+        new_entity = Entity(entity_id, {})
+        new_entity._collection = self
+        new_entity.field_value_pairs = new_entity.validate_and_convert(field_values)
+        self._items.append(new_entity)
+        self._index_entity(entity_id)
+        self._invalidate()
 
     def add_entity(self, value):
         """
@@ -79,12 +374,367 @@ class EntityCollection:
         - entity_id (str): The ID or label of the entity. Eg:- A student's name
 
         Returns:
-        - Entity
+        - Entity or EntityView: The new entity. Unless duplicates are allowed, an entity whose id is already
+          in the collection is not added again: the values added to the returned entity are merged
+          into the existing row with the duplicates policy, see extend.
         """
-        new_entity = Entity(value, {})
-        self.items.append(new_entity)
+        if self.duplicates != 'allow' and value in self._get_id_index():
+            row = self._get_id_index()[value]
+            # a duplicate without values: 'keep-last' takes its group, like a duplicate row of extend would
+            self._merge_duplicates(np.zeros(1, dtype=np.int64), np.array([row], dtype=np.int64), {}, self._remap_groups(None, 1))
+            self._invalidate()
+            return _DuplicateEntity(self, row, value)
+        if self.columnar:
+            self._ensure_capacity(self._size + 1)
+            self._ids[self._size] = value
+            self._size += 1
+            new_entity = EntityView(self, self._size - 1)
+        else:
+            new_entity = Entity(value, {})
+            new_entity._collection = self
+            self._items.append(new_entity)
+        self._append_group_codes(self._remap_groups(None, 1))
+        self._index_entity(value)
+        self._invalidate()
         return new_entity
 
+    def get(self, entity_id, default=None):
+        """
+        Find an entity by id in constant time, with the hash index from entity id to row position.
+        When duplicates are allowed, the first entity with that id is returned.
+
+        Parameters:
+        - entity_id (str): The ID or label of the entity.
+        - default (Any): The value returned when no entity has this id.
+
+        Returns:
+        - Entity or EntityView, or default.
+        """
+        row = self._get_id_index().get(entity_id)
+        if row is None:
+            return default
+        return self.items[row]
+
+    def extend(self, ids, columns, groups=None):
+        """
+        Add a batch of entities to the collection at once.
+        Every column is converted with one vectorized call instead of one call per value.
+
+        Parameters:
+        - ids (sequence): The IDs or labels of the new entities.
+        - columns (dict): field -> sequence of raw values, in the same order as ids,
+          or an already converted (float64 values, boolean mask) tuple.
+        - groups (list, numpy.ndarray): The group labels and the group code of every new entity,
+          as returned by grouping.encode_categories. Ignored when the collection has no group_by.
+
+        Unless `duplicates` is 'allow', a row whose id is already in the collection, or earlier in the batch,
+        is merged into the row of that id with the duplicates policy instead of being added.
+        """
+        converted = {field: column if isinstance(column, tuple) else to_numeric(field, column, ids, self.validation)
+                     for field, column in columns.items()}
+        codes = self._remap_groups(groups, len(ids))
+        duplicates = self._index_batch(ids)
+        batch_columns, batch_codes = converted, codes
+        if duplicates is not None:
+            new_positions = duplicates[0]
+            ids = [ids[position] for position in new_positions]
+            converted = {field: (values[new_positions], mask[new_positions]) for field, (values, mask) in converted.items()}
+            codes = codes[new_positions] if codes is not None else None
+        self._append_group_codes(codes)
+        if self.columnar:
+            start = self._size
+            end = start + len(ids)
+            self._ensure_capacity(end)
+            self._ids[start:end] = ids
+            for field, (values, mask) in converted.items():
+                if field not in self._columns:
+                    self._add_column(field)
+                self._columns[field][start:end] = values
+                self._masks[field][start:end] = mask
+            self._size = end
+        else:
+            for position, entity_id in enumerate(ids):
+                new_entity = Entity(entity_id, {})
+                new_entity.field_value_pairs = {field: float(values[position])
+                                                for field, (values, mask) in converted.items() if mask[position]}
+                new_entity._collection = self
+                self._items.append(new_entity)
+        if duplicates is not None:
+            self._merge_duplicates(duplicates[1], duplicates[2], batch_columns, batch_codes)
+        self._invalidate()
+
+    def merge(self, other):
+        """
+        Append every entity of another collection, keeping its row order.
+        Fields that are new to this collection are added to `fields`
+        and the running statistics and the validation report of the other collection, if any, are merged into this one.
+        Entities whose id is already in this collection follow its duplicates policy.
+
+        Parameters:
+        - other (EntityCollection): The collection to append, in any storage mode.
+        """
+        for field in other.fields:
+            if field not in self.fields:
+                self.fields.append(field)
+        if other.statistics is not None:
+            if self.statistics is None:
+                self.statistics = StatisticsEngine(other.statistics.quantile_error, other.statistics.mode_error)
+            self.statistics.merge(other.statistics)
+            self._invalidate()
+        if other.validation is not None:
+            if self.validation is None:
+                self.validation = ValidationReport.from_state(other.validation.to_state())
+            else:
+                self.validation.merge(other.validation)
+        groups = None
+        if other.group_by is not None:
+            if self.group_by is None:
+                self.set_groups(other.group_by, [], np.full(len(self), -1, dtype=np.int32))
+            groups = (other.categories, other.get_group_codes())
+        self.extend(list(other.get_ids()), {field: other.get_column(field) for field in other.fields}, groups)
+
+    def select(self, fields):
+        """
+        Create a collection with only some of the fields, sharing the data of this one instead of copying it.
+        Summaries already computed for these fields are shared too.
+        It's meant for reading, Eg:- several reports over one parse.
+
+        Parameters:
+        - fields (list): The fields to keep.
+
+        Returns:
+        - EntityCollection
+        """
+        if self.columnar:
+            collection = EntityCollection.from_columns(self.get_ids(), {field: self.get_column(field) for field in fields}, fields)
+        else:
+            collection = EntityCollection(self._items)
+            collection.fields = list(fields)
+            collection._column_cache = {field: self._column_cache[field] for field in fields if field in self._column_cache}
+        collection.statistics = self.statistics
+        collection.validation = self.validation
+        if self.group_by is not None:
+            collection.set_groups(self.group_by, self.categories, self.get_group_codes())
+            collection._group_summary_cache = {field: self._group_summary_cache[field]
+                                               for field in fields if field in self._group_summary_cache}
+        collection._summary_cache = {field: self._summary_cache[field] for field in fields if field in self._summary_cache}
+        collection._sorted_index = {field: self._sorted_index[field] for field in fields if field in self._sorted_index}
+        collection.duplicates = self.duplicates
+        collection._id_index = self._id_index
+        return collection
+
+    def set_groups(self, group_by, categories, codes):
+        """
+        Partition the rows on a categorical field with already known group codes, Eg:- loaded from the cache.
+
+        Parameters:
+        - group_by (str): The categorical field.
+        - categories (list): The group labels, in code order.
+        - codes (numpy.ndarray): The group code of every row, -1 for no group.
+        """
+        self.group_by = group_by
+        self.categories = list(categories)
+        self._category_index = {label: code for code, label in enumerate(self.categories)}
+        self._group_code_parts = [codes]
+        self._group_summary_cache.clear()
+
+    def get_group_codes(self):
+        """
+        Get the group code of every row, in row order. The codes of the added batches are concatenated on first use.
+
+        Returns:
+        - numpy.ndarray: int32 codes, indexes in `categories`, -1 for no group. Empty without group_by.
+        """
+        if len(self._group_code_parts) != 1:
+            self._group_code_parts = [np.concatenate(self._group_code_parts) if self._group_code_parts
+                                      else np.empty(0, dtype=np.int32)]
+        return self._group_code_parts[0]
+
+    def summarize_groups(self, fields):
+        """
+        Compute every metric (mean, mode, median, min, max and count) of every group for the given fields.
+        The rows were hash-partitioned once on `group_by` while parsing, and the metrics of all the groups
+        of a field come from a single vectorized pass over its column. The results are cached per field until the collection changes.
+
+        Parameters:
+        - fields (list): The fields to summarize.
+
+        Returns:
+        - dict: field -> dict of group label -> metric name -> value, groups in order of first appearance.
+          The metrics are None when a group has no value of the field. Empty without group_by.
+        """
+        if self.group_by is None:
+            return {}
+        codes = self.get_group_codes()
+        summary = {}
+        for field in fields:
+            if field not in self._group_summary_cache:
+                with stage("group statistics {}", field) as statistics_stage:
+                    values, mask = self.get_column(field)
+                    statistics_stage.add_rows(int(mask.sum()))
+                    groups = summarize_groups(values[mask], codes[mask], len(self.categories))
+                    self._group_summary_cache[field] = {
+                        label: group if group is not None else {metric: None for metric in METRICS}
+                        for label, group in zip(self.categories, groups)}
+            summary[field] = self._group_summary_cache[field]
+        return summary
+
+    def clear(self):
+        """
+        Remove every entity, field, cached summary, running statistics and validation report,
+        so the collection can be reused, Eg:- by a long-running process analyzing one dataset after another.
+        In columnar mode the arrays of the collection are given back to its buffer pool and reused by the next
+        collections: columns returned by get_column and collections made by select() must not be used afterwards.
+        """
+        if self.columnar:
+            if self._owns_buffers:
+                for array in [self._ids] + list(self._columns.values()) + list(self._masks.values()):
+                    if len(array) > 0:
+                        self.buffer_pool.release(array)
+            self._size = 0
+            self._capacity = 0
+            self._ids = np.empty(0, dtype=object)
+            self._columns = {}
+            self._masks = {}
+            self._owns_buffers = True
+        else:
+            # a new list, as collections made by select() share the old one
+            self._items = []
+        self.fields = []
+        self.statistics = None
+        self.validation = None
+        self.group_by = None
+        self.categories = []
+        self._category_index = {}
+        self._group_code_parts = []
+        self._id_index = None
+        self._value_counts = {}
+        self._invalidate()
+
+    def memory_footprint(self, deep=False):
+        """
+        Report the memory used by the collection, in bytes.
+        In object mode every Entity and its dictionary are measured, which takes a pass over the entities.
+
+        Parameters:
+        - deep (bool): If True, the entity id objects are measured too, one by one.
+
+        Returns:
+        - dict: 'entities' and 'fields' counts, then the bytes of the 'ids', the field 'values', the validity 'masks',
+          the 'unused' capacity allocated ahead for new rows, the 'caches' of extracted columns and sorted indexes, the 'groups' codes,
+          the 'index' from entity id to row (its hash table, the ids are counted in 'ids') with the counts of the merged values,
+          and their 'total'.
+          'shared' is True when the arrays may be shared with another collection or memory-mapped from the cache.
+        """
+        footprint = {'entities': len(self), 'fields': len(self.fields), 'ids': 0, 'values': 0, 'masks': 0,
+                     'unused': 0, 'caches': 0, 'groups': 0, 'index': 0, 'shared': False}
+        if self.columnar:
+            arrays = list(self._columns.values()) + list(self._masks.values())
+            footprint['ids'] = self._size * self._ids.itemsize
+            footprint['values'] = sum(self._size * values.itemsize for values in self._columns.values())
+            footprint['masks'] = sum(self._size * mask.itemsize for mask in self._masks.values())
+            footprint['unused'] = sum((len(array) - self._size) * array.itemsize for array in arrays + [self._ids])
+            footprint['shared'] = not self._owns_buffers
+            ids = self._ids[:self._size]
+        else:
+            float_size = sys.getsizeof(0.0)
+            footprint['ids'] = sys.getsizeof(self._items)
+            footprint['values'] = sum(sys.getsizeof(entity) + sys.getsizeof(entity.__dict__)
+                                      + sys.getsizeof(entity.field_value_pairs) + float_size * len(entity.field_value_pairs)
+                                      for entity in self._items)
+            ids = (entity.entity_id for entity in self._items)
+        if deep:
+            footprint['ids'] += sum(sys.getsizeof(entity_id) for entity_id in ids)
+        footprint['caches'] = sum(values.nbytes + mask.nbytes for values, mask in self._column_cache.values())
+        footprint['caches'] += sum(positions.nbytes + values.nbytes for positions, values in self._sorted_index.values())
+        footprint['groups'] = sum(codes.nbytes for codes in self._group_code_parts)
+        footprint['index'] = sys.getsizeof(self._id_index) if self._id_index is not None else 0
+        footprint['index'] += sum(counts.nbytes for counts in self._value_counts.values())
+        footprint['total'] = sum(footprint[part] for part in ('ids', 'values', 'masks', 'unused', 'caches', 'groups', 'index'))
+        return footprint
+
+    def has_values(self):
+        """
+        Helps to check if at least one entity has a valid field value.
+
+        Returns:
+        - bool: True if any value is present, False otherwise.
+        """
+        if self.columnar:
+            return any(mask[:self._size].any() for mask in self._masks.values())
+        return any(len(entity.field_value_pairs) != 0 for entity in self._items)
+
+    def get_ids(self, positions=None):
+        """
+        Get the entity ids of the collection in row order, or of some rows only.
+        The ids of some rows are read without building the id array of the whole collection in object mode.
+
+        Parameters:
+        - positions (numpy.ndarray): The row positions, every row when None.
+
+        Returns:
+        - numpy.ndarray: Array of entity ids.
+        """
+        if positions is not None:
+            if self.columnar:
+                return self._ids[positions]
+            return np.array([self._items[position].entity_id for position in positions], dtype=object)
+        if self.columnar:
+            return self._ids[:self._size]
+        return np.array([entity.entity_id for entity in self._items], dtype=object)
+
+    def get_column(self, key):
+        """
+        Get the values of a field for every entity, in row order, with a validity mask.
+        Missing values are stored as NaN and marked False in the mask.
+        In columnar mode they are views of the storage, valid until the collection grows or is cleared.
+
+        Parameters:
+        - key (str): The field for which to retrieve the values.
+
+        Returns:
+        - (numpy.ndarray, numpy.ndarray): float64 values and boolean mask.
+        """
+        if self.columnar:
+            if key not in self._columns:
+                return np.full(self._size, np.nan), np.zeros(self._size, dtype=bool)
+            return self._columns[key][:self._size], self._masks[key][:self._size]
+        if key not in self._column_cache:
+            values = np.array([entity.field_value_pairs.get(key, np.nan) for entity in self._items], dtype=np.float64)
+            mask = np.array([key in entity.field_value_pairs for entity in self._items], dtype=bool)
+            self._column_cache[key] = (values, mask)
+        return self._column_cache[key]
+
+    def summarize(self, fields):
+        """
+        Compute every metric (mean, mode, median, percentiles, min, max and count) for the given fields.
+        Each column is extracted once and all metrics are derived from a single sort of its valid values,
+        the sorted index of the field is reused when it was already built.
+        The results are cached per field until the collection changes.
+        When `statistics` holds running FieldStatistics for a field (Eg:- incremental parsing),
+        the metrics come from them instead of the values in the collection.
+
+        Parameters:
+        - fields (list): The fields to summarize.
+
+        Returns:
+        - dict: field -> dict of metric name -> value. The metrics are None when a field has no values.
+        """
+        summary = {}
+        for field in fields:
+            if field not in self._summary_cache:
+                with stage("statistics {}", field) as statistics_stage:
+                    if self.statistics is not None and field in self.statistics:
+                        self._summary_cache[field] = self.statistics[field].summary()
+                    elif field in self._sorted_index:
+                        self._summary_cache[field] = self._summarize_sorted(self._sorted_index[field][1])
+                    else:
+                        values = self._get_values_for_key(field)
+                        statistics_stage.add_rows(len(values))
+                        self._summary_cache[field] = self._summarize_sorted(np.sort(values))
+            summary[field] = self._summary_cache[field]
+        return summary
+
     def compute_mean(self, key):
         """
         Compute the mean of the values associated with a specific key across all entities.
@@ -95,8 +745,7 @@ class EntityCollection:
         Returns:
         - float or None: The mean of the values associated with the key, or None if no values are found.
         """
-        values = self._get_values_for_key(key)
-        return np.mean(values) if values else None
+        return self.summarize([key])[key]['mean']
 
     def compute_mode(self, key):
         """
@@ -108,10 +757,7 @@ class EntityCollection:
         Returns:
         - float or None: The mode of the values associated with the key, or None if no values are found.
         """
-        values = self._get_values_for_key(key)
-        mode_values = mode(values).mode
-        mode_value = mode_values if mode_values is not list else mode_values[0]
-        return mode_value if values else None
+        return self.summarize([key])[key]['mode']
 
     def compute_median(self, key):
         """
@@ -123,8 +769,7 @@ class EntityCollection:
         Returns:
         - float or None: The median of the values associated with the key, or None if no values are found.
         """
-        values = self._get_values_for_key(key)
-        return np.median(values) if values else None
+        return self.summarize([key])[key]['median']
 
     def compute_min(self, key):
         """
@@ -136,8 +781,7 @@ class EntityCollection:
         Returns:
         - float or None: The minimum of the values associated with the key, or None if no values are found.
         """
-        values = self._get_values_for_key(key)
-        return min(values) if values else None
+        return self.summarize([key])[key]['min']
 
     def compute_max(self, key):
         """
@@ -149,8 +793,7 @@ class EntityCollection:
         Returns:
         - float or None: The maximum of the values associated with the key, or None if no values are found.
         """
-        values = self._get_values_for_key(key)
-        return max(values) if values else None
+        return self.summarize([key])[key]['max']
 
     def compute_count(self, key):
         """
@@ -162,8 +805,106 @@ class EntityCollection:
         Returns:
         - int or None: The count of the values associated with the key, or None if no values are found.
         """
-        values = self._get_values_for_key(key)
-        return len(values) if values else None
+        return self.summarize([key])[key]['count']
+
+    def compute_quantile(self, key, q):
+        """
+        Compute a quantile of the values associated with a specific key, interpolated like numpy.quantile.
+        It's read from the sorted index of the field in O(1), the index is built on first use.
+        With running statistics for the field it comes from their quantile sketch instead.
+
+        Parameters:
+        - key (str): The key for which to compute the quantile.
+        - q (float): The quantile, between 0 and 1. Eg:- 0.99 for the 99th percentile.
+
+        Returns:
+        - float or None: The quantile, or None if no values are found.
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("The quantile must be between 0 and 1, got {}".format(q))
+        if self.statistics is not None and key in self.statistics:
+            return self.statistics[key].quantiles.quantile(q)
+        _, sorted_values = self.get_sorted_index(key)
+        if len(sorted_values) == 0:
+            return None
+        return sorted_quantile(sorted_values, q)
+
+    def top_k(self, key, k, largest=True):
+        """
+        Find the k entities with the largest (or smallest) values of a specific key, in that order.
+        The sorted index of the field is sliced when it was already built,
+        otherwise only the k values are selected (numpy.argpartition) and sorted, without sorting the whole column.
+        Entities with the same value come in no particular order.
+
+        Parameters:
+        - key (str): The key to rank the entities by.
+        - k (int): The number of entities.
+        - largest (bool): True for the largest values first, False for the smallest values first.
+
+        Returns:
+        - (numpy.ndarray, numpy.ndarray): The ids of the entities and their values, at most k of each.
+        """
+        if key in self._sorted_index:
+            positions, _ = self._sorted_index[key]
+            positions = positions[::-1][:k] if largest else positions[:k]
+        else:
+            values, mask = self.get_column(key)
+            positions = np.flatnonzero(mask)
+            keys = -values[positions] if largest else values[positions]
+            if k < len(positions):
+                selected = np.argpartition(keys, k)[:k]
+                positions, keys = positions[selected], keys[selected]
+            positions = positions[np.argsort(keys, kind='stable')]
+        values, _ = self.get_column(key)
+        return self.get_ids(positions), values[positions]
+
+    def rank(self, key, entity_id):
+        """
+        Find the rank of an entity by the values of a specific key, 1 for the largest value.
+        Entities with the same value share the best rank, Eg:- 1, 2, 2, 4.
+        The entity is found with the id index and ranked with a binary search in the sorted index of the field,
+        both are built on first use.
+
+        Parameters:
+        - key (str): The key to rank the entities by.
+        - entity_id (str): The entity to rank.
+
+        Returns:
+        - (int, int) or None: The rank and the number of entities with a value, or None when the entity has no value.
+
+        Raises:
+        - KeyError: If no entity has this id.
+        """
+        row = self._get_id_index().get(entity_id)
+        if row is None:
+            raise KeyError(entity_id)
+        values, mask = self.get_column(key)
+        if not mask[row]:
+            return None
+        _, sorted_values = self.get_sorted_index(key)
+        greater = len(sorted_values) - np.searchsorted(sorted_values, values[row], side='right')
+        return int(greater) + 1, len(sorted_values)
+
+    def get_sorted_index(self, key):
+        """
+        Get the sorted index of a field: the positions of the rows with a value, in ascending order of value,
+        and the values in that order. It's built with one argsort on first use and kept until the collection changes,
+        so quantiles, top-k and rank queries don't sort the column again.
+
+        Parameters:
+        - key (str): The field.
+
+        Returns:
+        - (numpy.ndarray, numpy.ndarray): int64 row positions and float64 sorted values.
+        """
+        if key not in self._sorted_index:
+            with stage("sorted index {}", key) as index_stage:
+                values, mask = self.get_column(key)
+                positions = np.flatnonzero(mask)
+                index_stage.add_rows(len(positions))
+                positions = positions[np.argsort(values[positions], kind='stable')]
+                self._sorted_index[key] = (positions, values[positions])
+        return self._sorted_index[key]
 
     def _get_values_for_key(self, key):
         """
@@ -173,7 +914,253 @@ class EntityCollection:
         - key (str): The key for which to retrieve the values.
 
         Returns:
-        - list: List of values associated with the key.
+        - numpy.ndarray: Array of the valid values associated with the key.
+        """
+        values, mask = self.get_column(key)
+        return values[mask]
+
+    def _summarize_sorted(self, sorted_values):
+        """
+        Derives every metric from the sorted values.
+        The mode is found by counting the runs of equal values, the smallest value wins a tie.
+
+        Parameters:
+        - sorted_values (numpy.ndarray): The valid values of a field, in ascending order.
+
+        Returns:
+        - dict: metric name -> value.
+        """
+        count = sorted_values.size
+        if count == 0:
+            return {metric: None for metric in METRICS}
+        run_starts = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1]])
+        run_lengths = np.diff(np.r_[run_starts, count])
+        return {
+            'mean': sorted_values.mean(),
+            'mode': sorted_values[run_starts[np.argmax(run_lengths)]],
+            'median': (sorted_values[(count - 1) // 2] + sorted_values[count // 2]) / 2,
+            **{'p{}'.format(percentile): sorted_quantile(sorted_values, percentile / 100) for percentile in PERCENTILES},
+            'min': sorted_values[0],
+            'max': sorted_values[-1],
+            'count': count
+        }
+
+    def _invalidate(self):
+        """
+        Drops the cached summaries and columns, called every time the collection changes.
+        """
+        self._summary_cache.clear()
+        self._group_summary_cache.clear()
+        self._sorted_index.clear()
+        self._column_cache.clear()
+
+    def _remap_groups(self, groups, rows):
+        """
+        Remaps the group codes of a batch from its own numbering into the one of the collection.
+
+        Parameters:
+        - groups (list, numpy.ndarray): The group labels and codes of the batch, None when the rows have no group.
+        - rows (int): The number of rows of the batch.
+
+        Returns:
+        - numpy.ndarray or None: The codes, -1 for no group. None when the collection has no group_by.
+        """
+        if self.group_by is None:
+            return None
+        if groups is None:
+            return np.full(rows, -1, dtype=np.int32)
+        return remap_codes(self.categories, self._category_index, *groups)
+
+    def _append_group_codes(self, codes):
+        """
+        Appends the group codes of new rows, see _remap_groups.
+        """
+        if codes is not None:
+            self._group_code_parts.append(codes)
+
+    def _get_id_index(self):
+        """
+        Returns the hash index from entity id to row position, building it from the rows on first use.
+        With duplicate ids the first row is indexed.
+        """
+        if self._id_index is None:
+            # built backwards, so the first row of a duplicate id overwrites the later ones
+            ids = self.get_ids().tolist()
+            ids.reverse()
+            self._id_index = dict(zip(ids, range(len(ids) - 1, -1, -1)))
+        return self._id_index
+
+    def _index_entity(self, entity_id):
+        """
+        Adds the last added row to the id index, when the index is built.
+        """
+        if self._id_index is not None:
+            self._id_index.setdefault(entity_id, len(self) - 1)
+
+    def _index_batch(self, ids):
+        """
+        Adds the ids of a batch about to be added to the id index, and finds its duplicates.
+        The index is only maintained once it's built, unless a duplicates policy needs it.
+
+        Parameters:
+        - ids (sequence): The ids of the batch.
+
+        Returns:
+        - tuple or None: None when every row of the batch is added, otherwise the batch positions of the added rows,
+          the batch positions of the duplicates and the rows of the collection they are merged into.
+        """
+        if self.duplicates == 'allow':
+            if self._id_index is not None:
+                start = len(self)
+                for position, entity_id in enumerate(ids):
+                    self._id_index.setdefault(entity_id, start + position)
+            return None
+        index = self._get_id_index()
+        next_row = len(self)
+        new_positions, duplicate_positions, duplicate_rows = [], [], []
+        for position, entity_id in enumerate(ids):
+            row = index.setdefault(entity_id, next_row)
+            if row == next_row:
+                new_positions.append(position)
+                next_row += 1
+            else:
+                duplicate_positions.append(position)
+                duplicate_rows.append(row)
+        if not duplicate_positions:
+            return None
+        return np.array(new_positions, dtype=np.int64), np.array(duplicate_positions, dtype=np.int64), np.array(duplicate_rows, dtype=np.int64)
+
+    def _merge_duplicates(self, positions, rows, columns, codes):
+        """
+        Merges the duplicate rows of a batch into the rows with the same id, field by field, with the duplicates policy.
+        'keep-last' takes the last duplicate of every row as a whole, values, missing values and group included.
+        'sum' and 'mean' combine the valid values with one bincount per field, the mean remembers how many values
+        each row combines so later duplicates are weighted correctly.
+
+        Parameters:
+        - positions (numpy.ndarray): The batch positions of the duplicates.
+        - rows (numpy.ndarray): The row each duplicate is merged into.
+        - columns (dict): field -> (float64 values, boolean mask) of the whole batch.
+        - codes (numpy.ndarray): The group codes of the whole batch, None without group_by.
+        """
+        if self.duplicates == 'keep-first':
+            return
+        if self.duplicates == 'keep-last':
+            targets, last = np.unique(rows[::-1], return_index=True)
+            picked = positions[len(positions) - 1 - last]
+            for field, (values, mask) in columns.items():
+                self._set_values_at(field, targets, values[picked], mask[picked])
+            if codes is not None:
+                self.get_group_codes()[targets] = codes[picked]
+            return
+        for field, (values, mask) in columns.items():
+            valid = mask[positions]
+            targets, inverse = np.unique(rows[valid], return_inverse=True)
+            if len(targets) == 0:
+                continue
+            sums = np.bincount(inverse, weights=values[positions[valid]])
+            old_values, old_mask = self._get_values_at(field, targets)
+            old_values = np.where(old_mask, old_values, 0.0)
+            if self.duplicates == 'sum':
+                self._set_values_at(field, targets, old_values + sums, np.ones(len(targets), dtype=bool))
+                continue
+            counts = self._get_value_counts(field)
+            old_counts = np.where(old_mask, counts[targets], 0)
+            totals = old_counts + np.bincount(inverse)
+            self._set_values_at(field, targets, (old_values * old_counts + sums) / totals, np.ones(len(targets), dtype=bool))
+            counts[targets] = totals
+
+    def _get_value_counts(self, field):
+        """
+        Returns the number of values combined into every row of a field by the 'mean' policy, 1 for a plain row.
+        The array grows by doubling with the collection.
+        """
+        counts = self._value_counts.get(field, np.ones(0, dtype=np.int64))
+        if len(counts) < len(self):
+            grown = np.ones(max(len(self), 2 * len(counts)), dtype=np.int64)
+            grown[:len(counts)] = counts
+            counts = self._value_counts[field] = grown
+        return counts
+
+    def _get_values_at(self, field, rows):
+        """
+        Returns the values and validity mask of a field at some rows, in any storage mode.
+        """
+        if self.columnar:
+            values, mask = self.get_column(field)
+            return values[rows], mask[rows]
+        pairs = [self._items[row].field_value_pairs for row in rows]
+        return (np.array([entity_pairs.get(field, np.nan) for entity_pairs in pairs], dtype=np.float64),
+                np.array([field in entity_pairs for entity_pairs in pairs], dtype=bool))
+
+    def _set_values_at(self, field, rows, values, mask):
+        """
+        Stores already validated values of a field at some rows, in any storage mode. A False mask removes the value.
+        """
+        if self.columnar:
+            if field not in self._columns:
+                self._add_column(field)
+            self._columns[field][rows] = values
+            self._masks[field][rows] = mask
+            return
+        for row, value, valid in zip(rows.tolist(), values.tolist(), mask.tolist()):
+            if valid:
+                self._items[row].field_value_pairs[field] = value
+            else:
+                self._items[row].field_value_pairs.pop(field, None)
+
+    def _set_value(self, position, field, value):
+        """
+        Stores an already validated value in a column, creating the column when the field is new.
+
+        Parameters:
+        - position (int): The row position of the entity.
+        - field (str): The field of the value.
+        - value (float): The validated value.
+        """
+        if field not in self._columns:
+            self._add_column(field)
+        self._columns[field][position] = value
+        self._masks[field][position] = True
+        self._invalidate()
+
+    def _ensure_capacity(self, size):
+        """
+        Grows the id array and every column so that at least `size` rows fit.
+        The capacity is doubled, so appending rows one by one stays amortized constant time.
+        The new arrays come from the buffer pool and the old ones, when the collection owns them, are given back to it.
+
+        Parameters:
+        - size (int): The number of rows that should fit.
+        """
+        if size <= self._capacity:
+            return
+        capacity = max(size, 2 * self._capacity, INITIAL_CAPACITY)
+        if self._owns_buffers and self._capacity > 0:
+            old_arrays = [self._ids] + list(self._columns.values()) + list(self._masks.values())
+        else:
+            old_arrays = []
+        ids = self.buffer_pool.acquire(capacity, object, None)
+        ids[:self._size] = self._ids[:self._size]
+        self._ids = ids
+        for field in self._columns:
+            values = self.buffer_pool.acquire(capacity, np.float64, np.nan)
+            values[:self._size] = self._columns[field][:self._size]
+            mask = self.buffer_pool.acquire(capacity, bool, False)
+            mask[:self._size] = self._masks[field][:self._size]
+            self._columns[field] = values
+            self._masks[field] = mask
+        self._capacity = capacity
+        self._owns_buffers = True
+        for array in old_arrays:
+            self.buffer_pool.release(array)
+
+    def _add_column(self, field):
+        """
+        Creates the empty column and mask of a new field, taken from the buffer pool.
+
+        Parameters:
+        - field (str): The new field.
         """
-        values = [entity.field_value_pairs.get(key, None) for entity in self.items]
-        return [value for value in values if value is not None]
+        self._columns[field] = self.buffer_pool.acquire(self._capacity, np.float64, np.nan)
+        self._masks[field] = self.buffer_pool.acquire(self._capacity, bool, False)
@@ -0,0 +1,97 @@
+import numpy as np
+from data_processor.online_stats import PERCENTILES, sorted_quantile
+
+MISSING_LABELS = (None, "")
+
+def encode_categories(labels):
+    """
+    Hash-partitions a batch of categorical labels: every distinct label gets a code in order of first appearance.
+    A missing label (None or an empty string) gets the code -1 and belongs to no group.
+
+    Parameters:
+    - labels (sequence): The raw labels of the rows. Eg:- ['HR', 'IT', 'HR']
+
+    Returns:
+    - (list, numpy.ndarray): the distinct labels, and the int32 code of every row. Eg:- (['HR', 'IT'], [0, 1, 0])
+    """
+    index = {label: -1 for label in MISSING_LABELS}
+    # the missing labels are in the index too, so a new label gets the number of labels seen so far
+    offset = len(index)
+    codes = np.fromiter((index.setdefault(label, len(index) - offset) for label in labels), dtype=np.int32, count=len(labels))
+    return [label for label, code in index.items() if code >= 0], codes
+
+def summarize_groups(values, codes, group_count):
+    """
+    Computes every metric of every group in a single vectorized pass:
+    the values are sorted once by group then value, so each group is a contiguous run
+    and its count, sum, min, max, median, percentiles and mode are read at the run boundaries.
+
+    Parameters:
+    - values (numpy.ndarray): The valid values of a field.
+    - codes (numpy.ndarray): The group code of every value, -1 for no group.
+    - group_count (int): The number of groups.
+
+    Returns:
+    - list: one dict of metric name -> value per group code, None for a group without values.
+    """
+    in_group = codes >= 0
+    values = values[in_group]
+    codes = codes[in_group]
+    if len(values) == 0:
+        return [None] * group_count
+    order = np.lexsort((values, codes))
+    sorted_values = values[order]
+    sorted_codes = codes[order]
+    counts = np.bincount(sorted_codes, minlength=group_count)
+    sums = np.bincount(sorted_codes, weights=sorted_values, minlength=group_count)
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    present = counts > 0
+    # runs of equal values inside a group, the longest one of each group is its mode, the smallest value wins a tie
+    run_starts = np.flatnonzero(np.r_[True, (sorted_values[1:] != sorted_values[:-1]) | (sorted_codes[1:] != sorted_codes[:-1])])
+    run_lengths = np.diff(np.r_[run_starts, len(sorted_values)])
+    run_codes = sorted_codes[run_starts]
+    run_order = np.lexsort((run_starts, -run_lengths, run_codes))
+    first_runs = np.unique(run_codes[run_order], return_index=True)[1]
+    modes = np.full(group_count, np.nan)
+    modes[run_codes[run_order][first_runs]] = sorted_values[run_starts[run_order][first_runs]]
+    summaries = []
+    for code in range(group_count):
+        if not present[code]:
+            summaries.append(None)
+            continue
+        start, count = starts[code], counts[code]
+        group_values = sorted_values[start:start + count]
+        summaries.append({
+            'mean': sums[code] / count,
+            'mode': modes[code],
+            'median': (sorted_values[start + (count - 1) // 2] + sorted_values[start + count // 2]) / 2,
+            **{'p{}'.format(percentile): sorted_quantile(group_values, percentile / 100) for percentile in PERCENTILES},
+            'min': sorted_values[start],
+            'max': sorted_values[start + count - 1],
+            'count': count
+        })
+    return summaries
+
+def remap_codes(categories, index, batch_categories, batch_codes):
+    """
+    Remaps the codes of a batch encoded on its own (Eg:- by a worker process) into a shared numbering.
+    Labels that are new to the shared numbering are appended to it.
+
+    Parameters:
+    - categories (list): The labels of the shared numbering, in code order. It's updated in place.
+    - index (dict): label -> code of the shared numbering. It's updated in place.
+    - batch_categories (list): The labels of the batch, in code order, as returned by encode_categories.
+    - batch_codes (numpy.ndarray): The codes of the batch.
+
+    Returns:
+    - numpy.ndarray: The int32 codes of the batch in the shared numbering, -1 stays -1.
+    """
+    remap = np.empty(len(batch_categories) + 1, dtype=np.int32)
+    # -1 picks the last item
+    remap[-1] = -1
+    for position, label in enumerate(batch_categories):
+        if label not in index:
+            index[label] = len(categories)
+            categories.append(label)
+        remap[position] = index[label]
+    return remap[batch_codes]
@@ -0,0 +1,290 @@
+import os
+import sys
+import json
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+ENVIRONMENT_VARIABLE = "PERFORMANCE_TRACE"
+MODES = ("table", "json")
+
+class Stage:
+    """
+    Stage holds the measures of one named stage, Eg:- 'parse' or 'statistics Math'.
+    A stage entered several times under the same parent (Eg:- once per batch) is recorded once,
+    with the number of calls and the sum of the times, rows and allocations.
+    """
+    def __init__(self, tracer, name, parent):
+        """
+        Initialize a Stage instance.
+
+        Parameters:
+        - tracer (Tracer): The tracer recording the stage.
+        - name (str): The name of the stage.
+        - parent (Stage): The enclosing stage, None for a top level stage.
+        """
+        self.tracer = tracer
+        self.name = name
+        self.parent = parent
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.calls = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.rows = None
+        self.allocated_bytes = 0
+        self.peak_bytes = 0
+        self.max_rss_bytes = None
+
+    def add_rows(self, rows):
+        """
+        Adds processed rows to the stage, so that its throughput can be reported.
+
+        Parameters:
+        - rows (int): The number of rows processed by the current call.
+        """
+        self.rows = rows if self.rows is None else self.rows + rows
+
+    def __enter__(self):
+        self.tracer.enter(self)
+        self.calls += 1
+        self._memory = self.tracer.get_memory()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.wall_seconds += time.perf_counter() - self._wall
+        self.cpu_seconds += time.process_time() - self._cpu
+        self.allocated_bytes += self.tracer.get_memory() - self._memory
+        self.tracer.exit(self)
+        return False
+
+    def to_dict(self):
+        """
+        Returns:
+        - dict: JSON serializable measures of the stage.
+        """
+        path = self.name if self.parent is None else "{}/{}".format(self.parent.to_dict()["path"], self.name)
+        return {
+            "name": self.name,
+            "path": path,
+            "depth": self.depth,
+            "calls": self.calls,
+            "wall_seconds": self.wall_seconds,
+            "cpu_seconds": self.cpu_seconds,
+            "rows": self.rows,
+            "rows_per_second": self.rows / self.wall_seconds if self.rows and self.wall_seconds > 0 else None,
+            "allocated_bytes": self.allocated_bytes,
+            "peak_bytes": self.peak_bytes,
+            "max_rss_bytes": self.max_rss_bytes
+        }
+
+class _NullStage:
+    """
+    Stage returned while the instrumentation is off. Entering it and adding rows do nothing.
+    """
+    def add_rows(self, rows):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+class Tracer:
+    """
+    Tracer records the stages of a run, in the order they are first entered, and reports them.
+
+    Memory is measured with tracemalloc, which is only started while a tracer with trace_memory is active:
+    the allocated memory of a stage is the growth of the traced memory between its start and its end,
+    and its peak is the highest traced memory while it runs. tracemalloc slows down allocation heavy stages
+    (Eg:- matplotlib several times), so it can be turned off to keep only the maximum resident set size
+    of the process, which is recorded at the end of every stage where the platform provides it.
+    Stages running in worker processes are not recorded, their time is part of the stage that waits for them.
+    """
+    def __init__(self, mode="table", trace_path="trace.json", trace_memory=True):
+        """
+        Initialize a Tracer instance.
+
+        Parameters:
+        - mode (str): 'table' prints a table, 'json' writes a JSON trace.
+        - trace_path (str): The file the JSON trace is written to.
+        - trace_memory (bool): If True, allocated and peak memory are measured with tracemalloc.
+        """
+        if mode not in MODES:
+            raise ValueError("Unsupported instrumentation mode '{}', expected one of {}".format(mode, ", ".join(MODES)))
+        self.mode = mode
+        self.trace_path = trace_path
+        self.stages = []
+        self._stages_by_key = {}
+        self._open_stages = []
+        self.trace_memory = trace_memory
+        self._started_tracemalloc = trace_memory and not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start()
+
+    def stage(self, name):
+        """
+        Returns the stage `name` under the current stage, creating it the first time.
+
+        Parameters:
+        - name (str): The name of the stage.
+
+        Returns:
+        - Stage: The stage, to be used as a context manager.
+        """
+        parent = self._open_stages[-1] if self._open_stages else None
+        key = (id(parent), name)
+        if key not in self._stages_by_key:
+            self._stages_by_key[key] = Stage(self, name, parent)
+            self.stages.append(self._stages_by_key[key])
+        return self._stages_by_key[key]
+
+    def enter(self, stage):
+        """
+        Opens a stage. The peak of the open stages is saved before the tracemalloc peak is reset for the new one.
+        """
+        if self.trace_memory:
+            self.__update_peaks__()
+            tracemalloc.reset_peak()
+        self._open_stages.append(stage)
+
+    def exit(self, stage):
+        """
+        Closes a stage and records its peak memory and the maximum resident set size.
+        """
+        if self.trace_memory:
+            self.__update_peaks__()
+        self._open_stages.pop()
+        if resource is not None:
+            # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            stage.max_rss_bytes = max_rss if sys.platform == "darwin" else max_rss * 1024
+
+    def get_memory(self):
+        """
+        Returns:
+        - int: The memory currently traced by tracemalloc, in bytes, 0 without trace_memory.
+        """
+        if not self.trace_memory:
+            return 0
+        return tracemalloc.get_traced_memory()[0]
+
+    def report(self, file=None):
+        """
+        Prints the table of the stages or writes the JSON trace, and stops tracemalloc if this tracer started it.
+
+        Parameters:
+        - file: The stream the table is printed to, sys.stdout by default.
+        """
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        if self.mode == "json":
+            with open(self.trace_path, 'w') as trace_file:
+                json.dump({"stages": [stage.to_dict() for stage in self.stages]}, trace_file, indent=2)
+            return
+        print(self.format_table(), file=file or sys.stdout)
+
+    def format_table(self):
+        """
+        Returns:
+        - str: The stages as a table, a child stage is indented under its parent.
+        """
+        lines = ["{:<36} {:>6} {:>9} {:>9} {:>10} {:>12} {:>10} {:>9} {:>9}".format(
+            "STAGE", "CALLS", "WALL s", "CPU s", "ROWS", "ROWS/s", "ALLOC MB", "PEAK MB", "RSS MB")]
+        for stage in self.__ordered__():
+            measures = stage.to_dict()
+            lines.append("{:<36} {:>6} {:>9.4f} {:>9.4f} {:>10} {:>12} {:>10.2f} {:>9.2f} {:>9}".format(
+                "  " * stage.depth + stage.name, stage.calls, stage.wall_seconds, stage.cpu_seconds,
+                "" if stage.rows is None else stage.rows,
+                "" if measures["rows_per_second"] is None else "{:.0f}".format(measures["rows_per_second"]),
+                stage.allocated_bytes / 2 ** 20, stage.peak_bytes / 2 ** 20,
+                "" if stage.max_rss_bytes is None else "{:.1f}".format(stage.max_rss_bytes / 2 ** 20)))
+        return "\n".join(lines)
+
+    def __ordered__(self):
+        """
+        Helps to list the stages depth first, every child right after its parent
+        """
+        children = {}
+        for stage in self.stages:
+            children.setdefault(id(stage.parent), []).append(stage)
+        ordered = []
+        pending = list(reversed(children.get(id(None), [])))
+        while pending:
+            stage = pending.pop()
+            ordered.append(stage)
+            pending.extend(reversed(children.get(id(stage), [])))
+        return ordered
+
+    def __update_peaks__(self):
+        """
+        Helps to fold the current tracemalloc peak into every open stage
+        """
+        peak = tracemalloc.get_traced_memory()[1]
+        for stage in self._open_stages:
+            stage.peak_bytes = max(stage.peak_bytes, peak)
+
+_tracer = None
+
+def configure(config=None):
+    """
+    Starts the instrumentation when the PERFORMANCE_TRACE environment variable or config.instrumentation
+    is 'table' or 'json'. The environment variable wins over the config.
+
+    Parameters:
+    - config (Config): The configuration, its instrumentation, trace_path and trace_memory properties are used.
+
+    Returns:
+    - bool: True if the instrumentation is on.
+    """
+    global _tracer
+    mode = os.environ.get(ENVIRONMENT_VARIABLE) or getattr(config, "instrumentation", "")
+    if not mode:
+        _tracer = None
+        return False
+    _tracer = Tracer(mode.lower(), getattr(config, "trace_path", "trace.json"), getattr(config, "trace_memory", True))
+    return True
+
+def stage(name, *arguments):
+    """
+    Returns the context manager measuring a stage. It does nothing while the instrumentation is off.
+    A name depending on values (Eg:- a field) is given as a constant format string and its arguments,
+    it's only formatted while the instrumentation is on, so hot paths build no string when it's off.
+
+    Example:
+        with stage("parse") as parse_stage:
+            entityCollection = factory.call_parser()
+            parse_stage.add_rows(len(entityCollection))
+        with stage("statistics {}", field):
+            ...
+
+    Parameters:
+    - name (str): The name of the stage, or its format string when arguments are given.
+    - arguments: The values formatted into the name.
+
+    Returns:
+    - Stage: The stage of the active tracer, or a no-op stage.
+    """
+    if _tracer is None:
+        return _NULL_STAGE
+    return _tracer.stage(name.format(*arguments) if arguments else name)
+
+def report(file=None):
+    """
+    Reports the recorded stages and turns the instrumentation off. It does nothing while the instrumentation is off.
+
+    Parameters:
+    - file: The stream the table is printed to, sys.stdout by default.
+    """
+    global _tracer
+    if _tracer is not None:
+        _tracer.report(file)
+        _tracer = None
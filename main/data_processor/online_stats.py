@@ -0,0 +1,403 @@
+import math
+import numpy as np
+
+PERCENTILES = (90, 99)
+
+def sorted_quantile(sorted_values, q):
+    """
+    Exact quantile of sorted values, interpolated linearly between the two closest ranks like numpy.quantile.
+    It only reads two values, so it's O(1) once the values are sorted.
+
+    Parameters:
+    - sorted_values (numpy.ndarray): The values, in ascending order, at least one.
+    - q (float): The quantile, between 0 and 1. Eg:- 0.9 for the 90th percentile.
+
+    Returns:
+    - float: The quantile.
+    """
+    position = q * (len(sorted_values) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch in the style of KLL.
+    Values are kept in levels of at most `k` items, an item of level h stands for 2**h values.
+    When a level is full it's sorted and every other item, starting at a random offset, is promoted to the next level,
+    so memory stays around k * log2(n / k) items whatever the number of values.
+    """
+    def __init__(self, k=200, seed=0):
+        """
+        Initialize a QuantileSketch instance.
+
+        Parameters:
+        - k (int): The capacity of each level, a larger k gives a smaller error.
+        - seed (int): Seed of the random offsets, so results are reproducible.
+        """
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._random = np.random.default_rng(seed)
+
+    def update(self, values):
+        """
+        Add a batch of values.
+
+        Parameters:
+        - values (numpy.ndarray): The valid values to add.
+        """
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.count += len(values)
+        self._compress()
+
+    def merge(self, other):
+        """
+        Merge another sketch into this one, the result is the sketch of both sets of values.
+
+        Parameters:
+        - other (QuantileSketch): The sketch to merge.
+        """
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for height, items in enumerate(other.levels):
+            self.levels[height] = np.concatenate([self.levels[height], items])
+        self.count += other.count
+        self._compress()
+
+    def quantile(self, q):
+        """
+        Approximate quantile of the values.
+
+        Parameters:
+        - q (float): The quantile, between 0 and 1. Eg:- 0.5 for the median.
+
+        Returns:
+        - float or None: The approximate quantile, or None if the sketch is empty.
+        """
+        if self.count == 0:
+            return None
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** height) for height, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        position = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        return float(items[order][min(position, len(items) - 1)])
+
+    def to_state(self):
+        """
+        Returns:
+        - dict: JSON serializable state of the sketch.
+        """
+        return {"k": self.k, "count": self.count, "levels": [level.tolist() for level in self.levels]}
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Parameters:
+        - state (dict): State returned by to_state.
+
+        Returns:
+        - QuantileSketch
+        """
+        sketch = cls(state["k"])
+        sketch.count = state["count"]
+        sketch.levels = [np.array(level, dtype=np.float64) for level in state["levels"]]
+        return sketch
+
+    def _compress(self):
+        """
+        Promotes half of the items of every level above capacity to the next level.
+        """
+        height = 0
+        while height < len(self.levels):
+            level = self.levels[height]
+            if len(level) > self.k:
+                level = np.sort(level)
+                # an odd item stays at its level so no weight is lost
+                kept = level[len(level) - len(level) % 2:]
+                paired = level[:len(level) - len(level) % 2]
+                promoted = paired[self._random.integers(2)::2]
+                if height + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[height + 1] = np.concatenate([self.levels[height + 1], promoted])
+                self.levels[height] = kept
+            height += 1
+
+class FrequencySketch:
+    """
+    Mergeable heavy hitters sketch (Misra-Gries).
+    At most `capacity` values are counted, every count is underestimated by at most n / (capacity + 1),
+    and the counts are exact while there are no more than `capacity` distinct values.
+    """
+    def __init__(self, capacity=1000):
+        """
+        Initialize a FrequencySketch instance.
+
+        Parameters:
+        - capacity (int): The number of values counted.
+        """
+        self.capacity = capacity
+        self.count = 0
+        self.counters = {}
+
+    def update(self, values):
+        """
+        Add a batch of values, they are counted with one vectorized pass per batch.
+
+        Parameters:
+        - values (numpy.ndarray): The valid values to add.
+        """
+        distinct, counts = np.unique(values, return_counts=True)
+        self._add_counts(zip(distinct.tolist(), counts.tolist()), len(values))
+
+    def merge(self, other):
+        """
+        Merge another sketch into this one, the result is the sketch of both sets of values.
+
+        Parameters:
+        - other (FrequencySketch): The sketch to merge.
+        """
+        self._add_counts(other.counters.items(), other.count)
+
+    def mode(self):
+        """
+        Approximate mode, the value with the largest counter. The smallest value wins a tie.
+
+        Returns:
+        - float or None: The approximate mode, or None if the sketch is empty.
+        """
+        if not self.counters:
+            return None
+        return min(self.counters.items(), key=lambda item: (-item[1], item[0]))[0]
+
+    def to_state(self):
+        """
+        Returns:
+        - dict: JSON serializable state of the sketch.
+        """
+        return {"capacity": self.capacity, "count": self.count, "counters": list(self.counters.items())}
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Parameters:
+        - state (dict): State returned by to_state.
+
+        Returns:
+        - FrequencySketch
+        """
+        sketch = cls(state["capacity"])
+        sketch.count = state["count"]
+        sketch.counters = {value: count for value, count in state["counters"]}
+        return sketch
+
+    def _add_counts(self, value_counts, count):
+        """
+        Adds counts and, when there are too many counters, subtracts the (capacity + 1)-th largest count from all of them.
+        """
+        for value, value_count in value_counts:
+            self.counters[value] = self.counters.get(value, 0) + value_count
+        self.count += count
+        if len(self.counters) > self.capacity:
+            threshold = sorted(self.counters.values(), reverse=True)[self.capacity]
+            self.counters = {value: value_count - threshold
+                             for value, value_count in self.counters.items() if value_count > threshold}
+
+class FieldStatistics:
+    """
+    Running statistics of one field that can be updated batch by batch and merged.
+    count, min and max are exact, mean and variance use Welford's method (combined batch by batch),
+    the median comes from the quantile sketch and the mode from the frequency sketch.
+    """
+    def __init__(self, quantile_error=0.01, mode_error=0.001):
+        """
+        Initialize a FieldStatistics instance.
+
+        Parameters:
+        - quantile_error (float): Target rank error of the median, as a fraction of the count.
+        - mode_error (float): Maximum undercount of the mode frequency, as a fraction of the count.
+        """
+        self.quantile_error = quantile_error
+        self.mode_error = mode_error
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.quantiles = QuantileSketch(math.ceil(2 / quantile_error))
+        self.frequencies = FrequencySketch(math.ceil(1 / mode_error))
+
+    def update(self, values):
+        """
+        Add a batch of values.
+
+        Parameters:
+        - values (numpy.ndarray): The valid values to add.
+        """
+        if len(values) == 0:
+            return
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        self._combine(len(values), batch_mean, batch_m2, float(values.min()), float(values.max()))
+        self.quantiles.update(values)
+        self.frequencies.update(values)
+
+    def merge(self, other):
+        """
+        Merge the statistics of another part of the data.
+
+        Parameters:
+        - other (FieldStatistics): The statistics to merge.
+        """
+        if other.count == 0:
+            return
+        self._combine(other.count, other.mean, other.m2, other.minimum, other.maximum)
+        self.quantiles.merge(other.quantiles)
+        self.frequencies.merge(other.frequencies)
+
+    def summary(self):
+        """
+        Returns:
+        - dict: metric name -> value, with the metrics of EntityCollection.summarize followed by
+          the standard deviation and the error bounds of the approximate metrics, named after their unit:
+          median_rank_error, the rank error of the median (and of the percentiles) as a fraction of the count,
+          and mode_count_error, the maximum undercount of the mode frequency as a number of values.
+        """
+        percentiles = {'p{}'.format(percentile): percentile / 100 for percentile in PERCENTILES}
+        if self.count == 0:
+            return dict.fromkeys(['mean', 'mode', 'median'] + list(percentiles) + ['min', 'max', 'count',
+                                                                                  'std', 'median_rank_error', 'mode_count_error'])
+        return {
+            'mean': self.mean,
+            'mode': self.frequencies.mode(),
+            'median': self.quantiles.quantile(0.5),
+            **{name: self.quantiles.quantile(q) for name, q in percentiles.items()},
+            'min': self.minimum,
+            'max': self.maximum,
+            'count': self.count,
+            'std': math.sqrt(self.m2 / self.count),
+            'median_rank_error': self.quantile_error,
+            'mode_count_error': self.count // (self.frequencies.capacity + 1)
+        }
+
+    def to_state(self):
+        """
+        Returns:
+        - dict: JSON serializable state of the statistics.
+        """
+        return {"quantile_error": self.quantile_error, "mode_error": self.mode_error,
+                "count": self.count, "mean": self.mean, "m2": self.m2,
+                "minimum": self.minimum, "maximum": self.maximum,
+                "quantiles": self.quantiles.to_state(), "frequencies": self.frequencies.to_state()}
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Parameters:
+        - state (dict): State returned by to_state.
+
+        Returns:
+        - FieldStatistics
+        """
+        statistics = cls(state["quantile_error"], state["mode_error"])
+        statistics.count = state["count"]
+        statistics.mean = state["mean"]
+        statistics.m2 = state["m2"]
+        statistics.minimum = state["minimum"]
+        statistics.maximum = state["maximum"]
+        statistics.quantiles = QuantileSketch.from_state(state["quantiles"])
+        statistics.frequencies = FrequencySketch.from_state(state["frequencies"])
+        return statistics
+
+    def _combine(self, count, mean, m2, minimum, maximum):
+        """
+        Combines the count, mean, M2, min and max of another part of the data (Chan et al. update of Welford's method).
+        """
+        total = self.count + count
+        delta = mean - self.mean
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.mean += delta * count / total
+        self.count = total
+        self.minimum = minimum if self.minimum is None else min(self.minimum, minimum)
+        self.maximum = maximum if self.maximum is None else max(self.maximum, maximum)
+
+class StatisticsEngine:
+    """
+    StatisticsEngine holds the FieldStatistics of every field and is fed by the parsers batch by batch,
+    so a summary can be computed in bounded memory without keeping the values.
+    Engines built by parallel workers or for different file shards are merged with merge().
+    """
+    def __init__(self, quantile_error=0.01, mode_error=0.001):
+        """
+        Initialize a StatisticsEngine instance.
+
+        Parameters:
+        - quantile_error (float): Target rank error of the median, as a fraction of the count.
+        - mode_error (float): Maximum undercount of the mode frequency, as a fraction of the count.
+        """
+        self.quantile_error = quantile_error
+        self.mode_error = mode_error
+        self.fields = {}
+
+    def __contains__(self, field):
+        return field in self.fields
+
+    def __getitem__(self, field):
+        return self.fields[field]
+
+    def update(self, columns):
+        """
+        Add a batch of columns.
+
+        Parameters:
+        - columns (dict): field -> (float64 values, boolean mask).
+        """
+        for field, (values, mask) in columns.items():
+            self._get_field(field).update(values[mask])
+
+    def merge(self, other):
+        """
+        Merge the statistics of another part of the data, Eg:- from another worker or file.
+
+        Parameters:
+        - other (StatisticsEngine): The engine to merge.
+        """
+        for field, statistics in other.fields.items():
+            self._get_field(field).merge(statistics)
+
+    def has_values(self):
+        """
+        Returns:
+        - bool: True if at least one value was added.
+        """
+        return any(statistics.count > 0 for statistics in self.fields.values())
+
+    def to_state(self):
+        """
+        Returns:
+        - dict: JSON serializable state of the engine.
+        """
+        return {"quantile_error": self.quantile_error, "mode_error": self.mode_error,
+                "fields": {field: statistics.to_state() for field, statistics in self.fields.items()}}
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Parameters:
+        - state (dict): State returned by to_state.
+
+        Returns:
+        - StatisticsEngine
+        """
+        engine = cls(state["quantile_error"], state["mode_error"])
+        engine.fields = {field: FieldStatistics.from_state(field_state) for field, field_state in state["fields"].items()}
+        return engine
+
+    def _get_field(self, field):
+        """
+        Returns the statistics of a field, creating them the first time.
+        """
+        if field not in self.fields:
+            self.fields[field] = FieldStatistics(self.quantile_error, self.mode_error)
+        return self.fields[field]
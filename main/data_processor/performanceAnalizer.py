@@ -1,11 +1,87 @@
-from datetime import datetime
-import matplotlib.pyplot as plt
-import pandas.core.frame
-from matplotlib.backends.backend_pdf import PdfPages
-from array import array
-from tabulate import tabulate
-import pandas as pd
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
 import numpy as np
+from data_processor.downsampling import DownsampledSeries, box_stats, top_n
+from data_processor.instrumentation import stage
+
+LABELLED_TICKS = 10
+DENSITY_BINS = 50
+
+def _load_pdf_writer():
+    """
+    Imports pypdf on first use, so it's only loaded when pages are rendered in parallel.
+
+    Returns:
+        type or None
+            pypdf's PdfWriter, or None when pypdf is not installed.
+    """
+    try:
+        from pypdf import PdfWriter
+    except ImportError:
+        return None
+    return PdfWriter
+
+def _render_page(config, column, X, Y, summary, extremes, image_format='pdf'):
+    """
+    Renders the page of one field into a single page PDF, or an image.
+    It's a plain function so that it can run in a worker process,
+    the figure is drawn with the non-interactive PDF backend without going through pyplot.
+
+    Parameters:
+        config: Configuration
+        column: str
+            The field of the page.
+        X: list
+            X-axis data.
+        Y: list
+            Y-axis data.
+        summary: dict
+            The statistical metrics of the field.
+        extremes: tuple
+            The entities with the largest and the smallest values, see __prepare_extremes__.
+        image_format: str
+            The format of the page, any format of matplotlib's savefig. Eg:- 'pdf' or 'png'
+
+    Returns:
+        bytes
+            The page.
+    """
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(14, 12))
+    axs = fig.subplots(3, 2)
+    Performance_Analyzer(config).__build_page__(fig, axs, column, X, Y, summary, extremes)
+    page = BytesIO()
+    fig.savefig(page, format=image_format)
+    return page.getvalue()
+
+def _render_group_page(config, column, group_summary, group_boxes, image_format='pdf'):
+    """
+    Renders the comparative page of one field across the groups into a single page PDF, or an image.
+    It's a plain function so that it can run in a worker process, like _render_page.
+
+    Parameters:
+        config: Configuration
+        column: str
+            The field of the page.
+        group_summary: dict
+            The statistical metrics of every shown group, as returned by EntityCollection.summarize_groups.
+        group_boxes: list
+            The box plot statistics of every shown group, in the same order.
+        image_format: str
+            The format of the page, any format of matplotlib's savefig. Eg:- 'pdf' or 'png'
+
+    Returns:
+        bytes
+            The page.
+    """
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(14, 12))
+    axs = fig.subplots(3, 1)
+    Performance_Analyzer(config).__build_group_page__(fig, axs, column, group_summary, group_boxes)
+    page = BytesIO()
+    fig.savefig(page, format=image_format)
+    return page.getvalue()
 
 class Performance_Analyzer:
     """
@@ -16,7 +92,20 @@ class Performance_Analyzer:
     2. Line chart
     3. Scatter  plot
     4. Box plot
-    5. Metrics like mean, median, mode, count, max, min
+    5. Metrics like mean, median, mode, percentiles, count, max, min
+    6. The config.top_k entities with the largest and the smallest values
+
+    Above config.large_data_threshold entities the charts switch to a large data mode,
+    so render time and PDF size stay bounded: the bar plot shows the top config.top_n entities,
+    the line chart is downsampled to config.max_chart_points points with LTTB,
+    the scatter plot becomes a density plot and the box plot leaves the outliers out.
+    The data of these charts is reduced once, see DownsampledSeries.
+
+    With config.group_by every field page is followed by a comparative page of the field across the groups:
+    a table of the metrics of every group, their means and medians side by side and a box plot per group.
+    Only the config.top_n largest groups are shown.
+
+    matplotlib is only imported when a page is drawn, so parsing and summarizing never load it.
     
     Parameters:
         config: Configuration
@@ -45,15 +134,15 @@ class Performance_Analyzer:
         Returns:
             list, list
                 Returns chart_x_axis and chart_y_axis.
+                In the large data mode chart_x_axis is None and chart_y_axis is a DownsampledSeries,
+                the ids are only looked up for the rows the charts show.
         """
-        chart_x_axis = []
-        chart_y_axis = []
-        for entity in entity_collection.items:
-            chart_x_axis.append(entity.entity_id)
-            if field in entity.field_value_pairs:
-                chart_y_axis.append(entity.field_value_pairs[field])
-            else:
-                chart_y_axis.append(0)
+        values, mask = entity_collection.get_column(field)
+        chart_y_axis = np.where(mask, values, 0)
+        if self.__is_large__(chart_y_axis):
+            return None, DownsampledSeries(chart_y_axis, entity_collection.get_ids, self.config.top_n,
+                                           self.config.max_chart_points, LABELLED_TICKS, DENSITY_BINS)
+        chart_x_axis = list(entity_collection.get_ids())
 
         return chart_x_axis, chart_y_axis
       
@@ -71,6 +160,11 @@ class Performance_Analyzer:
             axs: AxesSubplot
                 The subplot where the barplot will be plotted.
         """
+        if self.__is_large__(y):
+            axs[1, 0].bar(list(y.top_ids), y.top_values)
+            axs[1, 0].tick_params(axis='x', labelrotation=90, labelsize=6)
+            axs[1, 0].set_title(f'{ylabel} Bar Chart (top {len(y.top_values)} of {len(y)})'.upper())
+            return
         axs[1, 0].bar(x, y)
         axs[1, 0].set_title(f'{ylabel} Bar Chart'.upper())
 
@@ -88,12 +182,17 @@ class Performance_Analyzer:
             axs: AxesSubplot
                 The subplot where the line chart will be plotted.
         """
+        if self.__is_large__(y):
+            axs[2, 0].plot(y.line_positions, y.line_values)
+            axs[2, 0].set_xticks(y.tick_positions, list(y.tick_ids))
+            axs[2, 0].set_title(f'{ylabel} Line Chart ({len(y.line_positions)} of {len(y)} points)'.upper())
+            return
         axs[2, 0].plot(x, y, marker='o')
         axs[2, 0].set_title(f'{ylabel} Line Chart'.upper())
 
     def __generate_boxplot__(self, y, ylabel,axs):
         """
-        Generates a box plot.
+        Generates a box plot. Above config.large_data_threshold entities the outliers are not drawn.
 
         Parameters:
             y: list
@@ -103,7 +202,10 @@ class Performance_Analyzer:
             axs: AxesSubplot
                 The subplot where the boxplot will be plotted.
         """
-        axs[2, 1].boxplot(y, vert=False)
+        if self.__is_large__(y):
+            axs[2, 1].bxp([y.box], vert=False, showfliers=False)
+        else:
+            axs[2, 1].boxplot(y, vert=False)
         axs[2, 1].set_title(f'{ylabel} Boxplot'.upper())
 
     def __generate_scatter_plot__(self, x, y, ylabel, axs):
@@ -120,29 +222,205 @@ class Performance_Analyzer:
             axs: AxesSubplot
                 The subplot where the scatter plot will be plotted.
         """
+        if self.__is_large__(y):
+            counts, x_edges, y_edges = y.density
+            axs[1, 1].pcolormesh(x_edges, y_edges, np.ma.masked_equal(counts.T, 0), cmap='Blues')
+            axs[1, 1].set_xlabel('entity position')
+            axs[1, 1].set_title(f'{ylabel} Density Plot'.upper())
+            return
         axs[1, 1].scatter(x, y)
         axs[1, 1].set_title(f'{ylabel} Scatter Plot'.upper())
 
-    def __generate_statistical_table__(self, entity_collection, field, axs):
+    def __prepare_extremes__(self, entity_collection, field):
+        """
+        Finds the config.top_k entities with the largest and with the smallest values of a field,
+        with a partial selection unless the sorted index of the field is already built.
+
+        Parameters:
+            entity_collection: EntityCollection
+                A collection of entities with data to be analyzed.
+            field: str
+                The field for which the data is being prepared.
+
+        Returns:
+            tuple
+                The ids and values of the largest ones, largest first, then of the smallest ones, smallest first.
+        """
+        return entity_collection.top_k(field, self.config.top_k) + entity_collection.top_k(field, self.config.top_k, largest=False)
+
+    def __generate_extremes_table__(self, extremes, axs):
+        """
+        Generates a table of the entities with the largest and with the smallest values, side by side.
+
+        Parameters:
+            extremes: tuple
+                The entities with the largest and the smallest values, see __prepare_extremes__.
+            axs: AxesSubplot
+                The subplot where the table will be plotted.
+        """
+        axs[0, 1].axis('off')
+        top_ids, top_values, bottom_ids, bottom_values = extremes
+        if len(top_ids) == 0:
+            return
+        cells = [[rank + 1, top_ids[rank], f'{top_values[rank]:.4g}', bottom_ids[rank], f'{bottom_values[rank]:.4g}']
+                 for rank in range(len(top_ids))]
+        table = axs[0, 1].table(cellText=cells,
+                                colLabels=['#', 'TOP', 'VALUE', 'BOTTOM', 'VALUE'],
+                                cellLoc='center',
+                                loc='center',
+                                colWidths=[0.08, 0.3, 0.16, 0.3, 0.16],
+                                bbox=[0, 0, 1, 1])
+        table.auto_set_font_size(False)
+        table.set_fontsize(6)
+
+    def __prepare_group_components__(self, entity_collection, field, group_summary):
+        """
+        Prepares the comparative page of a field: the config.top_n largest groups with values of the field,
+        largest first, and the statistics of their box plots.
+        The values of every group come from one stable sort of the group codes. They are reduced to box plot
+        statistics here, so the page never carries the values themselves. Above config.large_data_threshold values
+        the outliers are left out.
+
+        Parameters:
+            entity_collection: EntityCollection
+                A collection of entities partitioned on config.group_by.
+            field: str
+                The field for which the data is being prepared.
+            group_summary: dict
+                The statistical metrics of every group of the field, as returned by EntityCollection.summarize_groups.
+
+        Returns:
+            dict, list
+                The metrics and the box plot statistics of the shown groups.
+        """
+        values, mask = entity_collection.get_column(field)
+        codes = entity_collection.get_group_codes()[mask]
+        values = values[mask]
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes + 1, minlength=len(entity_collection.categories) + 1)
+        # code -1 (no group) is counted first, so the groups start after its rows
+        starts = np.cumsum(counts)[:-1]
+        shown = top_n(counts[1:], self.config.top_n)
+        shown = shown[counts[1:][shown] > 0]
+        labels = [entity_collection.categories[code] for code in shown]
+        group_values = [values[order[starts[code]:starts[code] + counts[code + 1]]] for code in shown]
+        large = sum(len(group) for group in group_values) > self.config.large_data_threshold
+        return {label: group_summary[label] for label in labels}, [box_stats(group, fliers=not large) for group in group_values]
+
+    def __generate_group_table__(self, group_summary, axs):
+        """
+        Generates a table with one row of statistical metrics per group.
+
+        Parameters:
+            group_summary: dict
+                The statistical metrics of every shown group.
+            axs: AxesSubplot
+                The subplots of the page, the table goes into the first one.
+        """
+        axs[0].axis('off')
+        metrics = list(next(iter(group_summary.values())))
+        cells = [[f'{metrics_of_group[metric]:.4g}' for metric in metrics] for metrics_of_group in group_summary.values()]
+        axs[0].table(cellText=cells,
+                     rowLabels=[str(label) for label in group_summary],
+                     colLabels=[metric.upper() for metric in metrics],
+                     cellLoc='center',
+                     loc='center',
+                     bbox=[0.1, 0, 0.9, 1])
+
+    def __generate_group_barplot__(self, group_summary, ylabel, axs):
+        """
+        Generates a bar plot of the mean and the median of every group, side by side.
+
+        Parameters:
+            group_summary: dict
+                The statistical metrics of every shown group.
+            ylabel: str
+                The field of the page.
+            axs: AxesSubplot
+                The subplots of the page, the bar plot goes into the second one.
+        """
+        positions = np.arange(len(group_summary))
+        for offset, metric in ((-0.2, 'mean'), (0.2, 'median')):
+            axs[1].bar(positions + offset, [metrics[metric] for metrics in group_summary.values()], width=0.4, label=metric)
+        axs[1].set_xticks(positions, [str(label) for label in group_summary], rotation=90 if len(positions) > LABELLED_TICKS else 0)
+        axs[1].legend()
+        axs[1].set_title(f'{ylabel} Mean and Median by {self.config.group_by}'.upper())
+
+    def __generate_group_boxplot__(self, group_summary, group_boxes, ylabel, axs):
+        """
+        Generates one box plot per group, from the statistics of __prepare_group_components__.
+
+        Parameters:
+            group_summary: dict
+                The statistical metrics of every shown group.
+            group_boxes: list
+                The box plot statistics of every shown group.
+            ylabel: str
+                The field of the page.
+            axs: AxesSubplot
+                The subplots of the page, the box plots go into the third one.
+        """
+        axs[2].bxp(group_boxes)
+        axs[2].set_xticks(np.arange(1, len(group_boxes) + 1), [str(label) for label in group_summary],
+                          rotation=90 if len(group_boxes) > LABELLED_TICKS else 0)
+        axs[2].set_title(f'{ylabel} Boxplot by {self.config.group_by}'.upper())
+
+    def __build_group_page__(self, fig, axs, column, group_summary, group_boxes):
+        """
+        Draws the title, the group table and the comparative plots of one field.
+
+        Parameters:
+            fig: Figure
+                The figure of the page.
+            axs: AxesSubplot
+                The 3x1 subplots of the page.
+            column: str
+                The field of the page.
+            group_summary: dict
+                The statistical metrics of every shown group.
+            group_boxes: list
+                The box plot statistics of every shown group.
+        """
+        fig.suptitle(f'{column} by {self.config.group_by}'.upper(), fontsize=16)
+        if not group_summary:
+            for ax in axs:
+                ax.axis('off')
+            return
+        self.__generate_group_table__(group_summary, axs)
+        self.__generate_group_barplot__(group_summary, column, axs)
+        self.__generate_group_boxplot__(group_summary, group_boxes, column, axs)
+
+    def __is_large__(self, y):
+        """
+        Checks if the charts of a field should switch to the large data mode.
+
+        Parameters:
+            y: list
+                Y-axis data.
+
+        Returns:
+            bool
+                True if there are more entities than config.large_data_threshold.
+        """
+        return len(y) > self.config.large_data_threshold
+
+    def __generate_statistical_table__(self, summary, axs):
         """
         Generates a summary table filled with the statistical metrics for every field (column).
+        Running statistics also give the standard deviation and the error bounds of the approximate metrics,
+        they get a column of their own.
 
         Parameters:
-            entity_collection: 
-                Object of the class entity.
-            field:
-                The field that will be used to compute the statistical metrics.
+            summary: dict
+                The statistical metrics of the field, as returned by EntityCollection.summarize.
             axs: AxesSubplot
                 The subplot where the summary table will be plotted.
         """
         axs[0, 0].axis('off')  # Hide axes for the table
-        metrics_labels = ['MEAN', 'MODE', 'MEDIAN', 'MIN', 'MAX', 'COUNT']
-        summary_data = [entity_collection.compute_mean(field), entity_collection.compute_mode(field),
-                        entity_collection.compute_median(field), entity_collection.compute_min(field),
-                        entity_collection.compute_max(field), entity_collection.compute_count(field)]
+        metrics_labels = [metric.upper() for metric in summary]
+        summary_data = [summary[metric.lower()] for metric in metrics_labels]
         summary_data = np.array([summary_data])
-        df = pd.DataFrame(summary_data, columns=metrics_labels)
-        summary_table = axs[0, 0].table(cellText=df.values,
+        summary_table = axs[0, 0].table(cellText=summary_data,
                                           colLabels=metrics_labels,
                                           cellLoc='center',
                                           loc='center',
@@ -150,6 +428,39 @@ class Performance_Analyzer:
                                           colWidths=[0.2] * len(metrics_labels),
                                           bbox=[0, 0, 1, 1])
 
+    def __build_page__(self, fig, axs, column, X, Y, summary, extremes):
+        """
+        Draws the title, the summary table and the plots of one field.
+
+        Parameters:
+            fig: Figure
+                The figure of the page.
+            axs: AxesSubplot
+                The 3x2 subplots of the page.
+            column: str
+                The field of the page.
+            X: list
+                X-axis data.
+            Y: list
+                Y-axis data.
+            summary: dict
+                The statistical metrics of the field.
+            extremes: tuple
+                The entities with the largest and the smallest values, see __prepare_extremes__.
+        """
+        fig.suptitle(f'{column} Analysis'.upper(), fontsize=16)
+        self.__generate_statistical_table__(summary, axs)
+        self.__generate_extremes_table__(extremes, axs)
+        if len(Y) == 0:
+            # online statistics keep no values to plot, the page only shows the summary table
+            for ax in (axs[1, 0], axs[1, 1], axs[2, 0], axs[2, 1]):
+                ax.axis('off')
+            return
+        self.__generate_barplot__(X, Y, column, axs)
+        self.__generate_scatter_plot__(X, Y, column, axs)
+        self.__generate_line_chart__(X, Y, column, axs)
+        self.__generate_boxplot__(Y, column, axs)
+
     def display(self, entity_collection):
         """
         Method that display the summary table and plots for the entity collection.
@@ -158,42 +469,124 @@ class Performance_Analyzer:
             entity_collection: 
                 Object of the class entity.
         """
+        import matplotlib.pyplot as plt
         fields = entity_collection.fields
+        with stage("statistics"):
+            summary = entity_collection.summarize(fields)
+            group_summary = entity_collection.summarize_groups(fields)
         for column in fields:
-            X,Y = self.__prepare_axis_components__(entity_collection,column)
-            fig, axs = plt.subplots(3, 2, figsize=(14, 12))
-            fig.suptitle(f'{column} Analysis'.upper(), fontsize=16)
-            self.__generate_statistical_table__(entity_collection,column,axs)
-            axs[0, 1].axis('off')
-            self.__generate_barplot__(X, Y, column, axs)
-            self.__generate_scatter_plot__(X, Y, column, axs)
-            self.__generate_line_chart__(X, Y, column, axs)
-            self.__generate_boxplot__(Y, column, axs)
-            plt.tight_layout()
+            with stage("render {}", column) as render_stage:
+                X,Y = self.__prepare_axis_components__(entity_collection,column)
+                render_stage.add_rows(len(Y))
+                fig, axs = plt.subplots(3, 2, figsize=(14, 12))
+                self.__build_page__(fig, axs, column, X, Y, summary[column], self.__prepare_extremes__(entity_collection, column))
+                plt.tight_layout()
             plt.show()
             plt.close()
+            if column in group_summary:
+                with stage("render groups {}", column):
+                    fig, axs = plt.subplots(3, 1, figsize=(14, 12))
+                    self.__build_group_page__(fig, axs, column, *self.__prepare_group_components__(entity_collection, column, group_summary[column]))
+                    plt.tight_layout()
+                plt.show()
+                plt.close()
 
-    def export(self, entity_collection):
+    def export(self, entity_collection, pdf_filename="Summary.pdf"):
         """
         Method to export the summary table and plots for the entity collection in a PDF file.
+        With config.group_by every field page is followed by its comparative page across the groups.
+        When config.workers is more than 1 and pypdf is installed, the pages are rendered in parallel.
+        pypdf is an optional dependency: without it a warning is given and the pages are rendered one by one.
 
         Parameters:
             entity_collection: 
                 Object of the class entity.
+            pdf_filename: str
+                The path of the PDF file.
         """
         fields = entity_collection.fields
-        pdf_filename = "Summary.pdf"
+        with stage("statistics"):
+            summary = entity_collection.summarize(fields)
+            group_summary = entity_collection.summarize_groups(fields)
+        PdfWriter = _load_pdf_writer() if self.config.workers > 1 else None
+        if PdfWriter is not None:
+            self.__export_parallel__(entity_collection, fields, pdf_filename, PdfWriter)
+            return
+        if self.config.workers > 1:
+            warnings.warn("workers is {} but pypdf is not installed, the PDF pages are rendered one by one."
+                          " Install pypdf (pip install pypdf) to render them in parallel.".format(self.config.workers),
+                          RuntimeWarning, stacklevel=2)
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_pdf import PdfPages
         with PdfPages(pdf_filename) as pdf:
             for column in fields:
-                X,Y = self.__prepare_axis_components__(entity_collection,column)
-                fig, axs = plt.subplots(3, 2, figsize=(14, 12))
-                fig.suptitle(f'{column} Analysis'.upper(), fontsize=16)
-                self.__generate_statistical_table__(entity_collection,column,axs)
-                axs[0, 1].axis('off')
-                self.__generate_barplot__(X, Y, column, axs)
-                self.__generate_scatter_plot__(X, Y, column, axs)
-                self.__generate_line_chart__(X, Y, column, axs)
-                self.__generate_boxplot__(Y, column, axs)
-                pdf.savefig()
-                plt.tight_layout()
-                plt.close()
+                with stage("render {}", column) as render_stage:
+                    X,Y = self.__prepare_axis_components__(entity_collection,column)
+                    render_stage.add_rows(len(Y))
+                    fig, axs = plt.subplots(3, 2, figsize=(14, 12))
+                    self.__build_page__(fig, axs, column, X, Y, summary[column], self.__prepare_extremes__(entity_collection, column))
+                    pdf.savefig()
+                    plt.tight_layout()
+                    plt.close()
+                if column in group_summary:
+                    with stage("render groups {}", column):
+                        fig, axs = plt.subplots(3, 1, figsize=(14, 12))
+                        self.__build_group_page__(fig, axs, column, *self.__prepare_group_components__(entity_collection, column, group_summary[column]))
+                        pdf.savefig()
+                        plt.close()
+
+    def get_page_jobs(self, entity_collection, fields, image_format='pdf'):
+        """
+        Prepares the data of every page and lists the jobs rendering them, in page order:
+        the page of each field, followed by its comparative page with config.group_by.
+        The jobs are plain functions with their arguments, so they can run in worker processes.
+        Only the data a page draws is in its arguments, reduced before pickling above config.large_data_threshold
+        entities, so what's sent to a worker doesn't grow with the number of entities.
+
+        Parameters:
+            entity_collection: 
+                Object of the class entity.
+            fields: list
+                The fields to render.
+            image_format: str
+                The format of the pages. Eg:- 'pdf' or 'png'
+
+        Returns:
+            list
+                (function, arguments) pairs, every function returns the bytes of one page.
+        """
+        summary = entity_collection.summarize(fields)
+        group_summary = entity_collection.summarize_groups(fields)
+        jobs = []
+        for column in fields:
+            X,Y = self.__prepare_axis_components__(entity_collection,column)
+            jobs.append((_render_page, (self.config, column, X, Y, summary[column],
+                                        self.__prepare_extremes__(entity_collection, column), image_format)))
+            if column in group_summary:
+                jobs.append((_render_group_page, (self.config, column,
+                                                  *self.__prepare_group_components__(entity_collection, column, group_summary[column]),
+                                                  image_format)))
+        return jobs
+
+    def __export_parallel__(self, entity_collection, fields, pdf_filename, PdfWriter):
+        """
+        Renders the page of every field in a pool of config.workers processes
+        and assembles the pages into the PDF file in field order.
+
+        Parameters:
+            entity_collection: 
+                Object of the class entity.
+            fields: list
+                The fields to export.
+            pdf_filename: str
+                The path of the PDF file.
+            PdfWriter: type
+                pypdf's PdfWriter.
+        """
+        with stage("render"), ProcessPoolExecutor(max_workers=self.config.workers) as pool:
+            futures = [pool.submit(function, *arguments) for function, arguments in self.get_page_jobs(entity_collection, fields)]
+            writer = PdfWriter()
+            for future in futures:
+                writer.append(BytesIO(future.result()))
+        with open(pdf_filename, 'wb') as pdf:
+            writer.write(pdf)
@@ -0,0 +1,72 @@
+import sys
+from tabulate import tabulate
+
+def format_summary(entity_collection, tablefmt="simple"):
+    """
+    Format every metric of every field of an entity collection as one text table, one row per field.
+    The metrics come straight from EntityCollection.summarize, nothing is plotted,
+    so matplotlib is never imported and already summarized data is formatted in milliseconds.
+    When the collection is partitioned on a group_by field, a table per field follows with one row per group.
+
+    Parameters:
+    - entity_collection (EntityCollection): The parsed data.
+    - tablefmt (str): The tabulate table format. Eg:- 'simple', 'github' or 'plain'.
+
+    Returns:
+    - str: The table.
+    """
+    summary = entity_collection.summarize(entity_collection.fields)
+    metrics = []
+    for field_summary in summary.values():
+        metrics.extend(metric for metric in field_summary if metric not in metrics)
+    rows = [[field] + [_to_cell(field_summary.get(metric)) for metric in metrics] for field, field_summary in summary.items()]
+    tables = [tabulate(rows, headers=["field"] + metrics, tablefmt=tablefmt, floatfmt=".4g", missingval="-")]
+    for field, groups in entity_collection.summarize_groups(entity_collection.fields).items():
+        rows = [[label] + [_to_cell(value) for value in group_summary.values()] for label, group_summary in groups.items()]
+        headers = [entity_collection.group_by] + list(next(iter(groups.values()), {}))
+        tables.append(field + "\n" + tabulate(rows, headers=headers, tablefmt=tablefmt, floatfmt=".4g", missingval="-"))
+    return "\n\n".join(tables)
+
+def format_ranks(entity_collection, entity_id, tablefmt="simple"):
+    """
+    Format the value and the rank of an entity in every field as one text table, 1 for the largest value.
+    The ranks come from the sorted index of every field, see EntityCollection.rank.
+
+    Parameters:
+    - entity_collection (EntityCollection): The parsed data.
+    - entity_id (str): The entity to rank.
+    - tablefmt (str): The tabulate table format.
+
+    Returns:
+    - str: The table, or a message when no entity has this id.
+    """
+    entity = entity_collection.get(entity_id)
+    if entity is None:
+        return "{}: no entity with this id".format(entity_id)
+    field_value_pairs = entity.field_value_pairs
+    rows = []
+    for field in entity_collection.fields:
+        rank = entity_collection.rank(field, entity_id)
+        value = field_value_pairs.get(field)
+        rows.append([field, _to_cell(value)] + (list(rank) if rank is not None else [None, None]))
+    return entity_id + "\n" + tabulate(rows, headers=["field", "value", "rank", "of"], tablefmt=tablefmt,
+                                       floatfmt=".4g", missingval="-")
+
+def print_summary(entity_collection, tablefmt="simple", file=None):
+    """
+    Print the text summary of an entity collection, see format_summary.
+
+    Parameters:
+    - entity_collection (EntityCollection): The parsed data.
+    - tablefmt (str): The tabulate table format.
+    - file: The stream the table is printed to, sys.stdout by default.
+    """
+    print(format_summary(entity_collection, tablefmt), file=file or sys.stdout)
+
+def _to_cell(value):
+    """
+    Helps to turn a numpy scalar into a plain number, so tabulate aligns and formats it like the others.
+    """
+    if value is None:
+        return None
+    return value.item() if hasattr(value, "item") else value
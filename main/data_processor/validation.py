@@ -0,0 +1,196 @@
+import sys
+import json
+from data_transformer.custom_exception import InvalidColumn
+
+MODES = ("table", "json")
+MISSING = "missing"
+NOT_NUMERIC = "not numeric"
+
+def get_reason(value):
+    """
+    Helps to tell why a raw value was rejected by the numeric conversion.
+
+    Parameters:
+    - value (Any): The raw value.
+
+    Returns:
+    - str: 'missing' for None, an empty string or NaN, 'not numeric' otherwise.
+    """
+    if value is None or (isinstance(value, str) and not value.strip()) or (isinstance(value, float) and value != value):
+        return MISSING
+    return NOT_NUMERIC
+
+class ValidationReport:
+    """
+    ValidationReport counts the values rejected by the numeric conversion, per field and reason,
+    and keeps the ids of the first `sample_size` rejected entities of every field and reason.
+    Nothing is printed while parsing: the report is printed once at the end, or written as JSON.
+    Like the running statistics, a report is attached to the entity collection, so the reports
+    of worker processes and of file shards are merged with the collections.
+
+    A field is aborted with InvalidColumn as soon as more than `max_invalid_fraction` of its values are rejected,
+    once at least `min_values` of them were checked. The default fraction, 1.0, never aborts.
+    """
+    def __init__(self, mode="table", report_path="validation.json", sample_size=5, max_invalid_fraction=1.0, min_values=1000):
+        """
+        Initialize a ValidationReport instance.
+
+        Parameters:
+        - mode (str): 'table' prints the rejections, 'json' writes them to report_path, empty to only count them.
+        - report_path (str): The file the JSON report is written to.
+        - sample_size (int): The number of entity ids kept per field and reason.
+        - max_invalid_fraction (float): The fraction of rejected values of a field above which the parsing is aborted.
+        - min_values (int): The number of values of a field checked before the fraction is tested.
+        """
+        if mode and mode not in MODES:
+            raise ValueError("Unsupported validation report '{}', expected one of {}".format(mode, ", ".join(MODES)))
+        self.mode = mode
+        self.report_path = report_path
+        self.sample_size = sample_size
+        self.max_invalid_fraction = max_invalid_fraction
+        self.min_values = min_values
+        self.checked = {}
+        self.rejected = {}
+        self.samples = {}
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Parameters:
+        - config (Config): The configuration, its validation_report, validation_path, validation_samples,
+          max_invalid_fraction and min_validated_values properties are used.
+
+        Returns:
+        - ValidationReport
+        """
+        return cls(config.validation_report, config.validation_path, config.validation_samples,
+                   config.max_invalid_fraction, config.min_validated_values)
+
+    def record(self, field, ids, rejections):
+        """
+        Add the result of the conversion of a batch of values of one field.
+
+        Parameters:
+        - field (str): The field the values belong to.
+        - ids (sequence): The entity ids of the checked values, in row order.
+        - rejections (dict): reason -> positions of the rejected values in the batch.
+        """
+        self.checked[field] = self.checked.get(field, 0) + len(ids)
+        for reason, positions in rejections.items():
+            self.__add_rejections__(field, reason, len(positions), [ids[position] for position in positions[:self.sample_size]])
+        if rejections:
+            self.__check__(field)
+
+    def merge(self, other):
+        """
+        Merge the rejections of another part of the data, Eg:- from another worker or file.
+
+        Parameters:
+        - other (ValidationReport): The report to merge.
+        """
+        for field, checked in other.checked.items():
+            self.checked[field] = self.checked.get(field, 0) + checked
+        for field, reasons in other.rejected.items():
+            for reason, count in reasons.items():
+                self.__add_rejections__(field, reason, count, other.samples[field][reason])
+            self.__check__(field)
+
+    def has_rejections(self):
+        """
+        Returns:
+        - bool: True if at least one value was rejected.
+        """
+        return any(self.rejected.values())
+
+    def get_rejected(self, field):
+        """
+        Parameters:
+        - field (str): The field.
+
+        Returns:
+        - int: The number of rejected values of the field.
+        """
+        return sum(self.rejected.get(field, {}).values())
+
+    def to_state(self):
+        """
+        Returns:
+        - dict: JSON serializable state of the report, with its settings.
+        """
+        return {"mode": self.mode, "report_path": self.report_path, "sample_size": self.sample_size,
+                "max_invalid_fraction": self.max_invalid_fraction, "min_values": self.min_values,
+                "checked": self.checked, "rejected": self.rejected,
+                "samples": {field: {reason: [str(entity_id) for entity_id in ids] for reason, ids in reasons.items()}
+                            for field, reasons in self.samples.items()}}
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Parameters:
+        - state (dict): State returned by to_state.
+
+        Returns:
+        - ValidationReport
+        """
+        report = cls(state["mode"], state["report_path"], state["sample_size"], state["max_invalid_fraction"], state["min_values"])
+        report.checked = dict(state["checked"])
+        report.rejected = {field: dict(reasons) for field, reasons in state["rejected"].items()}
+        report.samples = {field: {reason: list(ids) for reason, ids in reasons.items()} for field, reasons in state["samples"].items()}
+        return report
+
+    def to_dict(self):
+        """
+        Returns:
+        - dict: field -> checked count, rejected count and, per reason, the count and the sample of entity ids.
+        """
+        return {field: {"checked": checked,
+                        "rejected": self.get_rejected(field),
+                        "reasons": {reason: {"count": count, "sample": [str(entity_id) for entity_id in self.samples[field][reason]]}
+                                    for reason, count in self.rejected.get(field, {}).items()}}
+                for field, checked in self.checked.items()}
+
+    def format_table(self):
+        """
+        Returns:
+        - str: One line per field and reason with rejected values.
+        """
+        lines = ["{:<24} {:<12} {:>10} {:>10} {:>8}  {}".format("FIELD", "REASON", "REJECTED", "CHECKED", "SHARE", "SAMPLE IDS")]
+        for field, reasons in self.rejected.items():
+            checked = self.checked.get(field, 0)
+            for reason, count in reasons.items():
+                lines.append("{:<24} {:<12} {:>10} {:>10} {:>8.2%}  {}".format(
+                    field, reason, count, checked, count / checked if checked else 0,
+                    ", ".join(str(entity_id) for entity_id in self.samples[field][reason])))
+        return "\n".join(lines)
+
+    def report(self, file=None):
+        """
+        Prints the table of the rejections, if any, or writes the JSON report. Nothing is done when the mode is empty.
+
+        Parameters:
+        - file: The stream the table is printed to, sys.stdout by default.
+        """
+        if self.mode == "json":
+            with open(self.report_path, 'w') as report_file:
+                json.dump({"fields": self.to_dict()}, report_file, indent=2)
+        elif self.mode == "table" and self.has_rejections():
+            print("Validation: some values were skipped as they are not numeric", file=file or sys.stdout)
+            print(self.format_table(), file=file or sys.stdout)
+
+    def __add_rejections__(self, field, reason, count, sample):
+        """
+        Helps to add rejected values of a field, keeping at most sample_size ids
+        """
+        reasons = self.rejected.setdefault(field, {})
+        reasons[reason] = reasons.get(reason, 0) + count
+        kept = self.samples.setdefault(field, {}).setdefault(reason, [])
+        kept.extend(sample[:self.sample_size - len(kept)])
+
+    def __check__(self, field):
+        """
+        Helps to abort when too many values of a field are rejected
+        """
+        checked = self.checked.get(field, 0)
+        rejected = self.get_rejected(field)
+        if checked >= self.min_values and checked > 0 and rejected / checked > self.max_invalid_fraction:
+            raise InvalidColumn(field, rejected, checked, self.max_invalid_fraction)
@@ -1,14 +1,61 @@
-import re
+from itertools import islice
+from data_processor.entity import to_numeric
+from data_processor.online_stats import StatisticsEngine
+from data_processor.validation import ValidationReport
+from data_processor.instrumentation import stage
+from data_processor.grouping import encode_categories
+from data_transformer.expression import Expression, evaluate_expressions, is_expression
+
+def convert_batch(ids, raw_columns, fields, expressions, validation=None):
+    """
+    Converts one batch of raw columns into numbers and evaluates every expression over the whole batch.
+    It's a plain function so that worker processes can run it without a parser object.
+
+    :param ids (list): entity ids of the batch
+    :param raw_columns (dict): field -> raw values of the batch, for simple and operand fields
+    :param fields (List of String): Simple fields
+    :param expressions (List of Expression): compiled expressions
+    :param validation (ValidationReport): report the non numeric values are counted in
+    :return(dict): field or alias -> (float64 values, boolean mask)
+    """
+    columns = {}
+    for field, raw_values in raw_columns.items():
+        with stage("convert {}", field) as convert_stage:
+            columns[field] = to_numeric(field, raw_values, ids, validation)
+            convert_stage.add_rows(len(ids))
+    collection_columns = {field: columns[field] for field in fields}
+    if expressions:
+        with stage("expressions") as expressions_stage:
+            collection_columns.update(evaluate_expressions(expressions, columns, len(ids)))
+            expressions_stage.add_rows(len(ids))
+    return collection_columns
+
+def split_groups(raw_columns, group_by, numeric_fields):
+    """
+    Hash-partitions one batch on its group_by column. The column is removed from the raw columns
+    unless it's analyzed too, so its labels are never converted into numbers.
+    It's a plain function so that worker processes can run it without a parser object.
+
+    :param raw_columns (dict): field -> raw values of the batch
+    :param group_by (string): categorical field, empty or None for no grouping
+    :param numeric_fields (set): simple and operand fields
+    :return(tuple): raw columns to convert, and (group labels, group codes) of the batch or None
+    """
+    if not group_by:
+        return raw_columns, None
+    with stage("group {}", group_by):
+        labels = raw_columns[group_by] if group_by in numeric_fields else raw_columns.pop(group_by)
+        return raw_columns, encode_categories(labels)
 
 class Parser:
     """
     Parser class is a parent class which is inherited by all the other parsers classes.
     The main purpose of this parser class is to parse user expression.
     For Example:-
-    If user gives "English + Math As Total" as an expression,
-    1. this class helps to split and store parsed result
-    2. add score of English & Math
-    3. Store it as 'Total' in entity subject
+    If user gives "(English + Math) / 2 As Average" as an expression,
+    1. this class helps to compile the expression once into a syntax tree
+    2. evaluate it over whole columns of English & Math at once
+    3. Store it as 'Average' in entity collection
 
     It's child classes are responsible of parsing different data into entity collection
     """
@@ -20,7 +67,8 @@ class Parser:
         """
         self.config = config
         self.__parsed_expression_collection__ =[]
-    
+        self.__required_fields__ = set()
+
     def parse(self):
         """
         This class doesn't have any definition for parsing.
@@ -28,111 +76,127 @@ class Parser:
         :return: None
         """
         pass
-    
+
+    def read_batches(self, records):
+        """
+        Helps to group records lazily in batches of config.batch_size records,
+        so the child parsers never hold more than one batch in memory.
+
+        :param records: iterable of records (csv rows, xml elements or json objects)
+        :return: generator of batches (List of records)
+        """
+        records = iter(records)
+        while True:
+            with stage("read") as read_stage:
+                batch = list(islice(records, self.config.batch_size))
+                read_stage.add_rows(len(batch))
+            if not batch:
+                return
+            yield batch
+
     def get_computable_fields(self):
         """
-        Helps to read an expression and parse into simple individual components.
+        Helps to read the computable fields and separate expressions from simple fields.
         Example:
-        1. In case of expression fields, For Employee Domain if expression is 'Total_Task*Criticality As Score'
-        then this method converts this expression into ['Total_Task', 'Criticality', 'As' , '*', 'Score']
+        1. In case of expression fields, For Employee Domain if expression is '(Total_Task + Extra) * Criticality As Score'
+        then this method compiles it into an Expression with alias 'Score' and operands ['Total_Task', 'Extra', 'Criticality']
         and stores it into __parsed_expression_collection__.
 
         2. The simple fields are just added into list and returned.
         return:
         - fields(List of String) : List of fields(without any expression)
-
-        Limitations:
-        - Accepts only 2 operands in expression
         """
         fields = set()
         for field in self.config.computable_fields:
-            if "+" in field:
-                self.__parse_expression__("+", field)
-            elif "-" in field:
-                self.__parse_expression__("-", field)
-            elif "*" in field:
-                self.__parse_expression__("*", field)
-            elif "/" in field:
-                self.__parse_expression__("/", field)
+            if is_expression(field):
+                self.__parsed_expression_collection__.append(Expression(field))
             else:
                 fields.add(field)
         return fields
-      
+
+    def get_required_fields(self, fields):
+        """
+        Helps to compute once the only fields read from the file: the base field, the simple fields
+        and the operands of the expressions. The child parsers drop every other column, key or tag
+        as early as they can, so parse time and memory depend on the analyzed fields and not on the file width.
+
+        :param fields(set): Simple fields
+        :return(set): required fields, also stored in __required_fields__
+        """
+        self.__required_fields__ = {self.config.base_field} | set(fields) | self.get_operand_fields()
+        if self.config.group_by:
+            self.__required_fields__.add(self.config.group_by)
+        return self.__required_fields__
+
+    def init_groups(self):
+        """
+        Helps to partition the entity collection on config.group_by, see EntityCollection.summarize_groups.
+        Nothing is partitioned with config.online_statistics as no row is kept.
+
+        :return: None
+        """
+        if self.config.group_by and not self.config.online_statistics:
+            self.entityCollection.group_by = self.config.group_by
+
     def get_parsed_expression(self):
         """
-        Helps to return this private field, which contains parsed expression
+        Helps to return this private field, which contains compiled expressions
 
         :return: __parsed_expression_collection__
         """
         return self.__parsed_expression_collection__
-    
-    def evaluate_expression(self,first_term, second_term, alias, operator, entity_obj):
+
+    def get_operand_fields(self):
         """
-         Converts first and second operand into numbers and stores the
-         result of the expression in entity object
+        Helps to return every field used as an operand by the compiled expressions
 
-        :param first_term: (int) - first operand
-        :param second_term: (int) - second operand
-        :param alias: (string) - alias name for the result of expression
-        :param operator: (string/char) - mathematical symbols
-        :param entity_obj: (Entity) - Object of Entity
-        :return: None
+        :return(set): operand fields
         """
-        try:
-            operands = self.__validate_and_convert_operand__(first_term, second_term)
-            if operands is None:
-                raise ValueError("Please check the data. The data should be number")
-            else:
-                first_term, second_term = operands
-        except ValueError as e:
-            raise ValueError(e)
-        if "+" == operator:
-            entity_obj.add(alias, first_term+second_term)
-        elif "-" == operator:
-            entity_obj.add(alias, first_term - second_term)
-        elif "*" == operator:
-            entity_obj.add(alias, first_term * second_term)
-        elif "/" == operator:
-            entity_obj.add(alias, first_term / second_term)
-
-    def __parse_expression__(self,dynamic_splitter, field):
-        """
-        Helps to parse result with an exporession
-
-        :param dynamic_splitter(string/char): stores mathematical symbols like +,-,/,*
-        :param field(string): expression Eg:- A+B AS C
-        :return(list): parsed result in list Eg:- [A,B,AS,C]
-        """
-        pattern = r'\s*(?:[{}\s]|as)\s*'.format(dynamic_splitter)
-        matches = re.split(pattern, field)
-        self.__store_parsed_expression__(matches,dynamic_splitter)
-        
-    def __store_parsed_expression__(self, expression_collection, function):
-        """
-        This a simple helper class that stores the mathematical operands into existing expression list
-        and store it in expression_collection.
-
-        Adding operand into the list is useful when comes to calculating it.
-        Also, this is made as a separate method for readability.
-        As in previous methods adding + to match might confuse the readers.
-
-        :param expression_collection(list of string): [A,B,As,C]
-        :param function(string): +
+        return {operand for expression in self.__parsed_expression_collection__ for operand in expression.operands}
+
+    def ingest_batch(self, ids, raw_columns, fields):
+        """
+        Converts one batch of raw columns into numbers, evaluates every expression over the whole batch
+        and adds the simple fields and the expression results into the entity collection.
+        Rows with a missing operand or a division by zero get a masked (missing) value instead of failing the run.
+        Non numeric values are counted in the validation report of the collection, see get_validation.
+        With config.online_statistics the batch only updates the running statistics of the collection
+        and is dropped, so the memory used doesn't grow with the data.
+        With config.group_by the batch is also hash-partitioned on that column, see split_groups.
+
+        :param ids (list): entity ids of the batch
+        :param raw_columns (dict): field -> raw values of the batch, for simple, operand and group_by fields
+        :param fields (List of String): Simple fields
         :return: None
         """
-        expression_collection.append(function)
-        self.__parsed_expression_collection__.append(expression_collection)  
-        
-    def __validate_and_convert_operand__(self, first_term, second_term):
-        """
-        Helps to validate and convert the operands into numbers
-        :param first_term (string): first operand
-        :param second_term (string): second operand
-        :return (int, int): first operand, second operand both as number
-        """
-        try:
-            first_term = int(first_term)
-            second_term = int(second_term)
-            return first_term, second_term
-        except ValueError:
-            raise ValueError("PARSER: The operands are not numeric")
\ No newline at end of file
+        raw_columns, groups = split_groups(raw_columns, self.config.group_by, set(fields) | self.get_operand_fields())
+        collection_columns = convert_batch(ids, raw_columns, fields, self.__parsed_expression_collection__,
+                                           self.get_validation())
+        with stage("store") as store_stage:
+            store_stage.add_rows(len(ids))
+            if self.config.online_statistics:
+                self.get_statistics().update(collection_columns)
+                return
+            self.entityCollection.extend(ids, collection_columns, groups)
+
+    def get_statistics(self):
+        """
+        Helps to return the running statistics of the entity collection, they are created on first use
+        with the error bounds of the config
+
+        :return(StatisticsEngine): running statistics
+        """
+        if self.entityCollection.statistics is None:
+            self.entityCollection.statistics = StatisticsEngine(self.config.quantile_error, self.config.mode_error)
+        return self.entityCollection.statistics
+
+    def get_validation(self):
+        """
+        Helps to return the validation report of the entity collection, it's created on first use
+        with the report and abort settings of the config
+
+        :return(ValidationReport): validation report
+        """
+        if self.entityCollection.validation is None:
+            self.entityCollection.validation = ValidationReport.from_config(self.config)
+        return self.entityCollection.validation
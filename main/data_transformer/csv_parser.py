@@ -1,15 +1,117 @@
 import os
 import csv
-from data_transformer.abstract_parser import Parser
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+import numpy as np
+from data_transformer.abstract_parser import Parser, convert_batch, split_groups
+from data_transformer.incremental_state import IncrementalState
+from data_processor.online_stats import StatisticsEngine
+from data_processor.validation import ValidationReport
+from data_processor.grouping import remap_codes
 from data_processor.entity import EntityCollection as EC
 from data_transformer.custom_exception import EntityCollectionMismatch as EMC
 
+MIN_CHUNK_BYTES = 1 << 20
+CHUNKS_PER_WORKER = 4
+
+def _get_projection(column_index, base_field, fields):
+    """
+    Helps to build the projection of the csv rows on the base field and the needed fields
+    :param column_index(dict): column name -> position in the csv row
+    :param base_field(string): base field of the config
+    :param fields(set): simple and operand fields
+    :return: itemgetter of the needed positions, field names in the same order (base field first)
+    """
+    names = [base_field] + sorted(set(fields) - {base_field})
+    return itemgetter(*[column_index[name] for name in names]), names
+
+def _rows_to_columns(batch, projection):
+    """
+    Helps to take the id and each needed field of a batch of csv rows as whole columns.
+    Only the needed positions are picked from every row, then the picked tuples are transposed at once.
+    :param batch (List of csv row): csv rows
+    :param projection: itemgetter and field names returned by _get_projection
+    :return: ids, raw columns
+    """
+    getter, names = projection
+    if len(names) == 1:
+        return list(map(getter, batch)), {}
+    columns = list(zip(*map(getter, batch)))
+    return list(columns[0]), dict(zip(names[1:], columns[1:]))
+
+def _parse_chunk(path, start, end, projection, fields, expressions, batch_size, statistics=None, validation=None,
+                 group_by=None):
+    """
+    Parses the rows between two byte offsets aligned on line boundaries.
+    It runs in a worker process: projection, numeric conversion and expressions all happen here,
+    only the resulting id list and column arrays are sent back.
+    When `statistics` is given, every batch only updates it and no value is kept,
+    the id list and the columns are then empty.
+    The non numeric values are counted in `validation`, which is sent back as well.
+    With `group_by` every row is hash-partitioned on that column and the group codes of the whole chunk are sent back.
+
+    :param path(string): csv file path
+    :param start(int): first byte of the chunk
+    :param end(int): byte after the last line of the chunk
+    :param projection: itemgetter and field names returned by _get_projection
+    :param fields(List of String): Simple fields
+    :param expressions(List of Expression): compiled expressions
+    :param batch_size(int): number of rows converted at a time
+    :param statistics(StatisticsEngine): running statistics to update instead of keeping the values
+    :param validation(ValidationReport): report the non numeric values are counted in
+    :param group_by(string): categorical field the rows are partitioned on, None for no grouping
+    :return: ids, dict field or alias -> (values, mask), statistics, validation, (group labels, group codes) or None
+    """
+    ids = []
+    parts = {}
+    numeric_fields = set(fields) | {operand for expression in expressions for operand in expression.operands}
+    categories, category_index, group_parts = [], {}, []
+    with open(path, 'rb') as file:
+        file.seek(start)
+        lines = (line.decode('utf-8') for line in _read_lines(file, end - start))
+        rows = (row for row in csv.reader(lines) if row)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            batch_ids, raw_columns = _rows_to_columns(batch, projection)
+            raw_columns, groups = split_groups(raw_columns, group_by, numeric_fields)
+            collection_columns = convert_batch(batch_ids, raw_columns, fields, expressions, validation)
+            if statistics is not None:
+                statistics.update(collection_columns)
+                continue
+            for field, column in collection_columns.items():
+                parts.setdefault(field, []).append(column)
+            if groups is not None:
+                group_parts.append(remap_codes(categories, category_index, *groups))
+            ids.extend(batch_ids)
+    columns = {field: (np.concatenate([values for values, _ in column]), np.concatenate([mask for _, mask in column]))
+               for field, column in parts.items()}
+    groups = (categories, np.concatenate(group_parts)) if group_parts else None
+    return ids, columns, statistics, validation, groups
+
+def _read_lines(file, length):
+    """
+    Helps to read whole lines from the current position until `length` bytes are consumed
+    :param file: binary file object
+    :param length(int): number of bytes to read
+    :return: generator of lines (bytes)
+    """
+    while length > 0:
+        line = file.readline()
+        if not line:
+            return
+        length -= len(line)
+        yield line
+
 class CsvParser(Parser):
     """
         This is an important class variable that distinguishes it from other child parsers.
         It is used by Data Manager factory for the parser's it's type
     """
     type = "CSV"
+    extensions = ['.csv']
     def __init__(self, config):
         """
         Helps to initialize
@@ -17,80 +119,195 @@ class CsvParser(Parser):
         """
         super().__init__(self)
         self.config = config
-        self.entityCollection = EC()
+        self.entityCollection = EC(columnar=self.config.columnar, duplicates=self.config.duplicates)
 
     def parse(self):
         """
          This method helps to:-
          1. validate the file
-         2. convert CSV to entity collection
+         2. stream the CSV in batches of config.batch_size rows into the entity collection,
+         so the whole file is never held in memory
          2.1. handles normal fields separately
          2.2. handles expression field separately
 
          :return(EntityCollection): Helps to return Entity Collection
          """
-        data = self.__validate__()
+        self.__validate_file_name__()
         fields = self.get_computable_fields()
         parsed_expressions = self.get_parsed_expression()
-        self.entityCollection.fields = list(fields) + [expression[3] for expression in self.get_parsed_expression()]
-        for row in data:
-            entity_object = self.entityCollection.add_entity(row[self.config.base_field])
-            self.__handle_normal_fields__(row, fields, entity_object)
-            self.__handle_expression_fields__(row, parsed_expressions, entity_object)
+        self.entityCollection.fields = list(fields) + [expression.alias for expression in parsed_expressions]
+        self.init_groups()
+        if self.config.incremental:
+            return self.__parse_incremental__(fields, parsed_expressions)
+        if self.config.workers > 1:
+            return self.__parse_parallel__(fields, parsed_expressions)
+        try:
+            with open(self.config.path, 'r', newline='') as file:
+                csv_reader = csv.reader(file)
+                header = next(csv_reader, None)
+                batches = self.read_batches(row for row in csv_reader if row)
+                first_batch = next(batches, [])
+                projection = self.__validate__(header, first_batch, fields, parsed_expressions)
+                for batch in chain([first_batch], batches):
+                    self.__handle_batch__(batch, fields, projection)
+        except FileNotFoundError:
+            raise FileNotFoundError("CSV Parser: File not found in path {}".format(self.config.path))
         return self.entityCollection
 
-    def __handle_normal_fields__(self, row, fields, entity_object):
+    def __handle_batch__(self, batch, fields, projection):
         """
-        Loops through each row in csv and add its field and value in entity
+        Takes each simple or operand field of one batch of csv rows as a whole column
+        and hands it to the entity collection. The other columns are never read.
 
-        :param row (csv row): csv row
+        :param batch (List of csv row): csv rows
         :param fields(List of String): Simple fields
-        :param entity_object(Entity): Entity object
+        :param projection: itemgetter and field names returned by _get_projection
         :return: None
         """
-        for field in fields:
-            entity_object.add(field, row[field])
+        ids, raw_columns = _rows_to_columns(batch, projection)
+        self.ingest_batch(ids, raw_columns, fields)
 
-    def __handle_expression_fields__(self, row, parsed_expressions, entity_object):
+    def __parse_parallel__(self, fields, parsed_expressions):
         """
-        This method helps to handle expression fields like "A/B as div"
+        Parses the csv with config.workers processes.
+        The file is split into byte ranges aligned on line boundaries, each range is parsed in a worker
+        and the column arrays are added back into the entity collection in the original row order.
+        With config.online_statistics every worker builds its own running statistics instead,
+        and they are merged into the statistics of the entity collection. The validation reports are merged the same way,
+        and the group codes of every chunk are remapped into the groups of the entity collection.
+        NOTE: quoted values containing line breaks are not supported in this mode.
 
-        :param row (csv row): this is one csv row
-        :param parsed_expressions (List of string): parsed list of expression
-        :param entity_object (Entity): Entity object
-        :return: None
-        """
-        for expression in parsed_expressions:
-            self.evaluate_expression(row[expression[0]], row[expression[1]],
-                                     expression[3], expression[4], entity_object)
-
-    def __validate__(self):
-        """
-        Helps to do simple validations that checks the file's presence, type and content
-        :return: data
+        :param fields(List of String): Simple fields
+        :param parsed_expressions (List of Expression): compiled expressions
+        :return(EntityCollection): Helps to return Entity Collection
         """
-        file_Name = os.path.basename(self.config.path)
-        if ".csv" not in file_Name:
-            raise ValueError("CSV PARSER: Incorrect Parser")
         try:
-            data = self.__load_data__()
-            if len(data) == 0:
-                raise EMC("CSV PARSER", self.config.path)
-            return data
-        except Exception:
-            raise Exception("CSV PARSER: Invalid CSV")
+            with open(self.config.path, 'r', newline='', encoding='utf-8') as file:
+                csv_reader = csv.reader(file)
+                header = next(csv_reader, None)
+                projection = self.__validate__(header, list(islice(csv_reader, 1)), fields, parsed_expressions)
+            chunks = self.__split_chunks__()
+        except FileNotFoundError:
+            raise FileNotFoundError("CSV Parser: File not found in path {}".format(self.config.path))
+        statistics = None
+        if self.config.online_statistics:
+            statistics = StatisticsEngine(self.config.quantile_error, self.config.mode_error)
+        with ProcessPoolExecutor(max_workers=self.config.workers) as pool:
+            futures = [pool.submit(_parse_chunk, self.config.path, start, end, projection,
+                                   fields, parsed_expressions, self.config.batch_size, statistics,
+                                   ValidationReport.from_config(self.config), self.config.group_by) for start, end in chunks]
+            for future in futures:
+                ids, columns, chunk_statistics, chunk_validation, groups = future.result()
+                if chunk_statistics is not None:
+                    self.get_statistics().merge(chunk_statistics)
+                self.get_validation().merge(chunk_validation)
+                self.entityCollection.extend(ids, columns, groups)
+        return self.entityCollection
 
-    def __load_data__(self):
+    def __parse_incremental__(self, fields, parsed_expressions):
         """
-        Helps to load the file
-        :return: data
+        Parses only the rows appended since the previous run.
+        The byte offset and the running statistics of the previous run are loaded from IncrementalState,
+        the new complete lines are parsed and their values are merged into the statistics:
+        mean, min, max and count stay exact, median and mode come from mergeable sketches.
+        When the file was truncated or rewritten, the whole file is parsed again.
+        The returned entity collection holds the new rows, its summaries cover the whole file.
+        With config.online_statistics the new rows only update the statistics and the collection stays empty.
+
+        :param fields(List of String): Simple fields
+        :param parsed_expressions (List of Expression): compiled expressions
+        :return(EntityCollection): Helps to return Entity Collection
         """
         try:
-            with open(self.config.path, 'r') as file:
+            with open(self.config.path, 'r', newline='', encoding='utf-8') as file:
                 csv_reader = csv.reader(file)
                 header = next(csv_reader, None)
-                return [dict(zip(header, row)) for row in csv_reader]
+                projection = self.__validate__(header, list(islice(csv_reader, 1)), fields, parsed_expressions)
+            with open(self.config.path, 'rb') as file:
+                file.readline()
+                data_start = file.tell()
+            end = self.__get_complete_lines_end__()
         except FileNotFoundError:
             raise FileNotFoundError("CSV Parser: File not found in path {}".format(self.config.path))
-        except Exception as e:
-            raise Exception(e)
+        state = IncrementalState(self.config)
+        start = state.offset if state.load(header) else data_start
+        online_statistics = state.statistics if self.config.online_statistics else None
+        ids, columns, _, _, groups = _parse_chunk(self.config.path, start, end, projection, fields, parsed_expressions,
+                                                  self.config.batch_size, online_statistics, self.get_validation(),
+                                                  self.config.group_by)
+        self.entityCollection.extend(ids, columns, groups)
+        if online_statistics is None:
+            state.statistics.update({field: self.entityCollection.get_column(field) for field in self.entityCollection.fields})
+        state.save(end, header)
+        self.entityCollection.statistics = state.statistics
+        return self.entityCollection
+
+    def __get_complete_lines_end__(self):
+        """
+        Helps to find the end of the last complete line, so a line still being appended is left for the next run
+        :return(int): byte offset after the last line break
+        """
+        size = os.path.getsize(self.config.path)
+        with open(self.config.path, 'rb') as file:
+            position = size
+            while position > 0:
+                block_start = max(position - MIN_CHUNK_BYTES, 0)
+                file.seek(block_start)
+                block = file.read(position - block_start)
+                line_break = block.rfind(b'\n')
+                if line_break != -1:
+                    return block_start + line_break + 1
+                position = block_start
+        return 0
+
+    def __split_chunks__(self):
+        """
+        Helps to split the data part of the file (after the header) into byte ranges.
+        Every boundary is moved forward to the start of the next line.
+
+        :return(list): (start, end) byte offsets
+        """
+        size = os.path.getsize(self.config.path)
+        with open(self.config.path, 'rb') as file:
+            file.readline()
+            data_start = file.tell()
+            chunk_bytes = max((size - data_start) // (self.config.workers * CHUNKS_PER_WORKER), MIN_CHUNK_BYTES)
+            boundaries = [data_start]
+            while boundaries[-1] + chunk_bytes < size:
+                file.seek(boundaries[-1] + chunk_bytes)
+                file.readline()
+                if file.tell() >= size:
+                    break
+                boundaries.append(file.tell())
+        boundaries.append(size)
+        return list(zip(boundaries[:-1], boundaries[1:]))
+
+    def __validate_file_name__(self):
+        """
+        Helps to check the file's type before reading it
+        :return: None
+        """
+        file_Name = os.path.basename(self.config.path)
+        if ".csv" not in file_Name:
+            raise ValueError("CSV PARSER: Incorrect Parser")
+
+    def __validate__(self, header, first_batch, fields, parsed_expressions):
+        """
+        Helps to do simple validations on the header and the first batch.
+        The file is considered as mismatching the config if it's empty
+        or if any of the configured columns is missing in the header.
+        The rows are then projected on the required fields only.
+
+        :param header (csv row): header of the csv
+        :param first_batch (List of csv row): first batch of rows
+        :param fields(List of String): Simple fields
+        :param parsed_expressions (List of Expression): compiled expressions
+        :return: projection of the rows, see _get_projection
+        """
+        if header is None or len(first_batch) == 0:
+            raise EMC("CSV PARSER", self.config.path)
+        column_index = {column: position for position, column in enumerate(header)}
+        required_columns = self.get_required_fields(fields)
+        if not required_columns.issubset(column_index):
+            raise EMC("CSV PARSER", self.config.path)
+        return _get_projection(column_index, self.config.base_field, required_columns)
@@ -9,6 +9,8 @@ class EmptyData(Exception):
         Helps to initialize the data
         :param path: file path
         """
+        # the path is given to Exception so that the error can be sent back from a worker process
+        super().__init__(path)
         self.path = path
     def __str__(self):
         """
@@ -54,4 +56,30 @@ class UnsupportedDataType(Exception):
             :return: Error
         """
         config_path = os.path.join(os.getcwd(), "config.json")
-        return "Unsupported type : {} is found in config : {}".format(self.file_extension, config_path)
\ No newline at end of file
+        return "Unsupported type : {} is found in config : {}".format(self.file_extension, config_path)
+
+class InvalidColumn(Exception):
+    """
+    Helps to raise exception when too many values of a field are not numeric
+    """
+    def __init__(self, field, rejected, checked, max_invalid_fraction):
+        """
+        Helps to initialize
+        :param field: field name
+        :param rejected: number of rejected values
+        :param checked: number of checked values
+        :param max_invalid_fraction: configured fraction of rejected values above which the parsing is aborted
+        """
+        # the arguments are given to Exception so that the error can be sent back from a worker process
+        super().__init__(field, rejected, checked, max_invalid_fraction)
+        self.field = field
+        self.rejected = rejected
+        self.checked = checked
+        self.max_invalid_fraction = max_invalid_fraction
+    def __str__(self):
+        """
+            Helps to return output error in a custom format
+            :return: Error
+        """
+        return "{} of {} values of field '{}' are not numeric, above max_invalid_fraction {}. Please check the data".format(
+            self.rejected, self.checked, self.field, self.max_invalid_fraction)
@@ -1,7 +1,23 @@
+import os
+import copy
+from concurrent.futures import ProcessPoolExecutor
 from data_transformer.json_parser import JsonParser
+from data_transformer.ndjson_parser import NdjsonParser
 from data_transformer.xml_parser import XmlParser
 from data_transformer.csv_parser import CsvParser
+from data_transformer.parse_cache import ParseCache
+from data_processor.entity import EntityCollection as EC
+from data_processor.instrumentation import stage
 from data_transformer.custom_exception import EmptyData as ED
+from data_transformer.custom_exception import UnsupportedDataType
+
+def _parse_file(config):
+    """
+    Parses a single file. It's a plain function so that it can run in a worker process.
+    :param config: Config of a single file
+    :return(EntityCollection): parsed entity collection
+    """
+    return DataManagerFactory(config).call_parser()
 
 class DataManagerFactory:
     """ Helps to call respective  parser depending on data type of input content
@@ -18,11 +34,13 @@ class DataManagerFactory:
         """
         self.parsers = []
         self.config = config
+        self.failures = []
         self.__register__()
 
     def __register__(self):
         """ Helps to register the parsers"""
         self.parsers.append(JsonParser)
+        self.parsers.append(NdjsonParser)
         self.parsers.append(XmlParser)
         self.parsers.append(CsvParser)
 
@@ -30,24 +48,116 @@ class DataManagerFactory:
         """ Responsible for calling the respective parser by analysing the type of each registered parsers against config
         If the returned data is empty, throws error
         If not, then calls Performance Summarizer
+        When the config path is a list or a glob pattern, every file is parsed by __call_parsers__ instead
+        When config.cache is True, the parsed data is loaded from or stored into the on-disk cache,
+        except in incremental mode where the parser keeps its own state
+        and in online statistics mode where no value is kept to be cached
+        """
+        if self.config.is_multi_file():
+            return self.__call_parsers__()
+        if not self.config.cache or self.config.incremental or self.config.online_statistics:
+            return self.__call_parser__()
+        cache = ParseCache(self.config)
+        with stage("cache load"):
+            entityCollection = cache.load()
+        if entityCollection is None:
+            entityCollection = self.__call_parser__()
+            with stage("cache store"):
+                cache.store(entityCollection)
+        return entityCollection
+
+    def __call_parser__(self):
+        """ Helps to run the parser matching config data_type on a single file
+        If the returned data is empty, throws error
         """
         try:
             for parser in self.parsers:
                 if parser.type == self.config.data_type:
                     respective_parser = parser(self.config)
-                    entityCollection = respective_parser.parse()
+                    with stage("{} parser", parser.type) as parser_stage:
+                        entityCollection = respective_parser.parse()
+                        parser_stage.add_rows(len(entityCollection))
                     if self.__is_empty__(entityCollection):
                         raise ED(self.config.path)
                     return entityCollection
         except Exception as e:
             raise Exception(e)
 
+    def __call_parsers__(self):
+        """ Responsible for parsing several files (CSV, JSON, NDJSON and XML can be mixed).
+        Every file is sent to the parser matching its extension, in a pool of config.workers processes,
+        and the results are merged into a single entity collection in the order of the paths.
+        A file that fails is reported and recorded in self.failures, the other files are still merged.
+        With config.cache each file is cached on its own, so unchanged shards are not parsed again.
+        If every file fails, throws error
+        If the merged data is empty (Eg:- every file is empty), throws the same error as a single empty file
+        """
+        file_configs = [self.__get_file_config__(path) for path in self.config.get_paths()]
+        if self.config.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.config.workers) as pool:
+                futures = [pool.submit(_parse_file, file_config) for file_config in file_configs]
+                results = [self.__get_result__(file_config, future.result) for file_config, future in zip(file_configs, futures)]
+        else:
+            results = [self.__get_result__(file_config, lambda: _parse_file(file_config)) for file_config in file_configs]
+        entityCollection = EC([], columnar=self.config.columnar, duplicates=self.config.duplicates)
+        for result in results:
+            if result is not None:
+                entityCollection.merge(result)
+        for path, error in self.failures:
+            print("Failed to parse {}: {}".format(path, error))
+        if len(self.failures) == len(file_configs) and not all(self.__is_empty_error__(error) for _, error in self.failures):
+            raise Exception("Every file failed to parse: {}".format(self.config.path))
+        if self.__is_empty__(entityCollection):
+            raise ED(self.config.path)
+        return entityCollection
+
+    def __get_file_config__(self, path):
+        """
+        Helps to create the config of a single file of a multi file config.
+        The data type comes from the file extension and each file is parsed by a single process.
+        Files are always parsed in columnar mode, so only compact arrays are sent back from the workers.
+        :param path: file path
+        :return: Config of the file
+        """
+        _, file_extension = os.path.splitext(path)
+        file_config = copy.copy(self.config)
+        file_config.path = path
+        file_config.workers = 1
+        file_config.columnar = True
+        for parser in self.parsers:
+            if file_extension.lower() in parser.extensions:
+                file_config.data_type = parser.type
+                return file_config
+        raise UnsupportedDataType(file_extension)
+
+    def __get_result__(self, file_config, parse):
+        """
+        Helps to run the parsing of a single file and record its failure
+        :param file_config: Config of the file
+        :param parse: callable returning the parsed entity collection
+        :return(EntityCollection): parsed entity collection or None if it failed
+        """
+        try:
+            return parse()
+        except Exception as e:
+            self.failures.append((file_config.path, e))
+            return None
+
+    def __is_empty_error__(self, error):
+        """
+        Helps to tell if a file failed only because its data is empty
+        :param error: error recorded in self.failures, __call_parser__ wraps the EmptyData error in an Exception
+        :return: True or False
+        """
+        return isinstance(error, ED) or (len(error.args) > 0 and isinstance(error.args[0], ED))
+
     def __is_empty__(self, entityCollection):
         """
         This method helps to validate if the data is empty or not
         The data is considered empty if:-
             1. there is no entities
             2. there is no field-value pairs for all entities in collection
+        A collection with running statistics (incremental parsing or online statistics) is not empty even without entities
 
         parameter:
          - entityCollection(EntityCollection)
@@ -55,9 +165,8 @@ class DataManagerFactory:
         return:
          - True or False
          """
-        if entityCollection.items.count == 0:
+        if entityCollection.statistics is not None and entityCollection.statistics.has_values():
+            return False
+        if len(entityCollection) == 0:
             return True
-        for entity in entityCollection.items:
-            if len(entity.field_value_pairs) != 0:
-                return False
-        return True
+        return not entityCollection.has_values()
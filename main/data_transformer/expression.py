@@ -0,0 +1,175 @@
+import re
+import numpy as np
+
+OPERATORS = "+-*/"
+_ALIAS = re.compile(r'^(?P<body>.+?)\s+as\s+(?P<alias>\S+)\s*$', re.IGNORECASE | re.S)
+_TOKEN = re.compile(r'\s*(?:(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)|(?P<name>[A-Za-z_][\w.]*)|(?P<symbol>\S))')
+
+def is_expression(field):
+    """
+    Helps to know if a computable field is an expression or a simple field
+    :param field (string): computable field from config. Eg:- 'Math' or '(A + B) * C As Score'
+    :return(bool): True if the field contains any operator
+    """
+    return any(operator in field for operator in OPERATORS)
+
+class Expression:
+    """
+    Expression is parsed only once, when the config is read, into a small syntax tree made of tuples:
+    ('field', name), ('number', value), ('neg', node) and (operator, left, right).
+    Tuples are hashable, so an identical subexpression used by several expressions is the same key
+    and is evaluated only once per batch by evaluate_expressions.
+
+    For Example:-
+    '(A + B) * C / D as Score' gives alias 'Score', operands ['A', 'B', 'C', 'D'] and the tree
+    ('/', ('*', ('+', ('field', 'A'), ('field', 'B')), ('field', 'C')), ('field', 'D'))
+    """
+    def __init__(self, text):
+        """
+        Helps to initialize
+        :param text (string): expression with an alias. Eg:- '(A + B) * C / D as Score'
+        """
+        match = _ALIAS.match(text.strip())
+        if match is None:
+            raise ValueError("PARSER: Expression '{}' has no alias. Eg:- A + B as C".format(text))
+        self.text = text
+        self.alias = match.group('alias')
+        self.__tokens__ = self.__tokenize__(match.group('body'))
+        self.__position__ = 0
+        self.root = self.__parse_sum__()
+        if self.__position__ != len(self.__tokens__):
+            raise ValueError("PARSER: Unexpected '{}' in expression '{}'".format(self.__tokens__[self.__position__][1], text))
+        self.operands = []
+        self.__collect_operands__(self.root)
+
+    def __tokenize__(self, body):
+        """
+        Helps to split the expression into (kind, value) tokens
+        :param body (string): expression without the alias
+        :return(list): tokens
+        """
+        tokens = []
+        for match in _TOKEN.finditer(body.rstrip()):
+            kind = match.lastgroup
+            if kind == 'symbol' and match.group(kind) not in OPERATORS + "()":
+                raise ValueError("PARSER: Unsupported symbol '{}' in expression '{}'".format(match.group(kind), self.text))
+            tokens.append((kind, match.group(kind)))
+        return tokens
+
+    def __peek__(self):
+        """
+        :return(string): value of the next token, None at the end
+        """
+        if self.__position__ < len(self.__tokens__):
+            return self.__tokens__[self.__position__][1]
+        return None
+
+    def __parse_sum__(self):
+        """
+        sum := product (('+' | '-') product)*
+        """
+        node = self.__parse_product__()
+        while self.__peek__() in ('+', '-'):
+            operator = self.__peek__()
+            self.__position__ += 1
+            node = (operator, node, self.__parse_product__())
+        return node
+
+    def __parse_product__(self):
+        """
+        product := factor (('*' | '/') factor)*
+        """
+        node = self.__parse_factor__()
+        while self.__peek__() in ('*', '/'):
+            operator = self.__peek__()
+            self.__position__ += 1
+            node = (operator, node, self.__parse_factor__())
+        return node
+
+    def __parse_factor__(self):
+        """
+        factor := '-' factor | '(' sum ')' | number | field
+        """
+        if self.__position__ >= len(self.__tokens__):
+            raise ValueError("PARSER: Incomplete expression '{}'".format(self.text))
+        kind, value = self.__tokens__[self.__position__]
+        self.__position__ += 1
+        if kind == 'number':
+            return ('number', float(value))
+        if kind == 'name':
+            return ('field', value)
+        if value == '-':
+            return ('neg', self.__parse_factor__())
+        if value == '(':
+            node = self.__parse_sum__()
+            if self.__peek__() != ')':
+                raise ValueError("PARSER: Missing ')' in expression '{}'".format(self.text))
+            self.__position__ += 1
+            return node
+        raise ValueError("PARSER: Unexpected '{}' in expression '{}'".format(value, self.text))
+
+    def __collect_operands__(self, node):
+        """
+        Helps to list the fields used by the expression, in order of appearance
+        :param node (tuple): node of the syntax tree
+        :return: None
+        """
+        if node[0] == 'field':
+            if node[1] not in self.operands:
+                self.operands.append(node[1])
+        elif node[0] != 'number':
+            for child in node[1:]:
+                self.__collect_operands__(child)
+
+def evaluate_expressions(expressions, columns, size):
+    """
+    Helps to evaluate compiled expressions over whole columns at once.
+    Shared subexpressions are computed only once.
+    A result is masked when any of its operands is missing or when it's not finite, Eg:- division by zero.
+
+    :param expressions (List of Expression): compiled expressions
+    :param columns (dict): field -> (float64 values, boolean mask)
+    :param size (int): number of rows in the columns
+    :return(dict): alias -> (float64 values, boolean mask)
+    """
+    cache = {}
+    results = {}
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for expression in expressions:
+            values, mask = _evaluate(expression.root, columns, cache)
+            mask = np.broadcast_to(mask & np.isfinite(values), (size,))
+            results[expression.alias] = (np.where(mask, values, np.nan), mask.copy())
+    return results
+
+def _evaluate(node, columns, cache):
+    """
+    Helps to evaluate one node of the syntax tree, using already computed nodes from cache
+    :param node (tuple): node of the syntax tree
+    :param columns (dict): field -> (float64 values, boolean mask)
+    :param cache (dict): node -> (values, mask)
+    :return: (values, mask)
+    """
+    if node in cache:
+        return cache[node]
+    kind = node[0]
+    if kind == 'field':
+        result = columns[node[1]]
+    elif kind == 'number':
+        result = (np.float64(node[1]), np.True_)
+    elif kind == 'neg':
+        values, mask = _evaluate(node[1], columns, cache)
+        result = (-values, mask)
+    else:
+        left_values, left_mask = _evaluate(node[1], columns, cache)
+        right_values, right_mask = _evaluate(node[2], columns, cache)
+        if kind == '+':
+            values = left_values + right_values
+        elif kind == '-':
+            values = left_values - right_values
+        elif kind == '*':
+            values = left_values * right_values
+        else:
+            values = left_values / right_values
+        result = (values, left_mask & right_mask)
+    cache[node] = result
+    return result
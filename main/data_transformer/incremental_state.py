@@ -0,0 +1,93 @@
+import os
+import json
+import hashlib
+from data_processor.online_stats import StatisticsEngine
+
+READ_BLOCK = 1 << 20
+
+class IncrementalState:
+    """
+    IncrementalState remembers, between two runs over an append-only CSV file,
+    how far the file was read and the running statistics of every field up to that point.
+
+    The already read part of the file is identified by a fingerprint, a hash of its size and of all its bytes,
+    so a truncated or rewritten file, even edited in the middle without changing its size, is detected
+    and fully parsed again instead of being wrongly extended. Hashing reads the already read part again,
+    which is much cheaper than parsing it.
+    """
+    def __init__(self, config):
+        """
+        Helps to initialize
+        :param config: Config class object
+        """
+        self.config = config
+        key_data = {
+            "path": os.path.abspath(config.path),
+            "data_type": config.data_type,
+            "base_field": config.base_field,
+            "computable_fields": config.computable_fields,
+            "quantile_error": config.quantile_error,
+            "mode_error": config.mode_error
+        }
+        key = hashlib.sha256(json.dumps(key_data, sort_keys=True).encode()).hexdigest()
+        self.state_path = os.path.join(config.cache_dir, "incremental", key + ".json")
+        self.offset = 0
+        self.header = None
+        self.statistics = StatisticsEngine(config.quantile_error, config.mode_error)
+
+    def load(self, header):
+        """
+        Helps to load the state of the previous run.
+        The state is dropped (offset 0, empty statistics) when it doesn't exist,
+        when the header changed or when the already read part of the file changed.
+        :param header (csv row): current header of the csv
+        :return(bool): True if the previous state can be extended
+        """
+        if not os.path.exists(self.state_path):
+            return False
+        with open(self.state_path, 'r') as state_file:
+            state = json.load(state_file)
+        if state["header"] != header or state["fingerprint"] != self.__fingerprint__(state["offset"]):
+            return False
+        self.offset = state["offset"]
+        self.header = state["header"]
+        self.statistics = StatisticsEngine.from_state(state["statistics"])
+        return True
+
+    def save(self, offset, header):
+        """
+        Helps to store the state for the next run
+        :param offset (int): byte offset after the last complete line read
+        :param header (csv row): header of the csv
+        :return: None
+        """
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        state = {
+            "offset": offset,
+            "header": header,
+            "fingerprint": self.__fingerprint__(offset),
+            "statistics": self.statistics.to_state()
+        }
+        temporary = "{}.tmp{}".format(self.state_path, os.getpid())
+        with open(temporary, 'w') as state_file:
+            json.dump(state, state_file)
+        os.replace(temporary, self.state_path)
+
+    def __fingerprint__(self, offset):
+        """
+        Helps to hash the first `offset` bytes of the file, read block by block
+        :param offset (int): size of the part of the file to identify
+        :return(string): hexadecimal hash, None if the file is shorter than offset
+        """
+        if os.path.getsize(self.config.path) < offset:
+            return None
+        digest = hashlib.sha256(str(offset).encode())
+        remaining = offset
+        with open(self.config.path, 'rb') as file:
+            while remaining > 0:
+                block = file.read(min(remaining, READ_BLOCK))
+                if not block:
+                    return None
+                digest.update(block)
+                remaining -= len(block)
+        return digest.hexdigest()
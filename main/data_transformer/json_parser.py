@@ -1,15 +1,35 @@
 import os
-import json
+from itertools import chain
 from data_transformer.abstract_parser import Parser
+from data_transformer.json_stream import JsonStream
 from data_processor.entity import EntityCollection as EC
 from data_transformer.custom_exception import EntityCollectionMismatch as EMC
 
+try:
+    import ijson
+    JSON_ERRORS = (ValueError, ijson.JSONError)
+except ImportError:
+    ijson = None
+    JSON_ERRORS = (ValueError,)
+
+def get_pairs_hook(fields):
+    """
+    Helps to build a json object_pairs_hook keeping only some keys,
+    so the values of the other keys are dropped as soon as an object is decoded
+    :param fields (set): keys to keep
+    :return: object_pairs_hook
+    """
+    def keep_fields(pairs):
+        return {key: value for key, value in pairs if key in fields}
+    return keep_fields
+
 class JsonParser(Parser):
     """
     This is an important class variable that distinguishes it from other child parsers.
     It is used by Data Manager factory for the parser's it's type
     """
     type = "JSON"
+    extensions = ['.json']
 
     def __init__(self, config):
         """
@@ -18,84 +38,83 @@ class JsonParser(Parser):
         """
         super().__init__(self)
         self.config = config
-        self.entityCollection = EC()
+        self.entityCollection = EC(columnar=self.config.columnar, duplicates=self.config.duplicates)
 
     def parse(self):
         """
         This method helps to:-
         1. validate the file
-        2. convert json to entity collection
+        2. stream the entity_collection array of the json into entity collection,
+        one entity object at a time, without loading the rest of the document
         2.1. handles normal fields separately
         2.2. handles expression field separately
         
         :return(EntityCollection): Helps to return Entity Collection
         """
-        data = self.__validate__()
-        if self.config.entity_collection in data:
-            entities = data[self.config.entity_collection]
-            fields = self.get_computable_fields()
-            parsed_expressions = self.get_parsed_expression()
-            self.entityCollection.fields = list(fields) + [expression[3] for expression in self.get_parsed_expression()]
-            for entity in entities:
-                entity_object = self.entityCollection.add_entity(entity.get(self.config.base_field))
-                self.__handle_normal_fields__(entity, fields, entity_object)
-                self.__handle_expression_fields__(entity, parsed_expressions, entity_object)
+        self.__validate_file_name__()
+        fields = self.get_computable_fields()
+        parsed_expressions = self.get_parsed_expression()
+        self.entityCollection.fields = list(fields) + [expression.alias for expression in parsed_expressions]
+        self.get_required_fields(fields)
+        self.init_groups()
+        batches = self.read_batches(self.__load_data__())
+        first_batch = next(batches, [])
+        self.__validate__(first_batch)
+        for batch in chain([first_batch], batches):
+            self.__handle_batch__(batch, fields)
         return self.entityCollection
 
-    def __handle_normal_fields__(self, entity, fields, entity_object):
+    def __handle_batch__(self, batch, fields):
         """
-        Loops through each field in json and add its field and value in entity
+        Takes each simple or operand field of one batch of json blocks as a whole column
+        and hands it to the entity collection
 
-        :param entity (json block): this is one json block
+        :param batch (List of json block): json blocks, with the required fields only
         :param fields(List of String): Simple fields
-        :param entity_object(Entity): Entity object
         :return: None
         """
-        for field in fields:
-            entity_object.add(field, entity.get(field))
+        ids = [entity.get(self.config.base_field) for entity in batch]
+        raw_columns = {field: [entity.get(field) for entity in batch]
+                       for field in self.__required_fields__ - {self.config.base_field}}
+        self.ingest_batch(ids, raw_columns, fields)
 
-    def __handle_expression_fields__(self, entity, parsed_expressions, entity_object):
+    def __validate_file_name__(self):
         """
-        This method helps to handle expression fields like "A/B as div"
-
-        :param entity (json block): this is one json block
-        :param parsed_expressions (List of string): parsed list of expression
-        :param entity_object (Entity): Entity object
+        Helps to check the file's type before reading it
         :return: None
         """
-        for expression in parsed_expressions:
-            self.evaluate_expression(entity.get(expression[0]), entity.get(expression[1]),
-                                     expression[3], expression[4], entity_object)
-
-    def __validate__(self):
-        """
-        Helps to do simple validations that checks the file's presence, type and content
-        :return: data
-        """
         file_Name = os.path.basename(self.config.path)
         if ".json" not in file_Name:
             raise ValueError("JSON PARSER: Incorrect Parser")
-        try:
-            data = self.__load_data__()
-            if self.config.entity_collection not in data:
-                raise EMC("JSON PARSER", self.config.path)
-            return data
-        except Exception:
-            raise Exception("JSON PARSER: Invalid Json")
+
+    def __validate__(self, first_batch):
+        """
+        Helps to check that the entity_collection array is present and not empty
+        :param first_batch (List of json block): first batch of json blocks
+        :return: None
+        """
+        if len(first_batch) == 0:
+            raise EMC("JSON PARSER", self.config.path)
 
     def __load_data__(self):
         """
-        Helps to load the file
-        :return: data
+        Helps to load the file incrementally, keeping only the required fields of every json block.
+        ijson is used when it's installed, otherwise the standard library JsonStream reader.
+        ijson's C backend builds whole objects faster than a Python loop over its events could skip keys,
+        so its objects are projected right after being built instead.
+        :return: generator of json blocks
         """
+        fields = self.__required_fields__
         try:
-            with open(self.config.path, 'r') as file:
-                return json.load(file)
+            if ijson is not None:
+                with open(self.config.path, 'rb') as file:
+                    for item in ijson.items(file, "{}.item".format(self.config.entity_collection), use_float=True):
+                        yield {field: item[field] for field in fields if field in item}
+            else:
+                with open(self.config.path, 'r') as file:
+                    stream = JsonStream(file, object_pairs_hook=get_pairs_hook(fields))
+                    yield from stream.iter_array(self.config.entity_collection)
         except FileNotFoundError:
             raise FileNotFoundError("JSON Parser: File not found in path {}".format(self.config.path))
-        except Exception as e:
-            raise Exception(e)
-
-
-
-
+        except JSON_ERRORS:
+            raise Exception("JSON PARSER: Invalid Json")
@@ -0,0 +1,162 @@
+import re
+import json
+
+CHUNK_SIZE = 1 << 16
+_WHITESPACE = re.compile(r'\s*')
+_STRUCTURE = re.compile(r'[\[\]{}"]')
+_STRING_END = re.compile(r'(?:[^"\\]|\\.)*"', re.S)
+
+class JsonStream:
+    """
+    JsonStream is a small incremental reader over a json document that only relies on the standard library.
+    It reads the file in chunks and keeps only the part of the document that is not consumed yet,
+    so one value is decoded at a time and skipped values are never materialized.
+    """
+    def __init__(self, file, chunk_size=CHUNK_SIZE, object_pairs_hook=None):
+        """
+        Helps to initialize
+        :param file: text file object opened for reading
+        :param chunk_size: number of characters read at a time
+        :param object_pairs_hook: called with the (key, value) pairs of every decoded object, see json.JSONDecoder
+        """
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder(object_pairs_hook=object_pairs_hook)
+
+    def iter_array(self, key):
+        """
+        Helps to find the array stored under `key` in the top level object
+        and to yield its items one at a time.
+        Every other top level value is skipped without being decoded.
+
+        :param key (string): top level key of the array. Eg:- entity_collection
+        :return: generator of the array items, nothing if the key is not found
+        """
+        self.__expect__('{')
+        if self.__peek_token__() == '}':
+            return
+        while True:
+            current_key = self.__decode_value__()
+            self.__expect__(':')
+            if current_key == key:
+                yield from self.__iter_items__()
+                return
+            self.__skip_value__()
+            if self.__expect__(',}') == '}':
+                return
+
+    def __iter_items__(self):
+        """
+        Helps to yield the items of the array starting at current position
+        :return: generator of the array items
+        """
+        self.__expect__('[')
+        if self.__peek_token__() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.__decode_value__()
+            if self.__expect__(',]') == ']':
+                return
+
+    def __fill__(self):
+        """
+        Helps to read the next chunk and drop the consumed part of the buffer
+        :return(bool): False once the end of the file is reached
+        """
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def __peek_token__(self):
+        """
+        Helps to skip white spaces and return the next character without consuming it
+        :return(string): next character, empty at the end of the file
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.__fill__():
+                return ""
+
+    def __expect__(self, characters):
+        """
+        Helps to consume the next character if it's one of the expected ones
+        :param characters (string): expected characters
+        :return(string): the consumed character
+        """
+        character = self.__peek_token__()
+        if character == "" or character not in characters:
+            raise json.JSONDecodeError("Expecting one of '{}'".format(characters), self.buffer, self.pos)
+        self.pos += 1
+        return character
+
+    def __decode_value__(self):
+        """
+        Helps to decode the value at current position, reading more chunks while it's incomplete
+        :return: decoded value
+        """
+        self.__peek_token__()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.__fill__():
+                    raise
+                continue
+            # a number ending exactly at the end of the buffer might continue in the next chunk
+            if end == len(self.buffer) and self.__fill__():
+                continue
+            self.pos = end
+            return value
+
+    def __skip_value__(self):
+        """
+        Helps to skip the value at current position without decoding it.
+        Only brackets and strings are scanned, so nested objects and arrays are never built.
+        :return: None
+        """
+        if self.__peek_token__() not in '[{"':
+            self.__decode_value__()
+            return
+        depth = 0
+        while True:
+            match = _STRUCTURE.search(self.buffer, self.pos)
+            if match is None:
+                self.pos = len(self.buffer)
+                if not self.__fill__():
+                    raise json.JSONDecodeError("Unterminated value", self.buffer, self.pos)
+                continue
+            self.pos = match.end()
+            token = match.group()
+            if token == '"':
+                self.__skip_string__()
+            elif token in '[{':
+                depth += 1
+            else:
+                depth -= 1
+            if depth == 0:
+                return
+
+    def __skip_string__(self):
+        """
+        Helps to skip the rest of a string whose opening quote is already consumed
+        :return: None
+        """
+        while True:
+            match = _STRING_END.match(self.buffer, self.pos)
+            if match is not None:
+                self.pos = match.end()
+                return
+            if not self.__fill__():
+                raise json.JSONDecodeError("Unterminated string", self.buffer, self.pos)
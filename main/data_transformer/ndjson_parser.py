@@ -0,0 +1,39 @@
+import os
+import json
+from data_transformer.json_parser import JsonParser, get_pairs_hook
+
+class NdjsonParser(JsonParser):
+    """
+    This is an important class variable that distinguishes it from other child parsers.
+    It is used by Data Manager factory for the parser's it's type
+
+    NdjsonParser reads line delimited json, where every non empty line is one entity block.
+    The rest of the parsing is the same as JsonParser.
+    """
+    type = "NDJSON"
+    extensions = ['.ndjson', '.jsonl']
+
+    def __validate_file_name__(self):
+        """
+        Helps to check the file's type before reading it
+        :return: None
+        """
+        _, file_extension = os.path.splitext(self.config.path)
+        if file_extension.lower() not in self.extensions:
+            raise ValueError("NDJSON PARSER: Incorrect Parser")
+
+    def __load_data__(self):
+        """
+        Helps to load the file line by line, keeping only the required fields of every json block
+        :return: generator of json blocks
+        """
+        decoder = json.JSONDecoder(object_pairs_hook=get_pairs_hook(self.__required_fields__))
+        try:
+            with open(self.config.path, 'r') as file:
+                for line in file:
+                    if line.strip():
+                        yield decoder.decode(line)
+        except FileNotFoundError:
+            raise FileNotFoundError("NDJSON Parser: File not found in path {}".format(self.config.path))
+        except ValueError:
+            raise Exception("NDJSON PARSER: Invalid Json")
@@ -0,0 +1,160 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+from data_processor.entity import EntityCollection as EC
+from data_processor.validation import ValidationReport
+
+META_FILE = "meta.json"
+
+def _encode_ids(ids):
+    """
+    Helps to pick how the ids are stored so that a warm load gives back the same ids as a parse.
+    String ids and integer ids (Eg:- from JSON or NDJSON) are stored as plain arrays, which can be memory-mapped,
+    any other mix of types is pickled in an object array.
+    :param ids (numpy.ndarray): entity ids
+    :return(tuple): kind of the ids ('str', 'int' or 'object') and the array to store
+    """
+    id_list = ids.tolist()
+    kinds = {type(entity_id) for entity_id in id_list}
+    if kinds <= {str}:
+        return "str", np.array(id_list, dtype=str)
+    if kinds == {int}:
+        try:
+            return "int", np.array(id_list, dtype=np.int64)
+        except OverflowError:
+            pass
+    return "object", np.array(id_list, dtype=object)
+
+def _load_ids(path, kind):
+    """
+    Helps to load the ids stored by _encode_ids
+    :param path: path of the ids file
+    :param kind: kind of the ids, as returned by _encode_ids
+    :return(numpy.ndarray): entity ids, integers are given back as Python ints like the parsers give them
+    """
+    if kind == "object":
+        return np.load(path, allow_pickle=True)
+    ids = np.load(path, mmap_mode='c')
+    if kind == "int":
+        return ids.astype(object)
+    return ids
+
+class ParseCache:
+    """
+    ParseCache keeps parsed entity collections on disk, one directory per cache key.
+    Every column is stored as .npy files (values and validity mask) next to the ids,
+    so a warm load memory-maps the files instead of reading or parsing anything.
+
+    The key covers the file path, size and modification time, data_type, entity_collection,
+    base_field, computable_fields, duplicates and group_by, so any change to the data or to the config misses the cache.
+    The directory is capped at config.cache_size_mb, the least recently used entries are evicted first.
+    """
+    def __init__(self, config):
+        """
+        Helps to initialize
+        :param config: Config class object
+        """
+        self.config = config
+        self.directory = config.cache_dir
+        self.max_bytes = config.cache_size_mb * 1024 * 1024
+
+    def get_key(self):
+        """
+        Helps to compute the cache key of the config and its data file
+        :return(string): hexadecimal key
+        """
+        stat = os.stat(self.config.path)
+        key_data = {
+            "path": os.path.abspath(self.config.path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "data_type": self.config.data_type,
+            "entity_collection": self.config.entity_collection,
+            "base_field": self.config.base_field,
+            "computable_fields": self.config.computable_fields,
+            "duplicates": self.config.duplicates,
+            "group_by": self.config.group_by
+        }
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode()).hexdigest()
+
+    def load(self):
+        """
+        Helps to load the cached entity collection of the config, if any.
+        The arrays are memory-mapped copy-on-write, so nothing is copied until the collection is modified.
+        :return(EntityCollection): columnar entity collection, None when there is no cache entry
+        """
+        entry = os.path.join(self.directory, self.get_key())
+        meta_path = os.path.join(entry, META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r') as meta_file:
+            meta = json.load(meta_file)
+        fields = meta["fields"]
+        # entries stored before the kind of the ids was recorded only hold strings
+        ids = _load_ids(os.path.join(entry, "ids.npy"), meta.get("ids", "str"))
+        columns = {}
+        for position, field in enumerate(fields):
+            values = np.load(os.path.join(entry, "{}.values.npy".format(position)), mmap_mode='c')
+            mask = np.load(os.path.join(entry, "{}.mask.npy".format(position)), mmap_mode='c')
+            columns[field] = (values, mask)
+        os.utime(meta_path)
+        entityCollection = EC.from_columns(ids, columns, fields)
+        entityCollection.duplicates = self.config.duplicates
+        if meta.get("validation") is not None:
+            # the rejections found when the entry was stored are reported again, with the settings of the config
+            entityCollection.validation = ValidationReport.from_config(self.config)
+            entityCollection.validation.merge(ValidationReport.from_state(meta["validation"]))
+        if meta.get("groups") is not None:
+            codes = np.load(os.path.join(entry, "groups.npy"), mmap_mode='c')
+            entityCollection.set_groups(meta["groups"]["group_by"], meta["groups"]["categories"], codes)
+        return entityCollection
+
+    def store(self, entityCollection):
+        """
+        Helps to store an entity collection for the config and to evict old entries.
+        The entry is written in a temporary directory and renamed, so a partial entry is never loaded.
+        :param entityCollection: parsed entity collection
+        :return: None
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        entry = os.path.join(self.directory, self.get_key())
+        temporary = "{}.tmp{}".format(entry, os.getpid())
+        shutil.rmtree(temporary, ignore_errors=True)
+        os.makedirs(temporary)
+        id_kind, ids = _encode_ids(entityCollection.get_ids())
+        np.save(os.path.join(temporary, "ids.npy"), ids, allow_pickle=id_kind == "object")
+        for position, field in enumerate(entityCollection.fields):
+            values, mask = entityCollection.get_column(field)
+            np.save(os.path.join(temporary, "{}.values.npy".format(position)), values)
+            np.save(os.path.join(temporary, "{}.mask.npy".format(position)), mask)
+        groups = None
+        if entityCollection.group_by is not None:
+            np.save(os.path.join(temporary, "groups.npy"), entityCollection.get_group_codes())
+            groups = {"group_by": entityCollection.group_by, "categories": entityCollection.categories}
+        with open(os.path.join(temporary, META_FILE), 'w') as meta_file:
+            validation = entityCollection.validation.to_state() if entityCollection.validation is not None else None
+            json.dump({"fields": entityCollection.fields, "ids": id_kind, "validation": validation, "groups": groups}, meta_file)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(temporary, entry)
+        self.__evict__()
+
+    def __evict__(self):
+        """
+        Helps to delete the least recently used entries until the cache fits in config.cache_size_mb
+        :return: None
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            meta_path = os.path.join(self.directory, name, META_FILE)
+            if os.path.exists(meta_path):
+                entry = os.path.join(self.directory, name)
+                size = sum(os.path.getsize(os.path.join(entry, file)) for file in os.listdir(entry))
+                entries.append((os.path.getmtime(meta_path), size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
@@ -1,5 +1,6 @@
 import os
 import xml.etree.ElementTree as ET
+from itertools import chain
 from data_transformer.abstract_parser import Parser
 from data_processor.entity import EntityCollection as EC
 from data_transformer.custom_exception import EntityCollectionMismatch as EMC
@@ -10,6 +11,7 @@ class XmlParser(Parser):
         It is used by Data Manager factory for the parser's it's type
     """
     type = "XML"
+    extensions = ['.xml']
 
     def __init__(self, config):
         """
@@ -18,79 +20,86 @@ class XmlParser(Parser):
         """
         super().__init__(self)
         self.config = config
-        self.entityCollection = EC()
+        self.entityCollection = EC(columnar=self.config.columnar, duplicates=self.config.duplicates)
 
     def parse(self):
         """
          This method helps to:-
          1. validate the file
-         2. convert XML to entity collection
+         2. stream the XML with iterparse, so each entity_collection element is converted as soon as it closes
+         and cleared afterwards, which keeps memory bounded whatever the size of the file
          2.1. handles normal fields separately
          2.2. handles expression field separately
 
          :return(EntityCollection): Helps to return Entity Collection
          """
-        root = self.__validate__()
-        entities = root.findall(self.config.entity_collection)
+        self.__validate_file_name__()
         fields = self.get_computable_fields()
         parsed_expressions = self.get_parsed_expression()
-        self.entityCollection.fields = list(fields) + [expression[3] for expression in self.get_parsed_expression()]
-        for entity in entities:
-            entity_object = self.entityCollection.add_entity(entity.find(self.config.base_field).text)
-            self.__handle_normal_fields__(entity, fields, entity_object)
-            self.__handle_expression_fields__(entity, parsed_expressions, entity_object)
+        self.entityCollection.fields = list(fields) + [expression.alias for expression in parsed_expressions]
+        self.get_required_fields(fields)
+        self.init_groups()
+        batches = self.read_batches(self.__load_data__())
+        first_batch = next(batches, [])
+        self.__validate__(first_batch)
+        for batch in chain([first_batch], batches):
+            self.__handle_batch__(batch, fields)
         return self.entityCollection
-    def __handle_normal_fields__(self, entity, fields, entity_object):
+
+    def __handle_batch__(self, batch, fields):
         """
-        Loops through each field in xml and add its field and value in entity
+        Takes each simple or operand field of one batch of xml blocks as a whole column
+        and hands it to the entity collection
 
-        :param entity (xml block): this is one json block
+        :param batch (List of dict): xml blocks as tag -> text maps, with the required tags only
         :param fields(List of String): Simple fields
-        :param entity_object(Entity): Entity object
         :return: None
         """
-        for field in fields:
-            entity_object.add(field, entity.find(field).text)
-            #print(entity.find(field).text)
+        ids = [entity.get(self.config.base_field) for entity in batch]
+        raw_columns = {field: [entity.get(field) for entity in batch]
+                       for field in self.__required_fields__ - {self.config.base_field}}
+        self.ingest_batch(ids, raw_columns, fields)
 
-    def __handle_expression_fields__(self, entity, parsed_expressions, entity_object):
+    def __validate_file_name__(self):
         """
-        This method helps to handle expression fields like "A/B as div"
-
-        :param entity (xml block): this is one xml block
-        :param parsed_expressions (List of string): parsed list of expression
-        :param entity_object (Entity): Entity object
+        Helps to check the file's type before reading it
         :return: None
         """
-        for expression in parsed_expressions:
-            self.evaluate_expression(entity.find(expression[0]).text, entity.find(expression[1]).text,
-                                     expression[3], expression[4], entity_object)
-
-    def __validate__(self):
-        """
-        Helps to do simple validations that checks the file's presence, type and content
-        :return: data
-        """
         file_Name = os.path.basename(self.config.path)
         if ".xml" not in file_Name:
             raise ValueError("XML PARSER: Incorrect Parser")
-        try:
-            data = self.__load_data__()
-            if len(data.findall(self.config.entity_collection)) == 0:
-                raise EMC("XML PARSER", self.config.path)
-            return data
-        except Exception:
-            raise Exception("XML PARSER: Invalid Xml")
+
+    def __validate__(self, first_batch):
+        """
+        Helps to check that the file contains at least one entity_collection block
+        :param first_batch (List of dict): first batch of xml blocks
+        :return: None
+        """
+        if len(first_batch) == 0:
+            raise EMC("XML PARSER", self.config.path)
 
     def __load_data__(self):
         """
-        Helps to load the file
-        :return: data
+        Helps to load the file incrementally.
+        Every entity_collection element directly under the root is turned into a tag -> text map
+        of the required tags when it closes, and then removed from the tree.
+        :return: generator of dict
         """
+        fields = self.__required_fields__
+        depth = 0
+        root = None
         try:
-            tree = ET.parse(self.config.path)
-            return tree.getroot()
+            for event, element in ET.iterparse(self.config.path, events=('start', 'end')):
+                if event == 'start':
+                    if root is None:
+                        root = element
+                    depth += 1
+                    continue
+                depth -= 1
+                if depth == 1 and element.tag == self.config.entity_collection:
+                    yield {child.tag: child.text for child in element if child.tag in fields}
+                    root.clear()
         except FileNotFoundError:
             raise FileNotFoundError("XML Parser: File not found in path {}".format(self.config.path))
-        except Exception as e:
-            raise Exception(e)
\ No newline at end of file
+        except ET.ParseError:
+            raise Exception("XML PARSER: Invalid Xml")
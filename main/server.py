@@ -0,0 +1,366 @@
+"""
+Local HTTP service mode, so dashboards query warm data instead of running the tool once per request.
+
+The data of every config is parsed once at start and kept in memory, it's parsed again only when its files change.
+Results are cached by config and by version (size and modification time) of the source files.
+Parsing and summarizing run in threads and rendering in a pool of worker processes,
+so the asyncio event loop keeps answering other requests meanwhile.
+Only the standard library is used and the server listens on 127.0.0.1 by default: it's meant for local use.
+
+Endpoints (GET):
+    /configs                                       the served configs, their fields and number of entities
+    /summary?config=NAME                           summary statistics as JSON, the same as the stats-json report
+    /chart.png?config=NAME&field=FIELD[&page=1]    the page of a field as PNG, page=1 for its group_by page
+    /report.pdf?config=NAME                        the PDF report
+
+NAME is the file name of the config without extension, Eg:- 'config' for config.json.
+It can be left out when a single config is served.
+
+Usage, from the main folder:
+    python server.py --config config.json
+    python server.py --config math.json --config english.json --port 8080 --workers 4
+"""
+import os
+import sys
+import copy
+import json
+import asyncio
+import argparse
+from io import BytesIO
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ProcessPoolExecutor
+from data_processor.configuration import Config
+from data_processor.performanceAnalizer import Performance_Analyzer, _load_pdf_writer
+from data_transformer.data_manager_factory import DataManagerFactory
+from cli import get_stats
+
+CACHE_ENTRIES = 64
+JSON_TYPE = "application/json"
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+class HttpError(Exception):
+    """
+    HttpError is answered to the client with its status and message, as JSON
+    """
+    def __init__(self, status, message):
+        """
+        Helps to initialize
+        :param status (int): HTTP status. Eg:- 404
+        :param message (string): error message
+        """
+        super().__init__(status, message)
+        self.status = status
+        self.message = message
+
+def get_config_name(config):
+    """
+    Helps to get the name a config is requested with: its file name without extension
+    :param config: config
+    :return(string): name. Eg:- 'config' for config.json
+    """
+    return os.path.splitext(os.path.basename(config.config_path))[0]
+
+def get_source_version(config):
+    """
+    Helps to identify the version of the source files of a config, it changes when a file is modified, added or removed
+    :param config: config
+    :return(tuple): (path, size, modification time) of every file
+    """
+    version = []
+    for path in config.get_paths():
+        stat = os.stat(path)
+        version.append((os.path.abspath(path), stat.st_size, stat.st_mtime_ns))
+    return tuple(version)
+
+def _export_pdf(config, entityCollection):
+    """
+    Helps to export the PDF report in a worker process in one go, when pypdf is not installed to assemble pages
+    rendered separately
+    :param config: config
+    :param entityCollection: parsed entity collection of the config
+    :return(bytes): PDF report
+    """
+    config = copy.copy(config)
+    config.workers = 1
+    pdf = BytesIO()
+    Performance_Analyzer(config).export(entityCollection, pdf)
+    return pdf.getvalue()
+
+def _merge_pages(PdfWriter, pages):
+    """
+    Helps to assemble single page PDFs into one PDF
+    :param PdfWriter: pypdf's PdfWriter
+    :param pages (list): PDF pages (bytes), in order
+    :return(bytes): PDF
+    """
+    writer = PdfWriter()
+    for page in pages:
+        writer.append(BytesIO(page))
+    pdf = BytesIO()
+    writer.write(pdf)
+    return pdf.getvalue()
+
+class AnalysisService:
+    """
+    AnalysisService keeps the parsed data of every config warm and answers the requests of the server.
+    Every result is computed once per config and source version, even when several requests ask for it
+    at the same time, and the `cache_entries` most recently used results are kept.
+    """
+    def __init__(self, configs, workers=2, cache_entries=CACHE_ENTRIES):
+        """
+        Helps to initialize
+        :param configs (list): configs to serve, with different names
+        :param workers (int): number of rendering processes
+        :param cache_entries (int): number of results kept
+        """
+        self.configs = {get_config_name(config): config for config in configs}
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.cache_entries = cache_entries
+        self.__collections__ = {}
+        self.__locks__ = {}
+        self.__results__ = OrderedDict()
+
+    async def warm_up(self):
+        """
+        Helps to parse the data of every config before the first request
+        :return: None
+        """
+        for name in self.configs:
+            await self.get_collection(name)
+
+    async def get_collection(self, name):
+        """
+        Helps to get the parsed data of a config. It's parsed again, in a thread, when its source files changed,
+        and the results of the previous version are dropped.
+        :param name (string): config name
+        :return(tuple): source version, entity collection
+        """
+        config = self.get_config(name)
+        loop = asyncio.get_running_loop()
+        async with self.__locks__.setdefault(name, asyncio.Lock()):
+            version = await loop.run_in_executor(None, get_source_version, config)
+            current = self.__collections__.get(name)
+            if current is None or current[0] != version:
+                entityCollection = await loop.run_in_executor(None, DataManagerFactory(config).call_parser)
+                current = self.__collections__[name] = (version, entityCollection)
+                for key in [key for key in self.__results__ if key[0] == name and key[1] != version]:
+                    del self.__results__[key]
+        return current
+
+    def get_config(self, name):
+        """
+        Helps to find a served config
+        :param name (string): config name, None when a single config is served
+        :return: config
+        """
+        if name is None and len(self.configs) == 1:
+            return next(iter(self.configs.values()))
+        if name not in self.configs:
+            raise HttpError(404, "Unknown config {}, served: {}".format(name, ", ".join(self.configs)))
+        return self.configs[name]
+
+    async def get_result(self, name, key, compute):
+        """
+        Helps to get a result from the cache, or to compute it.
+        The pending computation is cached, so concurrent requests for the same result share it,
+        and it's shielded so a client closing its connection doesn't cancel it for the others.
+        :param name (string): config name
+        :param key (tuple): what is requested. Eg:- ('chart', 'Math', 0)
+        :param compute: coroutine function (config, entity collection) -> bytes
+        :return(bytes): result
+        """
+        config = self.get_config(name)
+        name = get_config_name(config)
+        version, entityCollection = await self.get_collection(name)
+        key = (name, version) + key
+        task = self.__results__.get(key)
+        if task is None:
+            task = self.__results__[key] = asyncio.ensure_future(compute(config, entityCollection))
+            while len(self.__results__) > self.cache_entries:
+                self.__results__.popitem(last=False)
+        else:
+            self.__results__.move_to_end(key)
+        try:
+            return await asyncio.shield(task)
+        except Exception:
+            if self.__results__.get(key) is task:
+                del self.__results__[key]
+            raise
+
+    async def list_configs(self):
+        """
+        Helps to describe the served configs
+        :return(bytes): JSON
+        """
+        configs = {}
+        for name, config in self.configs.items():
+            _, entityCollection = await self.get_collection(name)
+            configs[name] = {"path": config.path, "fields": entityCollection.fields, "entities": len(entityCollection)}
+        return json.dumps(configs, indent=2).encode()
+
+    async def summary(self, name):
+        """
+        Helps to get the summary statistics of a config, computed in a thread
+        :param name (string): config name
+        :return(bytes): JSON
+        """
+        async def compute(config, entityCollection):
+            stats = await asyncio.get_running_loop().run_in_executor(None, get_stats, config, entityCollection)
+            return json.dumps(stats, indent=2).encode()
+        return await self.get_result(name, ("summary",), compute)
+
+    async def chart(self, name, field, page):
+        """
+        Helps to get a page of a field as PNG, rendered in a worker process
+        :param name (string): config name
+        :param field (string): field or alias
+        :param page (int): 0 for the page of the field, 1 for its group_by page
+        :return(bytes): PNG
+        """
+        async def compute(config, entityCollection):
+            if field not in entityCollection.fields:
+                raise HttpError(404, "Unknown field {}, fields: {}".format(field, ", ".join(entityCollection.fields)))
+            loop = asyncio.get_running_loop()
+            jobs = await loop.run_in_executor(None, Performance_Analyzer(config).get_page_jobs, entityCollection, [field], 'png')
+            if not 0 <= page < len(jobs):
+                raise HttpError(404, "Field {} has {} page(s)".format(field, len(jobs)))
+            function, arguments = jobs[page]
+            return await loop.run_in_executor(self.pool, function, *arguments)
+        return await self.get_result(name, ("chart", field, page), compute)
+
+    async def report(self, name):
+        """
+        Helps to get the PDF report of a config, its pages are rendered in parallel in the worker processes
+        :param name (string): config name
+        :return(bytes): PDF
+        """
+        async def compute(config, entityCollection):
+            loop = asyncio.get_running_loop()
+            PdfWriter = _load_pdf_writer()
+            if PdfWriter is None:
+                return await loop.run_in_executor(self.pool, _export_pdf, config, entityCollection)
+            jobs = await loop.run_in_executor(None, Performance_Analyzer(config).get_page_jobs,
+                                              entityCollection, entityCollection.fields)
+            pages = await asyncio.gather(*[loop.run_in_executor(self.pool, function, *arguments) for function, arguments in jobs])
+            return await loop.run_in_executor(None, _merge_pages, PdfWriter, pages)
+        return await self.get_result(name, ("report",), compute)
+
+    async def handle(self, method, target):
+        """
+        Helps to route a request
+        :param method (string): HTTP method
+        :param target (string): request target. Eg:- '/summary?config=config'
+        :return(tuple): content type, body (bytes)
+        """
+        if method != "GET":
+            raise HttpError(405, "Only GET is supported")
+        url = urlsplit(target)
+        query = {parameter: values[-1] for parameter, values in parse_qs(url.query).items()}
+        name = query.get("config")
+        if url.path == "/configs":
+            return JSON_TYPE, await self.list_configs()
+        if url.path == "/summary":
+            return JSON_TYPE, await self.summary(name)
+        if url.path == "/chart.png":
+            if "field" not in query:
+                raise HttpError(400, "The field parameter is required")
+            try:
+                page = int(query.get("page", 0))
+            except ValueError:
+                raise HttpError(400, "The page parameter must be a number")
+            return "image/png", await self.chart(name, query["field"], page)
+        if url.path == "/report.pdf":
+            return "application/pdf", await self.report(name)
+        raise HttpError(404, "Unknown path {}".format(url.path))
+
+    def close(self):
+        """
+        Helps to stop the worker processes
+        :return: None
+        """
+        self.pool.shutdown(cancel_futures=True)
+
+async def handle_connection(service, reader, writer):
+    """
+    Helps to answer one HTTP request per connection.
+    Errors are answered as JSON, {"error": message}, with their status.
+    :param service: AnalysisService
+    :param reader: asyncio.StreamReader of the connection
+    :param writer: asyncio.StreamWriter of the connection
+    :return: None
+    """
+    method = target = "-"
+    try:
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) != 3:
+            raise HttpError(400, "Malformed request line")
+        method, target, _ = request_line
+        # the headers are not used, they are read up to the empty line
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+            pass
+        status = 200
+        content_type, body = await service.handle(method, target)
+    except HttpError as error:
+        status, content_type, body = error.status, JSON_TYPE, json.dumps({"error": error.message}).encode()
+    except Exception as error:
+        status, content_type, body = 500, JSON_TYPE, json.dumps({"error": str(error)}).encode()
+    print("{} {} {}".format(method, target, status), file=sys.stderr)
+    head = "HTTP/1.1 {} {}\r\nContent-Type: {}\r\nContent-Length: {}\r\nConnection: close\r\n\r\n".format(
+        status, REASONS[status], content_type, len(body))
+    try:
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+async def serve(configs, host, port, workers, cache_entries):
+    """
+    Helps to parse every config and to serve them until interrupted
+    :param configs (list): configs
+    :param host (string): address to listen on
+    :param port (int): port to listen on
+    :param workers (int): number of rendering processes
+    :param cache_entries (int): number of results kept
+    :return: None
+    """
+    service = AnalysisService(configs, workers, cache_entries)
+    try:
+        await service.warm_up()
+        server = await asyncio.start_server(lambda reader, writer: handle_connection(service, reader, writer), host, port)
+        print("Serving {} on http://{}:{}".format(", ".join(service.configs), host, port), file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+def main(arguments=None):
+    """
+    Helps to run the server from the command line
+    :param arguments (list): command line arguments, sys.argv when None
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Performance analysis system, local HTTP service")
+    parser.add_argument("--config", action="append", dest="configs",
+                        help="config file, can be repeated. Default: config.json in the current directory")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on. Default: 127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on. Default: 8080")
+    parser.add_argument("--workers", type=int, default=2, help="number of rendering processes. Default: 2")
+    parser.add_argument("--cache-entries", type=int, default=CACHE_ENTRIES,
+                        help="number of results (summaries, charts, reports) kept. Default: {}".format(CACHE_ENTRIES))
+    options = parser.parse_args(arguments)
+    configs = [Config(config_path) for config_path in options.configs or [None]]
+    for config in configs:
+        if not isinstance(config.config_data, dict):
+            parser.error("invalid config {}".format(config.config_path))
+    if len({get_config_name(config) for config in configs}) != len(configs):
+        parser.error("configs must have different file names, they are requested by name")
+    try:
+        asyncio.run(serve(configs, options.host, options.port, options.workers, options.cache_entries))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
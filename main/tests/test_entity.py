@@ -0,0 +1,53 @@
+import pytest
+from data_processor.entity import EntityCollection
+from data_processor.validation import ValidationReport
+
+EXPECTED = {'keep-first': 1.0, 'keep-last': 3.0, 'sum': 4.0, 'mean': 2.0}
+
+@pytest.mark.parametrize("columnar", [False, True])
+@pytest.mark.parametrize("policy", sorted(EXPECTED))
+def test_add_entity_applies_duplicates_policy(policy, columnar):
+    collection = EntityCollection(columnar=columnar, duplicates=policy)
+    collection.add_entity('E1').add('Math', 1)
+    collection.add_entity('E1').add('Math', 3)
+    assert len(collection) == 1
+    assert collection.get('E1').field_value_pairs == {'Math': EXPECTED[policy]}
+    assert collection.compute_mean('Math') == EXPECTED[policy]
+
+@pytest.mark.parametrize("columnar", [False, True])
+@pytest.mark.parametrize("policy", sorted(EXPECTED))
+def test_add_applies_duplicates_policy(policy, columnar):
+    collection = EntityCollection(columnar=columnar, duplicates=policy)
+    collection.add('E1', {'Math': 1})
+    collection.add('E1', {'Math': 3})
+    assert len(collection) == 1
+    assert collection.get('E1').field_value_pairs == {'Math': EXPECTED[policy]}
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_add_entity_mean_weights_earlier_duplicates(columnar):
+    collection = EntityCollection(columnar=columnar, duplicates='mean')
+    collection.extend(['E1', 'E1'], {'Math': [1, 2]})
+    collection.add_entity('E1').add('Math', 6)
+    assert collection.get('E1').field_value_pairs == {'Math': 3.0}
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_add_entity_allows_duplicates_by_default(columnar):
+    collection = EntityCollection(columnar=columnar)
+    collection.add_entity('E1').add('Math', 1)
+    collection.add_entity('E1').add('Math', 3)
+    assert len(collection) == 2
+    assert collection.get('E1').field_value_pairs == {'Math': 1.0}
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_nan_is_skipped_the_same_way_by_single_values_and_batches(columnar):
+    single = EntityCollection(columnar=columnar)
+    single.validation = ValidationReport()
+    single.add_entity('E1').add('Math', 'nan')
+    single.add_entity('E2').add('Math', 2)
+    single.add('E3', {'Math': float('nan')})
+    batch = EntityCollection(columnar=columnar)
+    batch.validation = ValidationReport()
+    batch.extend(['E1', 'E2', 'E3'], {'Math': ['nan', 2, float('nan')]})
+    assert single.summarize(['Math']) == batch.summarize(['Math'])
+    assert single.summarize(['Math'])['Math']['mean'] == 2.0
+    assert single.validation.get_rejected('Math') == batch.validation.get_rejected('Math') == 2
@@ -0,0 +1,48 @@
+import json
+import pytest
+from data_processor.configuration import Config
+from data_transformer.data_manager_factory import DataManagerFactory
+
+IDS = {
+    "JSON": [5, 7, 11],
+    "NDJSON": [5, 7, 11],
+    "CSV": ["E5", "E7", "E11"],
+    "mixed": [5, "E7", 11.5],
+}
+
+def write_config(tmp_path, data_type, ids):
+    rows = [{"Id": entity_id, "Math": 60 + position} for position, entity_id in enumerate(ids)]
+    if data_type == "CSV":
+        data_path = tmp_path / "data.csv"
+        data_path.write_text("Id,Math\n" + "".join("{},{}\n".format(row["Id"], row["Math"]) for row in rows))
+    elif data_type == "NDJSON":
+        data_path = tmp_path / "data.ndjson"
+        data_path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    else:
+        data_path = tmp_path / "data.json"
+        data_path.write_text(json.dumps({"Students": rows}))
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps({
+        "path": str(data_path),
+        "data_type": "JSON" if data_type == "mixed" else data_type,
+        "entity_collection": "Students",
+        "base_field": "Id",
+        "computable_fields": ["Math"],
+        "cache": True,
+        "cache_dir": str(tmp_path / "cache"),
+        "validation_report": ""
+    }))
+    return Config(str(config_path))
+
+@pytest.mark.parametrize("data_type", sorted(IDS))
+def test_warm_load_keeps_the_ids_of_a_parse(tmp_path, monkeypatch, data_type):
+    config = write_config(tmp_path, data_type, IDS[data_type])
+    cold = DataManagerFactory(config).call_parser()
+    monkeypatch.setattr(DataManagerFactory, "__call_parser__", lambda self: pytest.fail("not loaded from the cache"))
+    warm = DataManagerFactory(config).call_parser()
+    cold_ids = cold.get_ids().tolist()
+    warm_ids = warm.get_ids().tolist()
+    assert warm_ids == cold_ids
+    assert [type(entity_id) for entity_id in warm_ids] == [type(entity_id) for entity_id in cold_ids]
+    for entity_id in cold_ids:
+        assert warm.get(entity_id).field_value_pairs == cold.get(entity_id).field_value_pairs